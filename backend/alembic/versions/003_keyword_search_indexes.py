@@ -0,0 +1,47 @@
+"""Add full-text and trigram indexes for keyword search
+
+Revision ID: 003
+Revises: 002
+Create Date: 2024-11-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "003"
+down_revision = "002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Upgrade: Enable pg_trgm and index entry text and entity names."""
+    op.execute('CREATE EXTENSION IF NOT EXISTS "pg_trgm"')
+
+    # 'simple' config: entries mix English, Tamil, Hindi, etc., so no stemming
+    op.execute(
+        "CREATE INDEX idx_entries_raw_text_fts ON journal_entries "
+        "USING gin (to_tsvector('simple', raw_text))"
+    )
+    op.execute(
+        "CREATE INDEX idx_entries_raw_text_trgm ON journal_entries "
+        "USING gin (raw_text gin_trgm_ops)"
+    )
+    op.execute(
+        "CREATE INDEX idx_entities_name_fts ON entities "
+        "USING gin (to_tsvector('simple', entity_name))"
+    )
+    op.execute(
+        "CREATE INDEX idx_entities_name_trgm ON entities "
+        "USING gin (entity_name gin_trgm_ops)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade: Drop keyword search indexes."""
+    op.execute("DROP INDEX IF EXISTS idx_entities_name_trgm")
+    op.execute("DROP INDEX IF EXISTS idx_entities_name_fts")
+    op.execute("DROP INDEX IF EXISTS idx_entries_raw_text_trgm")
+    op.execute("DROP INDEX IF EXISTS idx_entries_raw_text_fts")
+    # pg_trgm stays: it may predate this revision and other objects may use it
@@ -0,0 +1,29 @@
+"""Tag stored embeddings with the model that produced them
+
+Revision ID: 004
+Revises: 003
+Create Date: 2024-11-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "004"
+down_revision = "003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Upgrade: Add embedding_model and backfill existing OpenAI vectors."""
+    op.add_column('journal_entries', sa.Column('embedding_model', sa.String(length=200), nullable=True))
+    op.execute(
+        "UPDATE journal_entries SET embedding_model = 'openai:text-embedding-3-small:1536' "
+        "WHERE embedding IS NOT NULL"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade: Drop embedding_model."""
+    op.drop_column('journal_entries', 'embedding_model')
@@ -0,0 +1,41 @@
+"""Add halfvec and binary-quantized HNSW indexes on entry embeddings
+
+Revision ID: 005
+Revises: 004
+Create Date: 2024-11-25 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "005"
+down_revision = "004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Upgrade: Index embeddings as halfvec (cosine) and binary_quantize bits (Hamming)."""
+    # halfvec, bit and binary_quantize() need pgvector 0.7+
+    op.execute("ALTER EXTENSION vector UPDATE")
+
+    # Expression indexes: the vector(1536) column stays the full-precision copy
+    # used for re-ranking; queries must repeat these expressions
+    # (app.services.quantization.distance_expression) to use them.
+    # ~3 KB per entry instead of ~6 KB
+    op.execute(
+        "CREATE INDEX idx_entries_embedding_halfvec ON journal_entries "
+        "USING hnsw ((embedding::halfvec(1536)) halfvec_cosine_ops)"
+    )
+    # 192 bytes per entry; candidates only, re-ranked with exact cosine
+    op.execute(
+        "CREATE INDEX idx_entries_embedding_bit ON journal_entries "
+        "USING hnsw ((binary_quantize(embedding)::bit(1536)) bit_hamming_ops)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade: Drop the quantized embedding indexes."""
+    op.execute("DROP INDEX IF EXISTS idx_entries_embedding_bit")
+    op.execute("DROP INDEX IF EXISTS idx_entries_embedding_halfvec")
@@ -0,0 +1,55 @@
+"""Add entry_chunks for chunk-level embeddings of long entries
+
+Revision ID: 006
+Revises: 005
+Create Date: 2024-12-02 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from pgvector.sqlalchemy import Vector
+
+# revision identifiers, used by Alembic.
+revision = "006"
+down_revision = "005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Upgrade: Create entry_chunks with its own vector indexes."""
+    op.create_table(
+        'entry_chunks',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('entry_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('chunk_index', sa.Integer(), nullable=False),
+        sa.Column('start_char', sa.Integer(), nullable=False),
+        sa.Column('end_char', sa.Integer(), nullable=False),
+        sa.Column('embedding', Vector(1536), nullable=False),
+        sa.Column('embedding_model', sa.String(length=200), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.ForeignKeyConstraint(['entry_id'], ['journal_entries.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('entry_id', 'chunk_index', name='uq_entry_chunks_entry_index'),
+    )
+
+    # Same index set as journal_entries (005), one per embedding_storage mode
+    op.execute(
+        "CREATE INDEX idx_entry_chunks_embedding ON entry_chunks "
+        "USING hnsw (embedding vector_cosine_ops)"
+    )
+    op.execute(
+        "CREATE INDEX idx_entry_chunks_embedding_halfvec ON entry_chunks "
+        "USING hnsw ((embedding::halfvec(1536)) halfvec_cosine_ops)"
+    )
+    op.execute(
+        "CREATE INDEX idx_entry_chunks_embedding_bit ON entry_chunks "
+        "USING hnsw ((binary_quantize(embedding)::bit(1536)) bit_hamming_ops)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade: Drop entry_chunks."""
+    op.drop_table('entry_chunks')
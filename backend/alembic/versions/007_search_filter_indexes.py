@@ -0,0 +1,34 @@
+"""Add indexes for filtered search (themes GIN, created_at btree)
+
+Revision ID: 007
+Revises: 006
+Create Date: 2024-12-09 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "007"
+down_revision = "006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Upgrade: Index the columns search filters run on."""
+    # Only updates to the installed library's version; hnsw.iterative_scan /
+    # ivfflat.iterative_scan (settings.vector_iterative_scan) need pgvector 0.8+
+    op.execute("ALTER EXTENSION vector UPDATE")
+
+    # themes && ARRAY[...] (SearchFilters.themes)
+    op.execute("CREATE INDEX idx_entries_themes_gin ON journal_entries USING gin (themes)")
+
+    # created_at ranges (SearchFilters.created_after / created_before)
+    op.execute("CREATE INDEX idx_entries_created_at ON journal_entries (created_at)")
+
+
+def downgrade() -> None:
+    """Downgrade: Drop the search filter indexes."""
+    op.execute("DROP INDEX IF EXISTS idx_entries_created_at")
+    op.execute("DROP INDEX IF EXISTS idx_entries_themes_gin")
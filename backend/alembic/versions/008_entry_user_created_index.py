@@ -0,0 +1,29 @@
+"""Add a (user_id, created_at) index for per-user time-window queries
+
+Revision ID: 008
+Revises: 007
+Create Date: 2024-12-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "008"
+down_revision = "007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Upgrade: Index entries by user and creation time."""
+    # Theme analytics and timelines scan one user's entries in a created_at
+    # range; the themes GIN index (migration 007) covers theme filters
+    op.execute(
+        "CREATE INDEX idx_entries_user_created_at ON journal_entries (user_id, created_at)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade: Drop the per-user time index."""
+    op.execute("DROP INDEX IF EXISTS idx_entries_user_created_at")
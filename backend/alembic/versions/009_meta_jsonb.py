@@ -0,0 +1,53 @@
+"""Convert meta columns from JSON to JSONB and index hot meta paths
+
+Revision ID: 009
+Revises: 008
+Create Date: 2024-12-23 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "009"
+down_revision = "008"
+branch_labels = None
+depends_on = None
+
+META_TABLES = ("journal_entries", "entities", "user_preferences", "master_entities")
+
+
+def _convert_meta(table: str, type_name: str) -> None:
+    """Change a meta column's type in place (the '{}' default is re-created for the new type)."""
+    op.execute(f"ALTER TABLE {table} ALTER COLUMN meta DROP DEFAULT")
+    op.execute(f"ALTER TABLE {table} ALTER COLUMN meta TYPE {type_name} USING meta::{type_name}")
+    op.execute(f"ALTER TABLE {table} ALTER COLUMN meta SET DEFAULT '{{}}'::{type_name}")
+
+
+def upgrade() -> None:
+    """Upgrade: Store meta as JSONB and index the paths search filters on."""
+    # Rewrites each table (ACCESS EXCLUSIVE lock while it runs)
+    for table in META_TABLES:
+        _convert_meta(table, "jsonb")
+
+    # SearchFilters.emotions; the expression must match
+    # app.services.search_filters.meta_path("sentiment", "emotion")
+    op.execute(
+        "CREATE INDEX idx_entries_meta_emotion ON journal_entries "
+        "(((meta -> 'sentiment') ->> 'emotion'))"
+    )
+    # Containment on extracted entities: SearchFilters.vendor_statuses
+    # (meta -> 'entities' @> '{"vendors": [{"status": ...}]}') and cost_categories
+    op.execute(
+        "CREATE INDEX idx_entries_meta_entities ON journal_entries "
+        "USING gin ((meta -> 'entities') jsonb_path_ops)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade: Drop the meta indexes and convert meta back to JSON."""
+    op.execute("DROP INDEX IF EXISTS idx_entries_meta_entities")
+    op.execute("DROP INDEX IF EXISTS idx_entries_meta_emotion")
+
+    for table in META_TABLES:
+        _convert_meta(table, "json")
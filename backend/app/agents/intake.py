@@ -2,87 +2,323 @@
 
 import json
 import logging
+import time
 from typing import Optional, Any
-from openai import AsyncOpenAI
+from pydantic import ValidationError
 from app.config import settings
-from app.agents.prompts import INTAKE_AGENT_PROMPT
+from app.agents.prompts import (
+    INTAKE_AGENT_PROMPT,
+    INTAKE_AGENT_PROMPT_COMPACT,
+    INTAKE_CONTEXT_TEMPLATE,
+)
+from app.agents.tokens import TokenUsage, count_message_tokens, count_tokens, size_max_tokens
+from app.schemas.extraction import IntakeExtraction
+from app.services.compute import run_cpu_bound
+from app.services.llm_client import get_llm_client
+from app.services.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
-# Initialize OpenAI client
-client = AsyncOpenAI(api_key=settings.openai_api_key)
+INTAKE_PROMPTS = {
+    "full": INTAKE_AGENT_PROMPT,
+    "compact": INTAKE_AGENT_PROMPT_COMPACT,
+}
+
+# Completion sizing: the JSON skeleton plus roughly 1.5 output tokens per entry token
+INTAKE_OUTPUT_BASE_TOKENS = 300
+INTAKE_OUTPUT_RATIO = 1.5
+
+INTAKE_ROUTES = ("fast", "large")
+
+
+async def _complete(model: str, messages: list[dict[str, str]], max_tokens: int) -> Any:
+    return await get_llm_client().chat_completion(
+        estimated_tokens=count_message_tokens(messages, model) + max_tokens,
+        model=model,
+        messages=messages,
+        temperature=0.3,  # Lower temperature for consistency
+        max_tokens=max_tokens,
+        response_format={"type": "json_object"},  # Ensure JSON response
+    )
+
+
+def _low_confidence(result: IntakeExtraction) -> bool:
+    # Models sometimes omit the field; only an explicit low score escalates
+    return result.confidence is not None and result.confidence < settings.intake_min_confidence
+
+
+def _parse_reply(response_text: str) -> tuple[Optional[IntakeExtraction], Optional[str], int]:
+    """
+    Decode and validate a reply in one pass (pydantic-core's JSON parser).
+
+    Returns:
+        (extraction or None, problem, items dropped) where problem is None,
+        "invalid_json" or "schema" (salvaged: invalid items/fields dropped)
+    """
+    try:
+        return IntakeExtraction.model_validate_json(response_text), None, 0
+    except ValidationError as e:
+        if any(error["type"] == "json_invalid" for error in e.errors()):
+            return None, "invalid_json", 0
+
+    try:
+        result, dropped = IntakeExtraction.salvage(json.loads(response_text))
+    except ValidationError:
+        return None, "invalid_json", 0  # valid JSON, but not an object
+    # Only nulls for defaulted fields: a valid reply, just not in canonical form
+    return result, "schema" if dropped else None, dropped
+
+
+async def _extract(
+    model: str,
+    messages: list[dict[str, str]],
+    max_tokens: int,
+    estimated_prompt_tokens: int,
+    retry_on_length: bool,
+) -> tuple[Optional[IntakeExtraction], TokenUsage, Optional[str]]:
+    """
+    Run one extraction and check the reply.
+
+    Returns:
+        (extraction or None, usage, problem) where problem is None,
+        "length", "invalid_json" or "schema" (salvaged, but off-schema)
+    """
+    response = await _complete(model, messages, max_tokens)
+    usage = TokenUsage.from_response(response, model, estimated_prompt_tokens)
+    _record_usage(usage)
+
+    # A truncated reply is invalid JSON; retry once with the full limit
+    if (
+        response.choices[0].finish_reason == "length"
+        and retry_on_length
+        and max_tokens < settings.intake_max_tokens_ceiling
+    ):
+        logger.warning(f"Intake reply hit max_tokens={max_tokens}, retrying with ceiling")
+        metrics.increment("llm_length_retries_total", agent="intake")
+        response = await _complete(model, messages, settings.intake_max_tokens_ceiling)
+        retry_usage = TokenUsage.from_response(response, model, estimated_prompt_tokens)
+        _record_usage(retry_usage)
+        usage = usage + retry_usage
+
+    if response.choices[0].finish_reason == "length":
+        logger.warning(f"{model} reply truncated at max_tokens")
+        return None, usage, "length"
+
+    # Extract and parse the response
+    response_text = response.choices[0].message.content
+    logger.info(f"OpenAI response received: {len(response_text)} characters")
+
+    # Parse and validate (off the event loop for unusually large payloads)
+    parse_started = time.perf_counter()
+    result, problem, dropped = await run_cpu_bound(
+        _parse_reply,
+        response_text,
+        size=len(response_text),
+        threshold=settings.compute_json_offload_bytes,
+    )
+    metrics.observe("intake_parse_seconds", time.perf_counter() - parse_started, model=model)
+
+    if problem == "invalid_json":
+        logger.error(f"{model} reply is not a valid JSON object")
+    elif problem == "schema":
+        logger.warning(f"{model} reply does not match the extraction schema ({dropped} dropped)")
+
+    return result, usage, problem
+
+
+def _record_usage(usage: TokenUsage) -> None:
+    labels = {"agent": "intake", "model": usage.model}
+    metrics.increment("llm_tokens_total", usage.prompt_tokens, kind="prompt", **labels)
+    metrics.increment("llm_tokens_total", usage.completion_tokens, kind="completion", **labels)
+    metrics.increment("llm_tokens_total", usage.cached_tokens, kind="cached", **labels)
+    if usage.cost_usd is not None:
+        metrics.increment("llm_cost_usd_total", usage.cost_usd, **labels)
+        metrics.observe("llm_cost_usd_per_call", usage.cost_usd, **labels)
 
 
 class IntakeAgent:
-    """Agent for extracting entities and tasks from journal entries using OpenAI GPT-4."""
+    """Agent for extracting entities and tasks from journal entries using OpenAI models."""
+
+    @staticmethod
+    def build_messages(
+        text: str,
+        language: str = "en",
+        context: Optional[str] = None,
+        prompt_variant: Optional[str] = None,
+    ) -> list[dict[str, str]]:
+        """
+        Build the chat messages for an intake call.
+
+        Static instructions come first and are byte-identical across calls, so
+        the provider's prompt-prefix cache can reuse them; everything that
+        varies per entry (retrieved context, language, entry text) follows in
+        the user message.
+
+        Args:
+            text: The journal entry text
+            language: Language of the entry
+            context: Retrieved context block, if any
+            prompt_variant: "compact" or "full" (default: settings.intake_prompt_variant)
+
+        Returns:
+            Messages for chat.completions.create
+        """
+        variant = prompt_variant or settings.intake_prompt_variant
+        if variant not in INTAKE_PROMPTS:
+            raise ValueError(f"Unknown intake prompt variant: {variant}")
+
+        context_block = ""
+        if context:
+            context_block = INTAKE_CONTEXT_TEMPLATE.format(context=context) + "\n\n"
+
+        user_prompt = f"""{context_block}Process this journal entry and extract structured information:
+
+Language: {language}
+
+Entry:
+{text}
+
+Return valid JSON following the schema provided."""
+
+        return [
+            {"role": "system", "content": INTAKE_PROMPTS[variant]},
+            {"role": "user", "content": user_prompt},
+        ]
+
+    @staticmethod
+    def choose_route(entry_tokens: int) -> str:
+        """
+        Pick the model route for an entry.
+
+        Short entries (one-line notes, quick updates) go to the fast model;
+        longer ones, which carry more entities and cross-references, go
+        straight to the large model.
+
+        Args:
+            entry_tokens: Tokens in the entry text
+
+        Returns:
+            "fast" or "large"
+        """
+        short = entry_tokens <= settings.intake_fast_max_entry_tokens
+        if settings.intake_routing_enabled and short:
+            return "fast"
+        return "large"
 
     @staticmethod
     async def process_entry(
         text: str,
         language: str = "en",
+        context: Optional[str] = None,
+        route: Optional[str] = None,
+        escalate: bool = True,
     ) -> dict[str, Any]:
         """
         Process a journal entry and extract entities, tasks, and insights.
 
+        The fast model's reply is validated against IntakeExtraction; if it
+        is truncated, not valid JSON, off-schema or below
+        settings.intake_min_confidence, the entry is re-run on the large model.
+
         Args:
             text: The journal entry text
             language: Language of the entry (en, ta, hi, etc.)
+            context: Retrieved prior entries/entities (see MemoryAgent.build_intake_context)
+                used to resolve references like "the caterer we liked"
+            route: Force "fast" or "large" (default: choose_route)
+            escalate: Re-run fast-route failures on the large model
 
         Returns:
-            Dictionary with extracted entities, tasks, themes, sentiment, etc.
+            Dictionary with the validated IntakeExtraction ('extraction') and its
+            dict form ('data'), plus the route taken and token 'usage' and cost
         """
         try:
             logger.info(f"Processing journal entry ({language}): {len(text)} characters")
+            if context:
+                logger.info(f"Including {len(context)} characters of retrieved context")
 
-            # Create the prompt for OpenAI
-            user_prompt = f"""Process this journal entry and extract structured information:
+            large_model = settings.intake_large_model
+            messages = IntakeAgent.build_messages(text, language, context)
+            estimated_prompt_tokens = count_message_tokens(messages, large_model)
+            entry_tokens = count_tokens(text, large_model)
 
-Language: {language}
+            # Output grows with the entry (more entities and tasks), not with the prompt
+            max_tokens = size_max_tokens(
+                entry_tokens,
+                base=INTAKE_OUTPUT_BASE_TOKENS,
+                ratio=INTAKE_OUTPUT_RATIO,
+                floor=settings.intake_max_tokens_floor,
+                ceiling=settings.intake_max_tokens_ceiling,
+            )
 
-Entry:
-{text}
+            route = route or IntakeAgent.choose_route(entry_tokens)
+            if route not in INTAKE_ROUTES:
+                raise ValueError(f"Unknown intake route: {route}")
+            model = settings.intake_fast_model if route == "fast" else large_model
+            started = time.perf_counter()
 
-Return valid JSON following the schema provided."""
+            logger.info(
+                f"Calling {model} for entity extraction (route={route}, "
+                f"~{estimated_prompt_tokens} prompt tokens, max_tokens={max_tokens})"
+            )
+            result, usage, problem = await _extract(
+                model,
+                messages,
+                max_tokens,
+                estimated_prompt_tokens,
+                retry_on_length=route == "large",
+            )
+
+            if route == "fast" and problem is None and _low_confidence(result):
+                problem = "low_confidence"
 
-            # Call OpenAI GPT-4 Turbo
-            logger.info("Calling OpenAI GPT-4 for entity extraction")
-            response = await client.chat.completions.create(
-                model="gpt-4-turbo-preview",
-                messages=[
-                    {"role": "system", "content": INTAKE_AGENT_PROMPT},
-                    {"role": "user", "content": user_prompt},
-                ],
-                temperature=0.3,  # Lower temperature for consistency
-                max_tokens=2000,
-                response_format={"type": "json_object"},  # Ensure JSON response
+            if route == "fast" and problem and escalate:
+                logger.info(f"Escalating entry to {large_model} ({problem})")
+                metrics.increment("intake_escalations_total", reason=problem)
+                route, model = "escalated", large_model
+                result, retry_usage, problem = await _extract(
+                    model, messages, max_tokens, estimated_prompt_tokens, retry_on_length=True
+                )
+                usage = usage + retry_usage
+
+            elapsed = time.perf_counter() - started
+            metrics.increment("intake_requests_total", route=route)
+            metrics.observe("intake_route_seconds", elapsed, route=route)
+            if usage.cost_usd is not None:
+                metrics.increment("intake_cost_usd_total", usage.cost_usd, route=route)
+            logger.info(
+                f"Intake route {route} took {elapsed:.2f}s: {usage.prompt_tokens} prompt "
+                f"({usage.cached_tokens} cached) + {usage.completion_tokens} completion tokens, "
+                f"cost ${usage.cost_usd or 0:.5f}"
             )
 
-            # Extract and parse the response
-            response_text = response.choices[0].message.content
-            logger.info(f"OpenAI response received: {len(response_text)} characters")
+            if result is None:
+                return {
+                    "success": False,
+                    "error": f"Invalid JSON from LLM ({problem})",
+                    "data": None,
+                    "route": route,
+                    "usage": usage.model_dump(),
+                }
+            if problem == "schema":
+                logger.warning(f"Accepting salvaged extraction from {model}")
 
-            # Parse JSON response
-            result = json.loads(response_text)
             logger.info(
-                f"Extracted entities - vendors: {len(result.get('entities', {}).get('vendors', []))}, "
-                f"tasks: {len(result.get('tasks', {}).get('explicit', []))} explicit + "
-                f"{len(result.get('tasks', {}).get('implicit', []))} implicit"
+                f"Extracted entities - vendors: {len(result.entities.vendors)}, "
+                f"tasks: {len(result.tasks.explicit)} explicit + "
+                f"{len(result.tasks.implicit)} implicit"
             )
 
             return {
                 "success": True,
-                "data": result,
-                "model": "gpt-4-turbo-preview",
-                "tokens_used": response.usage.total_tokens,
+                "data": result.model_dump(),
+                "extraction": result,
+                "model": model,
+                "route": route,
+                "tokens_used": usage.total_tokens,
+                "usage": usage.model_dump(),
             }
 
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse OpenAI JSON response: {str(e)}")
-            return {
-                "success": False,
-                "error": f"Invalid JSON from LLM: {str(e)}",
-                "data": None,
-            }
         except Exception as e:
             logger.error(f"Intake agent error: {str(e)}", exc_info=True)
             return {
@@ -97,8 +333,8 @@ Return valid JSON following the schema provided."""
         logger.info("Extracting entities from text")
         result = await IntakeAgent.process_entry(text)
 
-        if result["success"] and result["data"]:
-            return result["data"].get("entities", {})
+        if result["success"]:
+            return result["extraction"].entities.model_dump()
         return {}
 
     @staticmethod
@@ -107,8 +343,8 @@ Return valid JSON following the schema provided."""
         logger.info("Extracting tasks from text")
         result = await IntakeAgent.process_entry(text)
 
-        if result["success"] and result["data"]:
-            return result["data"].get("tasks", {"explicit": [], "implicit": []})
+        if result["success"]:
+            return result["extraction"].tasks.model_dump()
         return {"explicit": [], "implicit": []}
 
     @staticmethod
@@ -117,6 +353,6 @@ Return valid JSON following the schema provided."""
         logger.info("Extracting sentiment from text")
         result = await IntakeAgent.process_entry(text)
 
-        if result["success"] and result["data"]:
-            return result["data"].get("sentiment", {"emotion": "neutral", "confidence": 0.5})
+        if result["success"]:
+            return result["extraction"].sentiment.model_dump()
         return {"emotion": "neutral", "confidence": 0.0}
@@ -1,11 +1,29 @@
 """Memory Agent - Semantic search and RAG using vector embeddings."""
 
+import asyncio
 import logging
-from typing import Optional
+from typing import Awaitable, Callable, Optional, Union
+import numpy as np
+from app.schemas.retrieval import RetrievalOptions
+from app.services.compute import run_cpu_bound
 from app.services.embeddings import EmbeddingsService
+from app.services.entry_batch import EntryBatch
+from app.services.retrieval import candidate_boosts, timed_stage
+
+# Loads full-precision embeddings for entry ids (row i for ids[i], zero if missing)
+VectorLoader = Callable[[list[str]], Awaitable[np.ndarray]]
 
 logger = logging.getLogger(__name__)
 
+# Rough characters-per-token ratio used to budget prompt context
+CONTEXT_CHARS_PER_TOKEN = 4
+
+# Entry snippets shorter than this are not worth their tokens
+MIN_CONTEXT_SNIPPET_CHARS = 80
+
+# Longest passage quoted per entry in retrieve_context (entries without passage vectors)
+MAX_CONTEXT_PASSAGE_CHARS = 600
+
 
 class MemoryAgent:
     """Agent for semantic search and retrieval-augmented generation."""
@@ -13,52 +31,91 @@ class MemoryAgent:
     @staticmethod
     async def search_entries(
         query: str,
-        entries: list[dict],
+        entries: Union[EntryBatch, list[dict]],
         top_k: int = 5,
+        query_embedding: Optional[list[float]] = None,
+        options: Optional[RetrievalOptions] = None,
+        vector_loader: Optional[VectorLoader] = None,
+        timings: Optional[dict[str, float]] = None,
     ) -> list[dict]:
         """
         Search journal entries using semantic similarity.
 
+        Two stages: the best `options.candidates` entries are picked from
+        the batch (quantized scores when the batch is quantized), then
+        re-scored with full-precision cosine similarity from `vector_loader`
+        and, if enabled, recency / theme / entity boosts. For an exact
+        (float32) batch without boosts this is a plain top_k search.
+
         Args:
             query: Search query text
-            entries: List of journal entries with embeddings
+            entries: EntryBatch (or list of entry dicts with embeddings)
             top_k: Number of top results to return
+            query_embedding: Precomputed query embedding (skips the embeddings call)
+            options: Retrieval pipeline options (default: RetrievalOptions())
+            vector_loader: Source of full-precision vectors for the re-rank
+            timings: Filled with per-stage durations in milliseconds
 
         Returns:
             List of matching entries ranked by relevance
         """
         try:
             logger.info(f"Searching {len(entries)} entries for: {query}")
+            options = options or RetrievalOptions()
 
             # Generate embedding for query
-            query_embedding = await EmbeddingsService.embed_text(query)
-
-            # Calculate similarity scores using cosine similarity
-            results = []
-            for entry in entries:
-                if "embedding" not in entry:
-                    logger.warning(f"Entry {entry.get('id')} missing embedding, skipping")
-                    continue
-
-                similarity = MemoryAgent._cosine_similarity(
-                    query_embedding, entry["embedding"]
+            if query_embedding is None:
+                with timed_stage(timings, "embed"):
+                    query_embedding = await EmbeddingsService.embed_query(query)
+
+            # Vectors from a different embedding model are not comparable
+            model_tag = EmbeddingsService.model_tag()
+
+            if not isinstance(entries, EntryBatch):
+                if not options.boosted:
+                    # Scores are exact already; use the compute pool when the set is large
+                    with timed_stage(timings, "candidates"):
+                        results = await run_cpu_bound(
+                            _score_entries, query_embedding, entries, model_tag, top_k,
+                            size=len(entries),
+                        )
+                    logger.info(f"Found {len(results)} relevant entries")
+                    return results
+                entries = await asyncio.to_thread(EntryBatch.coerce, entries, model_tag)
+
+            rerank = entries.approximate and options.rerank
+            pool = max(options.candidates, top_k) if rerank or options.boosted else top_k
+
+            # Stage 1: one matrix-vector product that releases the GIL; shipping
+            # the matrix to a worker process would cost more than scoring it
+            with timed_stage(timings, "candidates"):
+                indices, scores = await asyncio.to_thread(
+                    _top_candidates, query_embedding, entries, pool
                 )
 
-                results.append(
-                    {
-                        "id": entry.get("id"),
-                        "text": entry.get("text", "")[:200],  # Preview
-                        "date": entry.get("date"),
-                        "relevance_score": similarity,
-                        "full_text": entry.get("text"),
-                        "entities": entry.get("entities", {}),
-                        "sentiment": entry.get("sentiment"),
-                    }
-                )
-
-            # Sort by relevance and return top_k
-            results.sort(key=lambda x: x["relevance_score"], reverse=True)
-            results = results[:top_k]
+            # Best passage of each candidate (long entries), for max-sim and citations
+            passage_scores, passage_rows = entries.best_chunks(indices, query_embedding)
+
+            # Stage 2: exact scores and boosts for the candidates only
+            if rerank and len(indices):
+                if vector_loader is None:
+                    logger.warning(
+                        "No full-precision vectors to re-rank with, using approximate scores"
+                    )
+                else:
+                    with timed_stage(timings, "rerank"):
+                        vectors = await vector_loader([entries.ids[i] for i in indices.tolist()])
+                        scores = _exact_scores(vectors, query_embedding, scores)
+                        scores = np.fmax(scores, passage_scores)
+
+            if options.boosted and len(indices):
+                with timed_stage(timings, "boost"):
+                    scores = scores + candidate_boosts(entries, indices, query, options)
+
+            results = [
+                entries.result(int(indices[j]), scores[j], int(passage_rows[j]))
+                for j in _ranked(indices, scores, top_k)
+            ]
 
             logger.info(f"Found {len(results)} relevant entries")
             return results
@@ -68,12 +125,12 @@ class MemoryAgent:
             raise
 
     @staticmethod
-    async def find_contradictions(entries: list[dict]) -> list[dict]:
+    async def find_contradictions(entries: Union[EntryBatch, list[dict]]) -> list[dict]:
         """
         Detect contradictions across journal entries.
 
         Args:
-            entries: List of journal entries with extracted data
+            entries: EntryBatch (or list of journal entries with extracted data)
 
         Returns:
             List of detected contradictions
@@ -81,78 +138,7 @@ class MemoryAgent:
         try:
             logger.info(f"Analyzing {len(entries)} entries for contradictions")
 
-            contradictions = []
-
-            # Check budget contradictions
-            total_budget = None
-            current_spending = 0
-
-            for entry in entries:
-                costs = entry.get("entities", {}).get("costs", [])
-                for cost in costs:
-                    amount = cost.get("amount", 0)
-                    category = cost.get("category", "")
-
-                    if category == "total budget":
-                        total_budget = amount
-                    else:
-                        current_spending += amount
-
-            if total_budget and current_spending > total_budget * 1.2:  # >20% over
-                contradictions.append(
-                    {
-                        "type": "budget_overrun",
-                        "severity": "high",
-                        "description": f"Budget overrun: Spent ${current_spending} of ${total_budget} (${current_spending - total_budget} over)",
-                        "budget": total_budget,
-                        "spent": current_spending,
-                    }
-                )
-
-            # Check timeline pressure
-            pending_tasks = 0
-            days_to_wedding = None
-
-            for entry in entries:
-                tasks = entry.get("tasks", {}).get("explicit", [])
-                pending_tasks += len([t for t in tasks if t.get("status") == "pending"])
-
-                dates = entry.get("entities", {}).get("dates", [])
-                for date_obj in dates:
-                    if date_obj.get("event") == "wedding":
-                        # Would need date calculation here
-                        pass
-
-            if pending_tasks > 5 and days_to_wedding and days_to_wedding < 30:
-                contradictions.append(
-                    {
-                        "type": "timeline_pressure",
-                        "severity": "high",
-                        "description": f"Timeline pressure: {pending_tasks} tasks pending with <30 days to wedding",
-                        "pending_tasks": pending_tasks,
-                        "days_remaining": days_to_wedding,
-                    }
-                )
-
-            # Check vendor conflicts (same vendor booked multiple times)
-            vendors_seen = {}
-            for entry in entries:
-                vendors = entry.get("entities", {}).get("vendors", [])
-                for vendor in vendors:
-                    vendor_name = vendor.get("name", "").lower()
-                    if vendor_name in vendors_seen:
-                        if vendor.get("status") == "booked":
-                            contradictions.append(
-                                {
-                                    "type": "vendor_conflict",
-                                    "severity": "medium",
-                                    "description": f"Vendor booked multiple times: {vendor.get('name')}",
-                                    "vendor": vendor.get("name"),
-                                    "entries": [vendors_seen[vendor_name], entry.get("id")],
-                                }
-                            )
-                    else:
-                        vendors_seen[vendor_name] = entry.get("id")
+            contradictions = await run_cpu_bound(_find_contradictions, entries, size=len(entries))
 
             logger.info(f"Found {len(contradictions)} contradictions")
             return contradictions
@@ -186,14 +172,17 @@ class MemoryAgent:
                 query, entries, top_k=num_context
             )
 
-            # Format as context
+            # Format as context: the passage that matched, not the whole entry
             context_parts = []
             for i, entry in enumerate(similar, 1):
                 score = f"{entry['relevance_score']:.2%}"
+                passage = entry.get("passage") or entry["text"]
+                if len(passage) > MAX_CONTEXT_PASSAGE_CHARS:
+                    passage = passage[: MAX_CONTEXT_PASSAGE_CHARS - 3].rstrip() + "..."
                 context_parts.append(
                     f"[Similar Entry {i} - Relevance: {score}]\n"
                     f"Date: {entry.get('date')}\n"
-                    f"Text: {entry['text']}\n"
+                    f"Text: {passage}\n"
                     f"Sentiment: {entry.get('sentiment', {}).get('emotion', 'unknown')}\n"
                 )
 
@@ -206,6 +195,122 @@ class MemoryAgent:
             logger.error(f"Context retrieval failed: {str(e)}", exc_info=True)
             raise
 
+    @staticmethod
+    def build_intake_context(
+        entries: list[dict],
+        entities: list[dict],
+        max_tokens: int = 600,
+    ) -> str:
+        """
+        Pack related entries and known entities into a token-budgeted prompt block.
+
+        Entities come first (they are short and are what references like "the
+        caterer we liked" resolve to) and may use at most half the budget;
+        entries fill the rest in relevance order, the last one truncated to fit.
+        Tokens are estimated from characters, so packing is a few string
+        operations and adds no measurable latency before the LLM call.
+
+        Args:
+            entries: Related entries (best first) with 'text' and optional 'date'
+            entities: Known entities with 'entity_type', 'canonical_name' and
+                optional 'mention_count' / 'decision_made'
+            max_tokens: Token budget for the whole block
+
+        Returns:
+            Context string ("" when there is nothing to add)
+        """
+        budget = max_tokens * CONTEXT_CHARS_PER_TOKEN
+
+        entity_lines = []
+        entity_budget = budget // 2
+        for entity in entities:
+            details = []
+            if entity.get("mention_count", 1) > 1:
+                details.append(f"{entity['mention_count']} mentions")
+            if entity.get("decision_made"):
+                details.append("decided")
+            suffix = f" ({', '.join(details)})" if details else ""
+            line = f"- {entity['entity_type']}: {entity['canonical_name']}{suffix}"
+
+            if len(line) + 1 > entity_budget:
+                break
+            entity_lines.append(line)
+            entity_budget -= len(line) + 1
+
+        sections = []
+        if entity_lines:
+            sections.append("Known entities:\n" + "\n".join(entity_lines))
+        remaining = budget - sum(len(section) + 2 for section in sections)
+
+        entry_lines = []
+        remaining -= len("Related entries:\n")
+        for entry in entries:
+            text = " ".join((entry.get("text") or "").split())
+            if not text:
+                continue
+            date = (entry.get("date") or "")[:10]
+            prefix = f"- [{date}] " if date else "- "
+
+            room = remaining - len(prefix) - 1
+            if room < MIN_CONTEXT_SNIPPET_CHARS:
+                break
+            if len(text) > room:
+                text = text[: room - 3].rstrip() + "..."
+
+            line = prefix + text
+            entry_lines.append(line)
+            remaining -= len(line) + 1
+
+        if entry_lines:
+            sections.append("Related entries:\n" + "\n".join(entry_lines))
+
+        return "\n\n".join(sections)
+
+    @staticmethod
+    def reciprocal_rank_fusion(
+        rankings: list[list[dict]],
+        top_k: int = 5,
+        k: int = 60,
+    ) -> list[dict]:
+        """
+        Fuse several ranked result lists with reciprocal rank fusion (RRF).
+
+        Each entry scores sum(1 / (k + rank)) over the lists it appears in, so
+        entries ranked well by both keyword and vector retrieval rise to the top
+        without having to calibrate the two score scales against each other.
+
+        Args:
+            rankings: Ranked result lists (best first), items keyed by 'id'
+            top_k: Number of fused results to return
+            k: RRF damping constant (60 is the standard choice)
+
+        Returns:
+            Fused results with 'relevance_score' normalized to 0-1
+        """
+        if not rankings:
+            return []
+
+        fused: dict[str, dict] = {}
+        scores: dict[str, float] = {}
+
+        for ranking in rankings:
+            for rank, item in enumerate(ranking, 1):
+                item_id = item.get("id")
+                scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (k + rank)
+                if item_id not in fused:
+                    fused[item_id] = dict(item)
+
+        # Best possible score: rank 1 in every list
+        max_score = len(rankings) / (k + 1)
+
+        results = []
+        for item_id, item in fused.items():
+            item["relevance_score"] = scores[item_id] / max_score
+            results.append(item)
+
+        results.sort(key=lambda x: (-x["relevance_score"], str(x.get("id"))))
+        return results[:top_k]
+
     @staticmethod
     def _cosine_similarity(vec1: list[float], vec2: list[float]) -> float:
         """
@@ -229,3 +334,120 @@ class MemoryAgent:
             return 0.0
 
         return dot_product / (magnitude1 * magnitude2)
+
+
+def _top_candidates(
+    query_embedding: list[float], batch: EntryBatch, top_k: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Rows of the top_k entries by similarity and their scores, unordered (CPU-bound)."""
+    # Cosine similarity for every entry at once (rows are pre-normalized)
+    scores = batch.similarities(query_embedding)
+    candidates = np.flatnonzero(~np.isnan(scores))
+    skipped = len(batch) - len(candidates)
+    if skipped:
+        logger.warning(f"{skipped} entries have no comparable embedding, skipping")
+    if top_k <= 0 or len(candidates) == 0:
+        return candidates[:0], scores[:0]
+
+    if top_k < len(candidates):
+        candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+    return candidates, scores[candidates]
+
+
+def _exact_scores(
+    vectors: np.ndarray, query_embedding: list[float], fallback: np.ndarray
+) -> np.ndarray:
+    """Full-precision cosine similarities (fallback scores where a vector is missing)."""
+    query = np.asarray(query_embedding, dtype=np.float32)
+    query_norm = np.linalg.norm(query)
+    if vectors.shape[1:] != query.shape or query_norm == 0:
+        logger.warning("Cannot re-rank: full-precision vectors do not match the query")
+        return fallback
+
+    norms = np.linalg.norm(vectors, axis=1)
+    exact = vectors @ (query / query_norm)
+    np.divide(exact, norms, out=exact, where=norms > 0)
+    return np.where(norms > 0, exact, fallback).astype(np.float32)
+
+
+def _ranked(indices: np.ndarray, scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Positions of the top_k scores, best first; ties keep entry order."""
+    return np.lexsort((indices, -scores))[: max(top_k, 0)]
+
+
+def _score_entries(
+    query_embedding: list[float],
+    entries: Union[EntryBatch, list[dict]],
+    model_tag: str,
+    top_k: int,
+) -> list[dict]:
+    """Score entries against the query embedding and return the top_k (CPU-bound)."""
+    batch = EntryBatch.coerce(entries, model_tag)
+    indices, scores = _top_candidates(query_embedding, batch, top_k)
+    _, passage_rows = batch.best_chunks(indices, query_embedding)
+    return [
+        batch.result(int(indices[j]), scores[j], int(passage_rows[j]))
+        for j in _ranked(indices, scores, top_k)
+    ]
+
+
+def _find_contradictions(entries: Union[EntryBatch, list[dict]]) -> list[dict]:
+    """Detect budget, timeline and vendor contradictions (CPU-bound)."""
+    batch = EntryBatch.coerce(entries)
+    contradictions = []
+
+    # Check budget contradictions
+    costs = batch.costs
+    is_budget = costs["category"].mask("total budget")
+    budget_amounts = costs["amount"][is_budget]
+    total_budget = float(budget_amounts[-1]) if len(budget_amounts) else None
+    current_spending = float(costs["amount"][~is_budget].sum())
+
+    if total_budget and current_spending > total_budget * 1.2:  # >20% over
+        contradictions.append(
+            {
+                "type": "budget_overrun",
+                "severity": "high",
+                "description": f"Budget overrun: Spent ${current_spending} of ${total_budget} (${current_spending - total_budget} over)",
+                "budget": total_budget,
+                "spent": current_spending,
+            }
+        )
+
+    # Check timeline pressure (wedding date arithmetic is done by InsightAgent)
+    pending_tasks = int(batch.tasks["status"].mask("pending").sum())
+    days_to_wedding = None
+
+    if pending_tasks > 5 and days_to_wedding and days_to_wedding < 30:
+        contradictions.append(
+            {
+                "type": "timeline_pressure",
+                "severity": "high",
+                "description": f"Timeline pressure: {pending_tasks} tasks pending with <30 days to wedding",
+                "pending_tasks": pending_tasks,
+                "days_remaining": days_to_wedding,
+            }
+        )
+
+    # Check vendor conflicts (same vendor booked multiple times)
+    vendors = batch.vendors
+    vendors_seen = {}
+    for name, status, owner in zip(
+        vendors["name"], vendors["status"].decode(), vendors.owner.tolist()
+    ):
+        vendor_name = name.lower()
+        if vendor_name in vendors_seen:
+            if status == "booked":
+                contradictions.append(
+                    {
+                        "type": "vendor_conflict",
+                        "severity": "medium",
+                        "description": f"Vendor booked multiple times: {name}",
+                        "vendor": name,
+                        "entries": [vendors_seen[vendor_name], batch.ids[owner]],
+                    }
+                )
+        else:
+            vendors_seen[vendor_name] = batch.ids[owner]
+
+    return contradictions
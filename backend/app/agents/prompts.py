@@ -41,7 +41,8 @@ Return a JSON object with this structure:
     "themes": ["budget", "eco-friendly", "traditional", "modern", "cultural", "stress", "excitement", "uncertainty"],
     "sentiment": {{"emotion": "excited|stressed|confused|happy|anxious", "confidence": 0.0-1.0}},
     "timeline": "pre-wedding|post-wedding",
-    "summary": "brief 1-2 sentence summary of the entry"
+    "summary": "brief 1-2 sentence summary of the entry",
+    "confidence": 0.0-1.0
 }}
 
 Guidelines:
@@ -51,8 +52,26 @@ Guidelines:
 - Dates should be in YYYY-MM-DD format when parseable, otherwise null
 - Costs should be numeric values with currency specified separately
 - Sentiment confidence should reflect how certain you are (0.0 = unsure, 1.0 = very sure)
+- The top-level confidence is how sure you are of the extraction as a whole (ambiguous references,
+  unclear amounts or dates lower it)
 """
 
+# Intake Agent - Compact variant (same schema, minified; a fraction of the prompt tokens)
+INTAKE_AGENT_PROMPT_COMPACT = """Extract structured wedding-planning data from the user's journal entry. Reply with JSON only:
+{"entities":{"vendors":[{"name":str,"category":"catering|venue|photography|...","cost":num|null,"status":"interested|booked|rejected"}],"venues":[{"name":str,"type":"indoor|outdoor","capacity":num|null,"cost":num|null,"date":"YYYY-MM-DD"|null}],"costs":[{"category":str,"amount":num,"currency":"USD|INR|...","date":"YYYY-MM-DD"|null}],"dates":[{"event":"wedding|engagement|...","date":"YYYY-MM-DD","confirmed":bool}],"people":[{"name":str,"role":"family|friend|vendor|...","involvement":"high|medium|low"}]},
+"tasks":{"explicit":[{"task":str,"deadline":"YYYY-MM-DD"|null,"priority":"high|medium|low","assigned_to":"me"|name|null,"status":"pending"}],"implicit":[{"task":str,"deadline":"YYYY-MM-DD"|null,"priority":"high|medium|low","reason":str}]},
+"themes":[e.g. "budget","eco-friendly","traditional","modern","cultural","stress","excitement","uncertainty"],
+"sentiment":{"emotion":"excited|stressed|confused|happy|anxious","confidence":0-1},
+"timeline":"pre-wedding|post-wedding","summary":"1-2 sentences","confidence":0-1}
+Rules: only stated or clearly implied facts; null for unknowns; infer implicit tasks only when obvious; numeric costs with separate currency; confidences = certainty (top-level: whole extraction, lower for ambiguous references/amounts/dates)."""
+
+# Intake Agent - Retrieved context block (prior entries and known entities)
+INTAKE_CONTEXT_TEMPLATE = """Known context from earlier journal entries:
+{context}
+
+Use this context only to resolve references in the new entry (e.g. "the caterer we liked" -> the
+caterer's name). Extract only information stated or clearly implied by the new entry itself."""
+
 # Memory Agent - Semantic Search
 MEMORY_AGENT_PROMPT = """You are an AI assistant helping users retrieve relevant information from their wedding journal history.
 
@@ -0,0 +1,222 @@
+"""Token accounting for LLM calls: local token counts, max_tokens sizing and cost."""
+
+import asyncio
+import logging
+import math
+from typing import Any, Optional
+from pydantic import BaseModel, computed_field, model_validator
+
+logger = logging.getLogger(__name__)
+
+# Chat format overhead (per message, and for priming the assistant reply)
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+# USD per 1M tokens: (input, cached input, output)
+MODEL_PRICING: dict[str, tuple[float, float, float]] = {
+    "gpt-4-turbo-preview": (10.00, 10.00, 30.00),
+    "gpt-4-turbo": (10.00, 10.00, 30.00),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+}
+
+
+# Loaded tokenizers by model (None: unavailable, use the heuristic)
+_encodings: dict[str, Optional[Any]] = {}
+_encoding_loads: dict[str, asyncio.Task] = {}
+
+
+def _load_encoding(model: str) -> Optional[Any]:
+    """Load the model's tokenizer (None when tiktoken or its BPE files are unavailable)."""
+    try:
+        import tiktoken
+    except ImportError:
+        logger.info("tiktoken not installed, using heuristic token counts")
+        return None
+
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # First use downloads the BPE file, which fails offline
+        logger.warning(f"Could not load tokenizer for {model}, using heuristic: {str(e)}")
+        return None
+
+
+async def _load_encoding_async(model: str) -> None:
+    try:
+        _encodings[model] = await asyncio.to_thread(_load_encoding, model)
+    finally:
+        del _encoding_loads[model]
+
+
+def warm_encoding(model: str) -> None:
+    """
+    Start loading a model's tokenizer in a worker thread (e.g. at startup).
+
+    The first load may download and parse the BPE file; counts made before
+    it is ready use estimate_tokens.
+    """
+    if model not in _encodings and model not in _encoding_loads:
+        _encoding_loads[model] = asyncio.get_running_loop().create_task(
+            _load_encoding_async(model)
+        )
+
+
+def _get_encoding(model: str) -> Optional[Any]:
+    """The model's tokenizer, or None while it is loading or if it is unavailable."""
+    if model in _encodings:
+        return _encodings[model]
+    try:
+        warm_encoding(model)
+    except RuntimeError:
+        # No event loop to block (scripts, benchmarks): load it here
+        _encodings[model] = _load_encoding(model)
+        return _encodings[model]
+    return None
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate tokens without a tokenizer.
+
+    English BPE averages about 4 characters per token; Indic scripts are
+    split much more finely, so non-ASCII characters count as a token each.
+    """
+    if not text:
+        return 0
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    return math.ceil(ascii_chars / 4) + (len(text) - ascii_chars)
+
+
+def count_tokens(text: str, model: str) -> int:
+    """
+    Count tokens in text with the model's tokenizer (or the heuristic).
+
+    Args:
+        text: Text to count
+        model: Model name
+
+    Returns:
+        Number of tokens
+    """
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages: list[dict[str, str]], model: str) -> int:
+    """
+    Count prompt tokens for a chat completion request.
+
+    Args:
+        messages: Chat messages with 'role' and 'content'
+        model: Model name
+
+    Returns:
+        Number of prompt tokens
+    """
+    total = TOKENS_PER_REPLY
+    for message in messages:
+        total += TOKENS_PER_MESSAGE + count_tokens(message["content"], model)
+    return total
+
+
+def size_max_tokens(
+    input_tokens: int,
+    base: int,
+    ratio: float,
+    floor: int,
+    ceiling: int,
+) -> int:
+    """
+    Size a completion limit to the input instead of a fixed worst case.
+
+    Args:
+        input_tokens: Tokens of the variable input (e.g. the journal entry)
+        base: Tokens the output needs regardless of input (JSON skeleton)
+        ratio: Expected output tokens per input token
+        floor: Minimum limit
+        ceiling: Maximum limit
+
+    Returns:
+        max_tokens for the request
+    """
+    return max(floor, min(ceiling, base + math.ceil(input_tokens * ratio)))
+
+
+def price_usd(
+    model: str,
+    prompt_tokens: int,
+    completion_tokens: int,
+    cached_tokens: int = 0,
+) -> Optional[float]:
+    """Cost of a call in USD (None for models without known pricing)."""
+    pricing = MODEL_PRICING.get(model)
+    if pricing is None:
+        return None
+
+    input_price, cached_price, output_price = pricing
+    return (
+        (prompt_tokens - cached_tokens) * input_price
+        + cached_tokens * cached_price
+        + completion_tokens * output_price
+    ) / 1_000_000
+
+
+class TokenUsage(BaseModel):
+    """Token usage and cost of one LLM call (or several calls made for one request)."""
+
+    model: str
+    prompt_tokens: int
+    completion_tokens: int
+    cached_tokens: int = 0
+    estimated_prompt_tokens: Optional[int] = None
+    cost_usd: Optional[float] = None
+
+    @model_validator(mode="after")
+    def _price(self) -> "TokenUsage":
+        if self.cost_usd is None:
+            self.cost_usd = price_usd(
+                self.model, self.prompt_tokens, self.completion_tokens, self.cached_tokens
+            )
+        return self
+
+    @classmethod
+    def from_response(
+        cls,
+        response: Any,
+        model: str,
+        estimated_prompt_tokens: Optional[int] = None,
+    ) -> "TokenUsage":
+        """Build usage from an OpenAI chat completion response."""
+        usage = response.usage
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", 0) if details is not None else 0
+        return cls(
+            model=model,
+            prompt_tokens=usage.prompt_tokens,
+            completion_tokens=usage.completion_tokens,
+            cached_tokens=cached or 0,
+            estimated_prompt_tokens=estimated_prompt_tokens,
+        )
+
+    def __add__(self, other: "TokenUsage") -> "TokenUsage":
+        """Sum usage of retries/escalations; cost stays exact across models."""
+        unpriced = self.cost_usd is None or other.cost_usd is None
+        return TokenUsage(
+            model=self.model if self.model == other.model else f"{self.model}+{other.model}",
+            prompt_tokens=self.prompt_tokens + other.prompt_tokens,
+            completion_tokens=self.completion_tokens + other.completion_tokens,
+            cached_tokens=self.cached_tokens + other.cached_tokens,
+            estimated_prompt_tokens=self.estimated_prompt_tokens,
+            cost_usd=None if unpriced else self.cost_usd + other.cost_usd,
+        )
+
+    @computed_field
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
@@ -1,5 +1,7 @@
 """Configuration module for the application."""
 
+import os
+import tempfile
 from pydantic_settings import BaseSettings
 from typing import Optional
 
@@ -14,6 +16,91 @@ class Settings(BaseSettings):
     openai_api_key: str
     anthropic_api_key: Optional[str] = None
 
+    # OpenAI client resilience (shared by intake, embeddings and transcription)
+    openai_base_url: Optional[str] = None
+    llm_request_timeout_seconds: float = 60.0  # per attempt
+    llm_connect_timeout_seconds: float = 5.0
+    llm_max_retries: int = 3
+    llm_backoff_base_seconds: float = 0.5
+    llm_backoff_max_seconds: float = 8.0
+    llm_chat_deadline_seconds: float = 90.0  # all attempts together
+    llm_chat_hedge_after_seconds: Optional[float] = None  # hedging doubles cost on slow calls
+    llm_embeddings_deadline_seconds: float = 20.0
+    llm_embeddings_hedge_after_seconds: Optional[float] = 2.0
+    llm_transcription_deadline_seconds: float = 300.0
+    llm_circuit_failure_threshold: int = 5
+    llm_circuit_reset_seconds: float = 30.0
+
+    # Client-side OpenAI rate limits (match the account's limits for each model family)
+    llm_chat_requests_per_minute: int = 500
+    llm_chat_tokens_per_minute: int = 150_000
+    llm_chat_max_concurrency: int = 16
+    llm_embeddings_requests_per_minute: int = 3000
+    llm_embeddings_tokens_per_minute: int = 1_000_000
+    llm_embeddings_max_concurrency: int = 16
+    llm_audio_requests_per_minute: int = 50
+    llm_audio_max_concurrency: int = 8
+
+    # Embeddings
+    embeddings_backend: str = "openai"  # "openai" or "local"
+    local_embeddings_model: str = "sentence-transformers/all-MiniLM-L6-v2"
+    local_embeddings_workers: int = 2
+    # Index candidate distance: "float32", "float16" (halfvec), "int8" (halfvec) or "binary"
+    embedding_storage: str = "float32"
+    embedding_rerank_factor: int = 4  # candidates per result re-ranked at full precision
+    vector_iterative_scan: str = "off"  # "strict_order"/"relaxed_order" need pgvector 0.8+
+    vector_max_scan_tuples: int = 20000  # bound on a filtered iterative HNSW scan
+    query_embedding_cache_ttl_seconds: float = 300.0  # 0 disables the shared memo
+    query_embedding_cache_size: int = 512
+
+    # Chunk-level embeddings (entries longer than chunk_min_entry_chars get passage vectors)
+    chunk_min_entry_chars: int = 800
+    chunk_max_chars: int = 600
+    chunk_min_chars: int = 120
+
+    # Search result paging
+    search_max_results: int = 1000  # top_k is capped at this
+    search_page_size: int = 50  # page size when a cursor is followed without one
+    search_cursor_ttl_seconds: float = 600.0
+    search_max_cursors: int = 256  # rankings kept per worker
+
+    # CPU offload (process pool for scoring/analytics on large inputs)
+    compute_pool_workers: int = 2
+    compute_offload_threshold: int = 2000  # entries
+    compute_json_offload_bytes: int = 256 * 1024
+    event_loop_lag_interval: float = 0.5  # seconds
+
+    # Transcription
+    transcription_max_concurrency: int = 4
+    transcription_spool_memory_bytes: int = 1024 * 1024  # larger uploads spool to disk
+    transcription_long_audio_max_bytes: int = 500 * 1024 * 1024
+    transcription_segment_seconds: float = 300.0
+    transcription_segment_overlap_seconds: float = 3.0
+    transcription_segment_concurrency: int = 4
+    language_detection_sample_seconds: float = 30.0
+    transcription_cache_dir: str = os.path.join(
+        tempfile.gettempdir(), "wedding-journal-transcriptions"
+    )
+    transcription_cache_max_bytes: int = 50 * 1024 * 1024  # 0 disables the cache
+
+    # Retrieval-augmented intake (prior entries + known entities in the prompt)
+    intake_context_top_k: int = 5
+    intake_context_max_entities: int = 20
+    intake_context_max_tokens: int = 600
+    intake_context_timeout_seconds: float = 2.0  # intake proceeds without context after this
+
+    # LLM token budgeting
+    intake_prompt_variant: str = "compact"  # "compact" or "full"
+    intake_max_tokens_floor: int = 500
+    intake_max_tokens_ceiling: int = 2000
+
+    # Intake model routing (short entries to the fast model, escalate when unsure)
+    intake_routing_enabled: bool = True
+    intake_fast_model: str = "gpt-4o-mini"
+    intake_large_model: str = "gpt-4-turbo-preview"
+    intake_fast_max_entry_tokens: int = 200
+    intake_min_confidence: float = 0.6
+
     # Security
     secret_key: str
     algorithm: str = "HS256"
@@ -1,11 +1,18 @@
 """FastAPI main application."""
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from app.config import settings
 from app.routers import journal, tasks, user, transcription, entries, search, insights
+from app.agents.tokens import warm_encoding
 from app.services import init_db, close_db
+from app.services.embeddings import query_embedding_scope
+from app.services.compute import EventLoopLagMonitor, shutdown_compute_pool
+from app.services.metrics import metrics
+from app.services.rate_limiter import PRIORITIES, llm_request_context
+
+loop_lag_monitor = EventLoopLagMonitor(interval=settings.event_loop_lag_interval)
 
 
 @asynccontextmanager
@@ -15,11 +22,16 @@ async def lifespan(app: FastAPI):
     print("Starting up application...")
     await init_db()
     print("Database initialized")
+    loop_lag_monitor.start()
+    # Load the tokenizer off the event loop before the first intake request needs it
+    warm_encoding(settings.intake_large_model)
 
     yield
 
     # Shutdown
     print("Shutting down application...")
+    await loop_lag_monitor.stop()
+    shutdown_compute_pool()
     await close_db()
     print("Database closed")
 
@@ -41,6 +53,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def attribute_llm_calls(request: Request, call_next):
+    """
+    Tag OpenAI calls made for this request with a priority lane and a user.
+
+    Bulk importers send `X-Priority: backfill` so live traffic goes first;
+    `X-User-Id` (falling back to the client address) keys fair queueing.
+    Query embeddings are shared across the request (query_embedding_scope).
+    """
+    priority = request.headers.get("x-priority", "interactive")
+    if priority not in PRIORITIES:
+        priority = "interactive"
+    user = request.headers.get("x-user-id") or (request.client.host if request.client else None)
+
+    with llm_request_context(priority, user), query_embedding_scope():
+        return await call_next(request)
+
+
 # Include routers
 app.include_router(journal.router)
 app.include_router(tasks.router)
@@ -57,6 +88,12 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """In-process metrics (event-loop lag, compute offload, ...)."""
+    return metrics.snapshot()
+
+
 @app.get("/")
 async def root():
     """Root endpoint."""
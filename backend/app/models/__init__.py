@@ -2,7 +2,7 @@
 
 from .base import Base, TimestampMixin
 from .user import UserPreference
-from .journal import JournalEntry
+from .journal import JournalEntry, EntryChunk
 from .entity import Entity, MasterEntity
 from .task import Task, TaskPriority, TaskStatus
 
@@ -11,6 +11,7 @@ __all__ = [
     "TimestampMixin",
     "UserPreference",
     "JournalEntry",
+    "EntryChunk",
     "Entity",
     "MasterEntity",
     "Task",
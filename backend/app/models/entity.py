@@ -1,7 +1,7 @@
 """Entity and entity management models."""
 
-from sqlalchemy import Column, String, Text, ForeignKey, JSON, Float, Integer, DateTime, Boolean
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Text, ForeignKey, Float, Integer, DateTime, Boolean
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import relationship
 import uuid
 from datetime import datetime
@@ -21,7 +21,7 @@ class Entity(Base, TimestampMixin):
     entity_name = Column(Text, nullable=False)
 
     # Metadata and confidence
-    meta = Column(JSON, default=dict, nullable=False)
+    meta = Column(JSONB, default=dict, nullable=False)
     confidence = Column(Float, default=1.0, nullable=False)
 
     # Link to deduplicated master entity
@@ -55,7 +55,7 @@ class MasterEntity(Base):
     decision_made = Column(Boolean, default=False, nullable=False)
 
     # Metadata
-    meta = Column(JSON, default=dict, nullable=False)
+    meta = Column(JSONB, default=dict, nullable=False)
 
     # Relationships
     entities = relationship("Entity", back_populates="master_entity", cascade="all, delete-orphan")
@@ -1,7 +1,7 @@
 """Journal entry models."""
 
-from sqlalchemy import Column, String, Text, ForeignKey, ARRAY, JSON
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, ARRAY, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import relationship
 from pgvector.sqlalchemy import Vector
 import uuid
@@ -26,6 +26,7 @@ class JournalEntry(Base, TimestampMixin):
 
     # Vector embedding (1536 dimensions for OpenAI text-embedding-3-small)
     embedding = Column(Vector(1536), nullable=True)
+    embedding_model = Column(String(200), nullable=True)  # e.g., "openai:text-embedding-3-small:1536"
 
     # Session tracking
     session_id = Column(UUID(as_uuid=True), nullable=True)
@@ -33,12 +34,46 @@ class JournalEntry(Base, TimestampMixin):
     # UI state
     suggestion_mode_active = Column(String(10), default="default", nullable=False)  # "on", "off", "default"
 
-    # Metadata
-    meta = Column(JSON, default=dict, nullable=False)
+    # Metadata: intake extraction ("entities", "sentiment"); paths indexed in migration 009
+    meta = Column(JSONB, default=dict, nullable=False)
 
     # Relationships
     entities = relationship("Entity", back_populates="entry", cascade="all, delete-orphan")
     tasks = relationship("Task", back_populates="entry", cascade="all, delete-orphan")
+    chunks = relationship(
+        "EntryChunk",
+        back_populates="entry",
+        cascade="all, delete-orphan",
+        order_by="EntryChunk.chunk_index",
+    )
 
     def __repr__(self) -> str:
         return f"<JournalEntry(id={self.id}, language={self.language}, themes={self.themes})>"
+
+
+class EntryChunk(Base, TimestampMixin):
+    """Embedded passage of a long journal entry (chunk-level search and RAG citations)."""
+
+    __tablename__ = "entry_chunks"
+    __table_args__ = (
+        UniqueConstraint("entry_id", "chunk_index", name="uq_entry_chunks_entry_index"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    entry_id = Column(
+        UUID(as_uuid=True), ForeignKey("journal_entries.id", ondelete="CASCADE"), nullable=False
+    )
+    chunk_index = Column(Integer, nullable=False)
+
+    # Passage = entry.raw_text[start_char:end_char] (the text is not duplicated)
+    start_char = Column(Integer, nullable=False)
+    end_char = Column(Integer, nullable=False)
+
+    embedding = Column(Vector(1536), nullable=False)
+    embedding_model = Column(String(200), nullable=False)
+
+    # Relationships
+    entry = relationship("JournalEntry", back_populates="chunks")
+
+    def __repr__(self) -> str:
+        return f"<EntryChunk(entry_id={self.entry_id}, index={self.chunk_index})>"
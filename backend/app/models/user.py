@@ -1,8 +1,8 @@
 """User preference models."""
 
 from datetime import date
-from sqlalchemy import Column, String, Numeric, Date, Boolean, ARRAY, JSON
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Numeric, Date, Boolean, ARRAY
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 import uuid
 from .base import Base, TimestampMixin
 
@@ -25,7 +25,7 @@ class UserPreference(Base, TimestampMixin):
     post_wedding_mode = Column(Boolean, default=False, nullable=False)
 
     # Metadata
-    meta = Column(JSON, default=dict, nullable=False)
+    meta = Column(JSONB, default=dict, nullable=False)
 
     def __repr__(self) -> str:
         return f"<UserPreference(id={self.id}, wedding_date={self.wedding_date})>"
@@ -1,10 +1,18 @@
 """API endpoints for journal entries."""
 
+import asyncio
 import logging
+import time
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Optional, Any
 from app.agents.intake import IntakeAgent
+from app.agents.memory import MemoryAgent
+from app.config import settings
+from app.services.database import AsyncSessionLocal
+from app.services.embeddings import EmbeddingsService
+from app.services.intake_context import IntakeContextService
+from app.services.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +25,7 @@ class JournalEntryCreate(BaseModel):
     text: str
     language: str = "en"
     transcribed_from_audio: bool = False
+    use_context: bool = False  # resolve references using related prior entries
 
 
 class JournalEntryResponse(BaseModel):
@@ -42,6 +51,46 @@ class EntryProcessingResponse(BaseModel):
     error: Optional[str] = None
 
 
+async def _load_known_entities() -> list[dict[str, Any]]:
+    async with AsyncSessionLocal() as session:
+        return await IntakeContextService.known_entities(
+            session, limit=settings.intake_context_max_entities
+        )
+
+
+async def _retrieve_intake_context(text: str) -> str:
+    """Look up related entries and known entities and pack them for the intake prompt."""
+    started = time.perf_counter()
+
+    # Entities do not depend on the embedding, so fetch them while the text is embedded
+    query_embedding, entities = await asyncio.gather(
+        EmbeddingsService.embed_text(text),
+        _load_known_entities(),
+    )
+    async with AsyncSessionLocal() as session:
+        entries = await IntakeContextService.related_entries(
+            session,
+            query_embedding,
+            EmbeddingsService.model_tag(),
+            top_k=settings.intake_context_top_k,
+        )
+    retrieved = time.perf_counter()
+
+    context = MemoryAgent.build_intake_context(
+        entries, entities, max_tokens=settings.intake_context_max_tokens
+    )
+    packed = time.perf_counter()
+
+    metrics.observe("intake_context_retrieval_seconds", retrieved - started)
+    metrics.observe("intake_context_assembly_seconds", packed - retrieved)
+    logger.info(
+        f"Intake context: {len(entries)} entries, {len(entities)} entities, "
+        f"{len(context)} chars (retrieval {retrieved - started:.3f}s, "
+        f"assembly {(packed - retrieved) * 1000:.2f}ms)"
+    )
+    return context
+
+
 @router.post("/entries", response_model=EntryProcessingResponse)
 async def create_journal_entry(entry: JournalEntryCreate) -> EntryProcessingResponse:
     """
@@ -69,9 +118,23 @@ async def create_journal_entry(entry: JournalEntryCreate) -> EntryProcessingResp
 
         logger.info(f"Creating journal entry: {len(entry.text)} chars, language: {entry.language}")
 
+        # Optional retrieval-augmented intake; a slow or failing lookup never blocks the entry
+        context = None
+        if entry.use_context:
+            try:
+                context = await asyncio.wait_for(
+                    _retrieve_intake_context(entry.text),
+                    timeout=settings.intake_context_timeout_seconds,
+                )
+            except Exception as e:
+                metrics.increment("intake_context_failures_total")
+                logger.warning(f"Proceeding without intake context: {type(e).__name__} {str(e)}")
+
         # Process entry with Intake Agent
         logger.info("Calling Intake Agent to extract entities and tasks")
-        result = await IntakeAgent.process_entry(entry.text, language=entry.language)
+        result = await IntakeAgent.process_entry(
+            entry.text, language=entry.language, context=context
+        )
 
         if not result["success"]:
             logger.error(f"Intake Agent failed: {result.get('error')}")
@@ -81,21 +144,19 @@ async def create_journal_entry(entry: JournalEntryCreate) -> EntryProcessingResp
                 error=result.get("error"),
             )
 
-        data = result["data"]
-        logger.info(f"Successfully processed entry: {len(data)} top-level fields")
+        extraction = result["extraction"]
+        logger.info(f"Successfully processed entry via {result.get('route')} route")
 
         # Return the extracted data
         return EntryProcessingResponse(
             success=True,
             message="Entry processed successfully",
             data={
-                "entities": data.get("entities", {}),
-                "tasks": data.get("tasks", {}),
-                "themes": data.get("themes", []),
-                "sentiment": data.get("sentiment", {}),
-                "timeline": data.get("timeline", "pre-wedding"),
-                "summary": data.get("summary", ""),
+                **extraction.model_dump(exclude={"confidence"}),
                 "transcribed_from_audio": entry.transcribed_from_audio,
+                "context_used": bool(context),
+                "route": result.get("route"),
+                "usage": result.get("usage"),
             },
         )
 
@@ -1,15 +1,23 @@
 """API endpoints for insights and recommendations."""
 
 import logging
-from fastapi import APIRouter, HTTPException
+from datetime import datetime
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, Any
 from app.agents.insight import InsightAgent
+from app.services import get_db
+from app.services.theme_analytics import THEME_WINDOWS, ThemeAnalyticsService
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api", tags=["insights"])
 
+# For MVP, using a hardcoded user_id
+DEFAULT_USER_ID = UUID("00000000-0000-0000-0000-000000000001")
+
 
 class InsightRequest(BaseModel):
     """Request schema for generating insights."""
@@ -57,6 +65,39 @@ class ContradictionsResponse(BaseModel):
     error: Optional[str] = None
 
 
+class ThemeCount(BaseModel):
+    """Number of entries tagged with a theme."""
+
+    theme: str
+    entries: int
+
+
+class ThemeCountsResponse(BaseModel):
+    """Response schema for theme counts."""
+
+    success: bool
+    message: str
+    themes: list[ThemeCount] = []
+    error: Optional[str] = None
+
+
+class ThemeWindow(BaseModel):
+    """Theme counts within one time window."""
+
+    start: datetime
+    themes: dict[str, int]  # theme -> entries, most frequent first
+
+
+class ThemeTimelineResponse(BaseModel):
+    """Response schema for theme frequency over time."""
+
+    success: bool
+    message: str
+    window: str = "week"
+    windows: list[ThemeWindow] = []
+    error: Optional[str] = None
+
+
 @router.post("/insights", response_model=InsightResponse)
 async def generate_insights(request: InsightRequest) -> InsightResponse:
     """
@@ -210,3 +251,99 @@ async def get_next_steps(request: NextStepsRequest) -> NextStepsResponse:
             message="Next steps generation failed",
             error=str(e),
         )
+
+
+@router.get("/insights/themes", response_model=ThemeCountsResponse)
+async def get_theme_counts(
+    since: Optional[datetime] = Query(None, description="Entries created at or after (UTC)"),
+    until: Optional[datetime] = Query(None, description="Entries created before (UTC)"),
+    themes: Optional[list[str]] = Query(None, description="Only count these themes"),
+    limit: int = Query(20, ge=1, le=500),
+    db: AsyncSession = Depends(get_db),
+) -> ThemeCountsResponse:
+    """
+    Most frequent themes across the user's stored entries.
+
+    Counted in Postgres (unnest + GROUP BY over the themes array), so the
+    cost does not depend on loading the entries.
+
+    Returns:
+        Themes with the number of entries tagged with each, most frequent first
+    """
+    try:
+        counts = await ThemeAnalyticsService.theme_counts(
+            db, DEFAULT_USER_ID, since=since, until=until, themes=themes, limit=limit
+        )
+
+        return ThemeCountsResponse(
+            success=True,
+            message="Theme counts computed successfully",
+            themes=[ThemeCount(theme=theme, entries=entries) for theme, entries in counts],
+        )
+
+    except Exception as e:
+        logger.error(f"Error counting themes: {str(e)}", exc_info=True)
+        return ThemeCountsResponse(
+            success=False,
+            message="Theme counting failed",
+            error=str(e),
+        )
+
+
+@router.get("/insights/themes/timeline", response_model=ThemeTimelineResponse)
+async def get_theme_timeline(
+    window: str = Query("week", description="Window size: day, week or month"),
+    since: Optional[datetime] = Query(None, description="Entries created at or after (UTC)"),
+    until: Optional[datetime] = Query(None, description="Entries created before (UTC)"),
+    themes: Optional[list[str]] = Query(None, description="Only count these themes"),
+    db: AsyncSession = Depends(get_db),
+) -> ThemeTimelineResponse:
+    """
+    Theme frequency per day, week or month for theme dashboards.
+
+    Windows are date_trunc() buckets of the entries' created_at (UTC);
+    windows with no tagged entries are omitted.
+
+    Returns:
+        Windows in time order, each with its theme counts
+    """
+    try:
+        if window not in THEME_WINDOWS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid window '{window}' (expected one of {', '.join(THEME_WINDOWS)})",
+            )
+
+        timeline = await ThemeAnalyticsService.theme_timeline(
+            db, DEFAULT_USER_ID, window=window, since=since, until=until, themes=themes
+        )
+
+        windows: list[ThemeWindow] = []
+        for start, theme, entries in timeline:
+            if not windows or windows[-1].start != start:
+                windows.append(ThemeWindow(start=start, themes={}))
+            windows[-1].themes[theme] = entries
+
+        return ThemeTimelineResponse(
+            success=True,
+            message="Theme timeline computed successfully",
+            window=window,
+            windows=windows,
+        )
+
+    except HTTPException as e:
+        logger.warning(f"HTTP error in theme timeline: {e.detail}")
+        return ThemeTimelineResponse(
+            success=False,
+            message="Invalid request",
+            window=window,
+            error=str(e.detail),
+        )
+    except Exception as e:
+        logger.error(f"Error computing theme timeline: {str(e)}", exc_info=True)
+        return ThemeTimelineResponse(
+            success=False,
+            message="Theme timeline failed",
+            window=window,
+            error=str(e),
+        )
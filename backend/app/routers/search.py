@@ -1,21 +1,68 @@
 """API endpoints for semantic search and RAG retrieval."""
 
+import asyncio
+import json
 import logging
+import numpy as np
+from uuid import UUID
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import Optional, Any
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from sqlalchemy import or_, select
+from typing import AsyncIterator, Awaitable, Optional, Any, TypeVar
 from app.agents.memory import MemoryAgent
+from app.config import settings
+from app.models.journal import EntryChunk, JournalEntry
+from app.services.database import AsyncSessionLocal
+from app.services.embeddings import EmbeddingsService
+from app.services.entry_batch import EntryBatch
+from app.schemas.retrieval import RetrievalOptions, SearchFilters
+from app.services.keyword_search import KeywordSearchService
+from app.services.quantization import distance_expression
+from app.services.retrieval import timed_stage
+from app.services.search_cursor import RankedHit, SearchCursorStore
+from app.services.search_filters import enable_iterative_scan, entry_filter_conditions
+from app.services.vector_io import VectorReader, decode_vectors, vector_bytes
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api", tags=["search"])
 
+SEARCH_MODES = ("hybrid", "semantic", "keyword")
+
+# Hybrid search fuses top_k * factor candidates from each retriever
+HYBRID_CANDIDATE_FACTOR = 4
+HYBRID_MIN_CANDIDATES = 20
+
+# Results hydrated per database round trip when streaming from a cursor
+STREAM_HYDRATE_BATCH = 100
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# For MVP, using a hardcoded user_id
+DEFAULT_USER_ID = UUID("00000000-0000-0000-0000-000000000001")
+
+T = TypeVar("T")
+
 
 class SearchRequest(BaseModel):
     """Request schema for search."""
 
-    query: str
-    top_k: int = 5
+    query: str = ""  # not needed when following a cursor
+    top_k: int = Field(default=5, ge=1)  # capped at settings.search_max_results
+    mode: str = "hybrid"  # "hybrid", "semantic" or "keyword"
+    retrieval: RetrievalOptions = Field(default_factory=RetrievalOptions)
+    filters: SearchFilters = Field(default_factory=SearchFilters)
+    page_size: Optional[int] = Field(
+        default=None, ge=1, description="Return this many results and a cursor for the rest"
+    )
+    cursor: Optional[str] = Field(
+        default=None, description="next_cursor of a previous response; continues that ranking"
+    )
+    include_full_text: bool = Field(
+        default=True,
+        description="Include each entry's full text (otherwise GET /api/journal/entry/{id})",
+    )
 
 
 class SearchResult(BaseModel):
@@ -25,7 +72,8 @@ class SearchResult(BaseModel):
     text: str
     date: Optional[str] = None
     relevance_score: float
-    full_text: str
+    full_text: Optional[str] = None  # omitted when include_full_text is false
+    passage: Optional[str] = None  # best-matching passage (vector results)
     entities: dict[str, Any]
     sentiment: Optional[dict[str, Any]] = None
 
@@ -37,6 +85,9 @@ class SearchResponse(BaseModel):
     message: str
     results: list[SearchResult] = []
     count: int = 0
+    total: int = 0  # results in the whole ranking (all pages)
+    next_cursor: Optional[str] = None  # set while more pages remain
+    timings: dict[str, float] = {}  # per-stage milliseconds
     error: Optional[str] = None
 
 
@@ -72,96 +123,406 @@ class ContextRetrievalResponse(BaseModel):
     error: Optional[str] = None
 
 
-@router.post("/search", response_model=SearchResponse)
-async def search_entries(request: SearchRequest) -> SearchResponse:
+def _entry_to_dict(entry: JournalEntry) -> dict[str, Any]:
+    """Convert a JournalEntry row to the dict format used by MemoryAgent."""
+    return {
+        "id": str(entry.id),
+        "text": entry.raw_text,
+        "date": entry.created_at.isoformat() if entry.created_at else None,
+        "embedding": entry.embedding,
+        "embedding_model": entry.embedding_model,
+        "entities": entry.meta.get("entities", {}) if entry.meta else {},
+        "sentiment": entry.meta.get("sentiment", {}) if entry.meta else {},
+        "themes": entry.themes,
+    }
+
+
+async def _load_embedded_entries(
+    query_embedding: Optional[list[float]] = None,
+    limit: Optional[int] = None,
+    filters: Optional[SearchFilters] = None,
+    user_id: Optional[UUID] = None,
+) -> EntryBatch:
+    """
+    Load journal entries that have embeddings, and their passages, as a columnar batch.
+
+    Vectors are always loaded at full precision. Without a query, every
+    embedded entry is loaded; with one, only the candidates from the
+    Postgres vector indexes: the `limit` nearest entries plus the owners
+    of the `limit` nearest passages. settings.embedding_storage only picks
+    the index those candidates come from (migration 005's halfvec or bit
+    expression indexes); nothing reduced is stored, so quantizing the
+    loaded copy per request would add work without saving any I/O.
+    Filters are applied in SQL, inside the nearest-neighbour queries, so
+    filtered searches still get `limit` candidates (enable_iterative_scan);
+    with a user_id, a partitioned journal_entries is scanned in one partition.
     """
-    Search for similar journal entries using semantic similarity (RAG pattern).
+    model_tag = EmbeddingsService.model_tag()
+    mode = settings.embedding_storage
+    conditions = entry_filter_conditions(filters, user_id)
+    async with AsyncSessionLocal() as session:
+        # Only the columns the batch uses, vectors in binary (no text parsing)
+        stmt = select(
+            JournalEntry.id,
+            JournalEntry.raw_text,
+            JournalEntry.created_at,
+            vector_bytes(JournalEntry.embedding).label("embedding"),
+            JournalEntry.meta,
+            JournalEntry.themes,
+        ).where(
+            JournalEntry.embedding.isnot(None),
+            JournalEntry.embedding_model == model_tag,
+            *conditions,
+        )
+        if query_embedding is not None:
+            await enable_iterative_scan(session)
+            nearest_entries = (
+                select(JournalEntry.id)
+                .where(
+                    JournalEntry.embedding.isnot(None),
+                    JournalEntry.embedding_model == model_tag,
+                    *conditions,
+                )
+                .order_by(distance_expression(JournalEntry.embedding, query_embedding, mode))
+                .limit(limit)
+            )
+            nearest_passages = select(EntryChunk.entry_id).where(
+                EntryChunk.embedding_model == model_tag
+            )
+            if conditions:
+                nearest_passages = nearest_passages.join(EntryChunk.entry).where(*conditions)
+            nearest_passages = nearest_passages.order_by(
+                distance_expression(EntryChunk.embedding, query_embedding, mode)
+            ).limit(limit)
+            stmt = stmt.where(
+                or_(JournalEntry.id.in_(nearest_entries), JournalEntry.id.in_(nearest_passages))
+            )
+        result = await session.execute(stmt)
+        rows = result.all()
+
+        chunk_stmt = (
+            select(
+                EntryChunk.entry_id,
+                EntryChunk.start_char,
+                EntryChunk.end_char,
+                vector_bytes(EntryChunk.embedding).label("embedding"),
+            )
+            .where(EntryChunk.embedding_model == model_tag)
+            .order_by(EntryChunk.entry_id, EntryChunk.chunk_index)
+        )
+        if query_embedding is not None:
+            chunk_stmt = chunk_stmt.where(EntryChunk.entry_id.in_([row.id for row in rows]))
+        result = await session.execute(chunk_stmt)
+        chunk_rows = result.all()
+
+    logger.info(
+        f"Found {len(rows)} entries with embeddings ({len(chunk_rows)} passages) in database"
+    )
+    embeddings = decode_vectors([row.embedding for row in rows])
+    batch = EntryBatch.from_rows(rows, model_tag, embeddings=embeddings)
+    if chunk_rows:
+        batch.attach_chunks(
+            [str(row.entry_id) for row in chunk_rows],
+            [(row.start_char, row.end_char) for row in chunk_rows],
+            decode_vectors([row.embedding for row in chunk_rows]),
+        )
+    return batch
 
-    This endpoint:
-    1. Takes a search query
-    2. Retrieves all journal entries from database
-    3. Generates embedding for the query
-    4. Compares against stored entry embeddings using cosine similarity
-    5. Returns top-k similar entries with relevance scores, entities, and sentiment
 
-    Args:
-        request: SearchRequest with query and top_k
+async def _full_precision_vectors(ids: list[str]) -> np.ndarray:
+    """Full-precision embeddings of the given entries (re-rank stage)."""
+    async with AsyncSessionLocal() as session:
+        return await VectorReader.vectors_for_ids(session, ids)
 
-    Returns:
-        List of matching entries ranked by relevance with full details
+
+async def _timed(timings: dict[str, float], stage: str, awaitable: Awaitable[T]) -> T:
+    """Await one stage and record its duration."""
+    with timed_stage(timings, stage):
+        return await awaitable
+
+
+async def _vector_search(
+    query: str,
+    top_k: int,
+    options: RetrievalOptions,
+    timings: dict[str, float],
+    filters: Optional[SearchFilters] = None,
+    user_id: Optional[UUID] = None,
+) -> list[dict[str, Any]]:
     """
-    try:
-        if not request.query or not request.query.strip():
-            raise HTTPException(status_code=400, detail="Query cannot be empty")
+    Rank entries by embedding similarity with the two-stage pipeline.
+
+    With candidate_source "memory" the whole batch of entries matching
+    the filters is loaded while the query is embedded;
+    with "index" the query is embedded first and Postgres returns only
+    the nearest options.candidates matching entries.
+    """
+    if options.candidate_source == "index":
+        query_embedding = await _timed(timings, "embed", EmbeddingsService.embed_query(query))
+        entries_data = await _timed(
+            timings,
+            "load",
+            _load_embedded_entries(
+                query_embedding, max(options.candidates, top_k), filters, user_id
+            ),
+        )
+    else:
+        entries_data, query_embedding = await asyncio.gather(
+            _timed(timings, "load", _load_embedded_entries(filters=filters, user_id=user_id)),
+            _timed(timings, "embed", EmbeddingsService.embed_query(query)),
+        )
 
-        logger.info(f"Searching for: {request.query[:100]}... (top_k={request.top_k})")
+    return await MemoryAgent.search_entries(
+        query,
+        entries_data,
+        top_k=top_k,
+        query_embedding=query_embedding,
+        options=options,
+        vector_loader=_full_precision_vectors,
+        timings=timings,
+    )
+
+
+async def _keyword_search(
+    query: str,
+    limit: int,
+    filters: Optional[SearchFilters] = None,
+    user_id: Optional[UUID] = None,
+) -> list[dict[str, Any]]:
+    """Run keyword search and format hits like MemoryAgent results."""
+    async with AsyncSessionLocal() as session:
+        matches = await KeywordSearchService.search(
+            session, query, limit=limit, filters=filters, user_id=user_id
+        )
 
-        # Import database session
-        from app.services.database import AsyncSessionLocal
+    results = []
+    for entry, score in matches:
+        entry_dict = _entry_to_dict(entry)
+        results.append(
+            {
+                "id": entry_dict["id"],
+                "text": entry_dict["text"][:200],  # Preview
+                "date": entry_dict["date"],
+                "relevance_score": score,
+                "full_text": entry_dict["text"],
+                "entities": entry_dict["entities"],
+                "sentiment": entry_dict["sentiment"],
+            }
+        )
+    return results
 
-        async with AsyncSessionLocal() as session:
-            from sqlalchemy import select
-            from app.models.journal import JournalEntry
 
-            # Get all journal entries with embeddings
-            stmt = select(JournalEntry).where(JournalEntry.embedding.isnot(None))
-            result = await session.execute(stmt)
-            entries = result.scalars().all()
+_cursor_store = SearchCursorStore(settings.search_cursor_ttl_seconds, settings.search_max_cursors)
 
-            logger.info(f"Found {len(entries)} entries with embeddings in database")
 
-            if not entries:
-                logger.info("No entries found with embeddings")
-                return SearchResponse(
-                    success=True,
-                    message="Search completed successfully",
-                    results=[],
-                    count=0,
-                )
+def _passage_span(result: dict[str, Any]) -> Optional[tuple[int, int]]:
+    """(start, length) of a result's passage in its full text, if it is a part of it."""
+    passage = result.get("passage")
+    if not passage or passage == result["full_text"]:
+        return None
+    start = result["full_text"].find(passage)
+    return (start, len(passage)) if start >= 0 else None
+
+
+def _to_search_result(result: dict[str, Any], include_full_text: bool) -> SearchResult:
+    """Convert a ranked result dict to the response format."""
+    return SearchResult(
+        id=result["id"],
+        text=result["text"][:200],  # Preview
+        date=result.get("date"),
+        relevance_score=result["relevance_score"],
+        full_text=result["full_text"] if include_full_text else None,
+        passage=result.get("passage"),
+        entities=result.get("entities", {}),
+        sentiment=result.get("sentiment"),
+    )
+
 
-            # Convert entries to dict format for MemoryAgent
-            entries_data = []
-            for entry in entries:
-                entry_dict = {
-                    "id": str(entry.id),
-                    "text": entry.raw_text,
-                    "date": entry.created_at.isoformat() if entry.created_at else None,
-                    "embedding": entry.embedding,
-                    "entities": entry.meta.get("entities", {}) if entry.meta else {},
-                    "sentiment": entry.meta.get("sentiment", {}) if entry.meta else {},
-                    "themes": entry.themes,
-                }
-                entries_data.append(entry_dict)
-
-            # Search using MemoryAgent
-            search_results = await MemoryAgent.search_entries(
-                request.query,
-                entries_data,
-                top_k=request.top_k
+async def _hydrate(hits: list[RankedHit]) -> list[dict[str, Any]]:
+    """
+    Load the entries of stored ranking hits, keeping their stored scores.
+
+    Entries deleted since the search was ranked are skipped.
+    """
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(
+                JournalEntry.id,
+                JournalEntry.raw_text,
+                JournalEntry.created_at,
+                JournalEntry.meta,
+            ).where(
+                JournalEntry.id.in_([UUID(entry_id) for entry_id, _, _ in hits]),
+                JournalEntry.user_id == DEFAULT_USER_ID,
             )
+        )
+        rows = {str(row.id): row for row in result.all()}
+
+    results = []
+    for entry_id, score, span in hits:
+        row = rows.get(entry_id)
+        if row is None:
+            continue
+        meta = row.meta or {}
+        results.append(
+            {
+                "id": entry_id,
+                "text": row.raw_text[:200],  # Preview
+                "date": row.created_at.isoformat() if row.created_at else None,
+                "relevance_score": score,
+                "full_text": row.raw_text,
+                "passage": row.raw_text[span[0] : span[0] + span[1]] if span else None,
+                "entities": meta.get("entities", {}),
+                "sentiment": meta.get("sentiment", {}),
+            }
+        )
+    return results
+
 
-            logger.info(f"Found {len(search_results)} matching entries")
-
-            # Convert to SearchResult format
-            results = [
-                SearchResult(
-                    id=r["id"],
-                    text=r["text"][:200],  # Preview
-                    date=r.get("date"),
-                    relevance_score=r["relevance_score"],
-                    full_text=r["full_text"],
-                    entities=r.get("entities", {}),
-                    sentiment=r.get("sentiment"),
+def _stored_ranking(cursor: str) -> tuple[list[RankedHit], str, int]:
+    """Look up the ranking behind a cursor; returns (ranking, token, offset)."""
+    try:
+        token, offset = SearchCursorStore.decode(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    ranking = _cursor_store.get(token)
+    if ranking is None:
+        raise HTTPException(
+            status_code=410, detail="Search cursor has expired; run the search again"
+        )
+    return ranking, token, offset
+
+
+async def _ranked_results(
+    request: SearchRequest, timings: dict[str, float]
+) -> list[dict[str, Any]]:
+    """Validate a new search and rank its results in the requested mode."""
+    if not request.query or not request.query.strip():
+        raise HTTPException(status_code=400, detail="Query cannot be empty")
+
+    if request.mode not in SEARCH_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid search mode '{request.mode}' (expected one of {', '.join(SEARCH_MODES)})",
+        )
+
+    top_k = min(request.top_k, settings.search_max_results)
+    filters = request.filters if request.filters.active else None
+    logger.info(f"Searching for: {request.query[:100]}... (top_k={top_k}, mode={request.mode})")
+
+    if request.mode == "keyword":
+        return await _timed(
+            timings, "keyword", _keyword_search(request.query, top_k, filters, DEFAULT_USER_ID)
+        )
+
+    if request.mode == "semantic":
+        return await _vector_search(
+            request.query, top_k, request.retrieval, timings, filters, DEFAULT_USER_ID
+        )
+
+    # Fuse deeper candidate lists than top_k so RRF has overlap to work with
+    candidates = max(top_k * HYBRID_CANDIDATE_FACTOR, HYBRID_MIN_CANDIDATES)
+
+    keyword_results, vector_results = await asyncio.gather(
+        _timed(
+            timings,
+            "keyword",
+            _keyword_search(request.query, candidates, filters, DEFAULT_USER_ID),
+        ),
+        _vector_search(
+            request.query, candidates, request.retrieval, timings, filters, DEFAULT_USER_ID
+        ),
+        return_exceptions=True,
+    )
+
+    # Keyword retrieval is best-effort (e.g. migration 003 not applied yet)
+    if isinstance(keyword_results, BaseException):
+        logger.warning(f"Keyword search unavailable, using vector only: {keyword_results}")
+        keyword_results = []
+    if isinstance(vector_results, BaseException):
+        raise vector_results
+
+    return MemoryAgent.reciprocal_rank_fusion(
+        [vector_results, keyword_results],
+        top_k=top_k,
+    )
+
+
+@router.post("/search", response_model=SearchResponse)
+async def search_entries(request: SearchRequest) -> SearchResponse:
+    """
+    Search for similar journal entries (RAG pattern).
+
+    Modes:
+    - **hybrid** (default): runs keyword and vector retrieval concurrently and
+      fuses both rankings with reciprocal rank fusion
+    - **semantic**: embeds the query and ranks entries by cosine similarity
+    - **keyword**: full-text + trigram match only; no embeddings call, so it
+      returns without waiting on OpenAI
+
+    Searches the current user's entries (DEFAULT_USER_ID for the MVP).
+
+    Vector retrieval picks `retrieval.candidates` entries (from the in-memory
+    batch or the Postgres vector index), re-ranks them at full precision and
+    optionally boosts recent entries and matching themes/vendors. Per-stage
+    durations are returned in `timings`.
+
+    `filters` (date range, themes, emotion, vendors, vendor status, cost
+    category) are applied inside the keyword and vector queries, so top_k
+    results match them whenever that many matching entries exist.
+
+    Paging: with `page_size`, the first page is returned with a
+    `next_cursor`; posting `{"cursor": next_cursor}` returns the next page
+    of the same ranking (same scores, no re-embedding) until `next_cursor`
+    is null. Cursors expire after settings.search_cursor_ttl_seconds. Set
+    `include_full_text` to false to leave out entry texts; fetch them with
+    GET /api/journal/entry/{id} when needed.
+
+    Args:
+        request: SearchRequest with query, top_k and mode (or a cursor)
+
+    Returns:
+        Matching entries ranked by relevance with full details
+    """
+    try:
+        timings: dict[str, float] = {}
+        next_cursor = None
+
+        if request.cursor:
+            ranking, token, offset = _stored_ranking(request.cursor)
+            end = offset + (request.page_size or settings.search_page_size)
+            search_results = await _timed(timings, "hydrate", _hydrate(ranking[offset:end]))
+            total = len(ranking)
+            if end < total:
+                next_cursor = SearchCursorStore.encode(token, end)
+
+        else:
+            search_results = await _ranked_results(request, timings)
+            total = len(search_results)
+            logger.info(f"Found {total} matching entries (stages: {timings})")
+
+            # Keep the ranking (ids, scores, passage offsets) for the later pages
+            if request.page_size and total > request.page_size:
+                token = _cursor_store.put(
+                    [
+                        (r["id"], float(r["relevance_score"]), _passage_span(r))
+                        for r in search_results
+                    ]
                 )
-                for r in search_results
-            ]
-
-            return SearchResponse(
-                success=True,
-                message="Search completed successfully",
-                results=results,
-                count=len(results),
-            )
+                next_cursor = SearchCursorStore.encode(token, request.page_size)
+                search_results = search_results[: request.page_size]
+
+        results = [_to_search_result(r, request.include_full_text) for r in search_results]
+
+        return SearchResponse(
+            success=True,
+            message="Search completed successfully",
+            results=results,
+            count=len(results),
+            total=total,
+            next_cursor=next_cursor,
+            timings=timings,
+        )
 
     except HTTPException as e:
         logger.warning(f"HTTP error in search: {e.detail}")
@@ -179,6 +540,81 @@ async def search_entries(request: SearchRequest) -> SearchResponse:
         )
 
 
+def _ndjson(record: dict[str, Any]) -> bytes:
+    """One NDJSON line."""
+    return (json.dumps(record, default=str) + "\n").encode()
+
+
+@router.post("/search/stream")
+async def stream_search(request: SearchRequest) -> StreamingResponse:
+    """
+    Search and stream the results as NDJSON (application/x-ndjson).
+
+    Each result is written as its own line, `{"type": "result", ...}` with
+    the SearchResult fields, and the stream ends with `{"type": "end",
+    "count": ..., "timings": {...}}`; results are serialized one at a time,
+    never as one large document. Takes the same request as POST /api/search:
+    a new search streams all top_k results, a cursor streams the rest of
+    its ranking (or `page_size` of it), hydrating entries in batches.
+    Errors are a single `{"type": "error", "error": ...}` line with a 4xx/5xx
+    status.
+
+    Args:
+        request: SearchRequest with query, top_k and mode (or a cursor)
+
+    Returns:
+        NDJSON stream of results
+    """
+    timings: dict[str, float] = {}
+    try:
+        if request.cursor:
+            ranking, _, offset = _stored_ranking(request.cursor)
+            end = offset + request.page_size if request.page_size else len(ranking)
+            hits = ranking[offset:end]
+            first_batch: list[dict[str, Any]] = []
+        else:
+            hits = []
+            first_batch = await _ranked_results(request, timings)
+    except HTTPException as e:
+        logger.warning(f"HTTP error in search stream: {e.detail}")
+        return StreamingResponse(
+            iter([_ndjson({"type": "error", "error": str(e.detail)})]),
+            status_code=e.status_code,
+            media_type=NDJSON_MEDIA_TYPE,
+        )
+    except Exception as e:
+        logger.error(f"Error searching entries: {str(e)}", exc_info=True)
+        return StreamingResponse(
+            iter([_ndjson({"type": "error", "error": str(e)})]),
+            status_code=500,
+            media_type=NDJSON_MEDIA_TYPE,
+        )
+
+    async def batches() -> AsyncIterator[list[dict[str, Any]]]:
+        yield first_batch
+        for start in range(0, len(hits), STREAM_HYDRATE_BATCH):
+            yield await _timed(
+                timings, "hydrate", _hydrate(hits[start : start + STREAM_HYDRATE_BATCH])
+            )
+
+    async def lines() -> AsyncIterator[bytes]:
+        count = 0
+        try:
+            async for batch in batches():
+                for r in batch:
+                    result = _to_search_result(r, request.include_full_text)
+                    yield _ndjson({"type": "result", **result.model_dump()})
+                    count += 1
+        except Exception as e:
+            # Headers are already sent; report the failure in-band
+            logger.error(f"Error streaming search results: {str(e)}", exc_info=True)
+            yield _ndjson({"type": "error", "error": str(e)})
+            return
+        yield _ndjson({"type": "end", "count": count, "timings": timings})
+
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
+
+
 @router.post("/search/contradictions", response_model=ContradictionResponse)
 async def detect_contradictions(
     request: ContradictionDetectRequest,
@@ -1,8 +1,18 @@
 """Transcription endpoints."""
 
+from typing import Optional
 from fastapi import APIRouter, File, UploadFile, Query, HTTPException
 from pydantic import BaseModel
-from app.services.transcription import TranscriptionService, LanguageDetector
+from app.config import settings
+from app.services.audio_segments import ffmpeg_available
+from app.services.transcription import (
+    AudioTooLargeError,
+    LanguageDetector,
+    TranscriptionService,
+    WHISPER_MAX_BYTES,
+    spool_upload,
+    transcription_slot,
+)
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,8 +23,10 @@ router = APIRouter(prefix="/api/transcription", tags=["transcription"])
 class TranscriptionResponse(BaseModel):
     """Response for transcription endpoint."""
     text: str
-    language: str
+    language: Optional[str] = None  # None: Whisper reported a language without a known code
     confidence: float
+    segments: int = 1
+    cached: bool = False
 
 
 class LanguageDetectionRequest(BaseModel):
@@ -24,7 +36,7 @@ class LanguageDetectionRequest(BaseModel):
 
 class LanguageDetectionResponse(BaseModel):
     """Response for language detection."""
-    language: str
+    language: Optional[str] = None  # None: no text to detect from
     language_name: str
 
 
@@ -32,44 +44,70 @@ class LanguageDetectionResponse(BaseModel):
 async def transcribe_audio(
     file: UploadFile = File(...),
     language: str = Query(None, description="Language code (e.g., 'en', 'ta'). If not provided, auto-detect."),
+    chunked: bool = Query(False, description="Split long audio into segments transcribed in parallel."),
 ) -> TranscriptionResponse:
     """
     Transcribe audio file using Whisper API.
 
     - **file**: Audio file (webm, mp3, m4a, wav, etc.)
     - **language**: Optional language code (e.g., 'en', 'ta'). If not provided, Whisper will auto-detect.
+    - **chunked**: Transcribe as overlapping segments in parallel. Used automatically for
+      files over Whisper's 25MB limit when ffmpeg is installed.
 
     Returns transcribed text, detected language, and confidence score.
     """
     try:
         logger.info(f"Received transcription request - file: {file.filename}, language: {language}")
 
-        # Read file content
-        audio_content = await file.read()
-
-        if not audio_content:
-            raise HTTPException(status_code=400, detail="Empty audio file")
-
-        logger.info(f"Audio file size: {len(audio_content)} bytes")
-
-        if len(audio_content) > 25 * 1024 * 1024:  # 25MB limit from Whisper API
-            raise HTTPException(status_code=413, detail="Audio file too large (max 25MB)")
-
-        logger.info("Calling TranscriptionService.transcribe_audio...")
-
-        # Transcribe
-        result = await TranscriptionService.transcribe_audio(
-            audio_file=audio_content,
-            language=language,
-            file_name=file.filename or "audio.webm",
+        # Long recordings are segmented, so the Whisper limit only applies without ffmpeg
+        segmenting_available = ffmpeg_available()
+        max_bytes = (
+            settings.transcription_long_audio_max_bytes
+            if segmenting_available
+            else WHISPER_MAX_BYTES
         )
 
+        # Spool the upload in chunks (bounded concurrency) instead of reading it into memory
+        async with transcription_slot():
+            try:
+                audio_stream, audio_size, audio_sha256 = await spool_upload(
+                    file, max_bytes=max_bytes
+                )
+            except AudioTooLargeError as e:
+                raise HTTPException(status_code=413, detail=str(e))
+
+            with audio_stream:
+                if not audio_size:
+                    raise HTTPException(status_code=400, detail="Empty audio file")
+
+                logger.info(f"Audio file size: {audio_size} bytes")
+
+                use_segments = chunked or audio_size > WHISPER_MAX_BYTES
+                if use_segments and not segmenting_available:
+                    raise HTTPException(
+                        status_code=400,
+                        detail="Chunked transcription requires ffmpeg on the server",
+                    )
+
+                logger.info(f"Calling TranscriptionService.transcribe_cached (chunked={use_segments})...")
+
+                # Transcribe (cached by content hash; duplicate concurrent uploads share one call)
+                result = await TranscriptionService.transcribe_cached(
+                    audio_file=audio_stream,
+                    audio_sha256=audio_sha256,
+                    language=language,
+                    file_name=file.filename or "audio.webm",
+                    chunked=use_segments,
+                )
+
         logger.info(f"Transcription successful: {result}")
 
         return TranscriptionResponse(
             text=result["text"],
             language=result["language"],
             confidence=result["confidence"],
+            segments=result.get("segments", 1),
+            cached=result.get("cached", False),
         )
 
     except HTTPException:
@@ -99,6 +137,7 @@ async def detect_language(
             "kn": "Kannada",
             "te": "Telugu",
             "ml": "Malayalam",
+            "bn": "Bengali",
         }
 
         language_name = language_names.get(language_code, "Unknown")
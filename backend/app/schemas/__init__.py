@@ -12,6 +12,7 @@ from .user import (
     UserPreferenceResponse,
     TimelineStatusResponse,
 )
+from .extraction import IntakeExtraction
 from .task import (
     TaskCreateRequest,
     TaskUpdateRequest,
@@ -34,4 +35,5 @@ __all__ = [
     "TaskResponse",
     "TasksListResponse",
     "TaskCompleteRequest",
+    "IntakeExtraction",
 ]
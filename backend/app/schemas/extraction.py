@@ -0,0 +1,226 @@
+"""Pydantic schemas for the Intake Agent's structured extraction output."""
+
+import copy
+import re
+from pydantic import AliasChoices, BaseModel, Field, ValidationError, field_validator
+from typing import Any, Optional, List
+
+# "1500", "$1,500.00", "₹ 50,000", "1200 USD"; anything vaguer ("about 3k") is rejected
+AMOUNT_PATTERN = re.compile(r"\s*[$₹€£¥]?\s*(-?[\d,]*\.?\d+)\s*(?:[A-Za-z]{3})?\s*")
+
+# Salvage passes before giving up on a reply (each pass drops everything invalid so far)
+MAX_SALVAGE_PASSES = 3
+
+
+def parse_amount(value: Any) -> Any:
+    """Coerce a money string to a float; other values are left to validation."""
+    if isinstance(value, str):
+        match = AMOUNT_PATTERN.fullmatch(value)
+        if match:
+            return float(match.group(1).replace(",", ""))
+    return value
+
+
+class VendorExtraction(BaseModel):
+    """Vendor mentioned in an entry."""
+    name: str
+    category: Optional[str] = None
+    cost: Optional[float] = None
+    status: Optional[str] = None
+
+    _parse_cost = field_validator("cost", mode="before")(parse_amount)
+
+
+class VenueExtraction(BaseModel):
+    """Venue mentioned in an entry."""
+    name: str
+    type: Optional[str] = None
+    capacity: Optional[int] = None
+    cost: Optional[float] = None
+    date: Optional[str] = None
+
+    _parse_cost = field_validator("cost", mode="before")(parse_amount)
+
+
+class CostExtraction(BaseModel):
+    """Cost or budget figure mentioned in an entry."""
+    category: Optional[str] = None
+    amount: float
+    currency: Optional[str] = None
+    date: Optional[str] = None
+
+    _parse_amount = field_validator("amount", mode="before")(parse_amount)
+
+
+class DateExtraction(BaseModel):
+    """Event date mentioned in an entry."""
+    event: Optional[str] = None
+    date: Optional[str] = None
+    confirmed: bool = False
+
+
+class PersonExtraction(BaseModel):
+    """Person mentioned in an entry."""
+    name: str
+    role: Optional[str] = None
+    involvement: Optional[str] = None
+
+
+class ExtractedEntities(BaseModel):
+    """All entities extracted from an entry."""
+    vendors: List[VendorExtraction] = Field(default_factory=list)
+    venues: List[VenueExtraction] = Field(default_factory=list)
+    costs: List[CostExtraction] = Field(default_factory=list)
+    dates: List[DateExtraction] = Field(default_factory=list)
+    people: List[PersonExtraction] = Field(default_factory=list)
+
+
+class ExplicitTaskExtraction(BaseModel):
+    """Task stated in the entry (entries submitted by clients may call it "title")."""
+    task: str = Field(validation_alias=AliasChoices("task", "title"))
+    deadline: Optional[str] = None
+    priority: str = "medium"
+    assigned_to: Optional[str] = None
+    status: str = "pending"
+
+
+class ImplicitTaskExtraction(BaseModel):
+    """Task inferred from the entry."""
+    task: str
+    deadline: Optional[str] = None
+    priority: str = "medium"
+    reason: Optional[str] = None
+
+
+class ExtractedTasks(BaseModel):
+    """Explicit and implicit tasks."""
+    explicit: List[ExplicitTaskExtraction] = Field(default_factory=list)
+    implicit: List[ImplicitTaskExtraction] = Field(default_factory=list)
+
+
+class SentimentExtraction(BaseModel):
+    """Overall emotion of the entry."""
+    emotion: str = "neutral"
+    confidence: float = Field(default=0.5, ge=0.0, le=1.0)
+
+
+class IntakeExtraction(BaseModel):
+    """Full Intake Agent output (see INTAKE_AGENT_PROMPT)."""
+    entities: ExtractedEntities = Field(default_factory=ExtractedEntities)
+    tasks: ExtractedTasks = Field(default_factory=ExtractedTasks)
+    themes: List[str] = Field(default_factory=list)
+    sentiment: SentimentExtraction = Field(default_factory=SentimentExtraction)
+    timeline: str = "pre-wedding"
+    summary: str = ""
+    confidence: Optional[float] = Field(
+        default=None, ge=0.0, le=1.0, description="Model's confidence in the extraction as a whole"
+    )
+
+    @classmethod
+    def salvage(cls, data: Any) -> tuple["IntakeExtraction", int]:
+        """
+        Validate an off-schema reply, dropping whatever does not fit.
+
+        Invalid list items (a cost without a usable amount) are removed and
+        invalid scalar fields fall back to their defaults, so one bad item
+        does not cost the rest of the extraction. A null where the schema has
+        a default ("vendors": null) means "use the default" and is not
+        counted as dropped. Kept out of the models themselves so valid
+        replies stay on pydantic-core's native JSON path.
+
+        Args:
+            data: Decoded JSON reply
+
+        Returns:
+            (validated model, number of items/fields dropped)
+
+        Raises:
+            ValidationError: If the reply cannot be salvaged (e.g. not an object)
+        """
+        try:
+            return cls.model_validate(data), 0
+        except ValidationError:
+            if not isinstance(data, dict):
+                raise
+
+        # Only schema fields are edited (and copied); extra keys such as embeddings are ignored
+        fields = cls.model_fields
+        data = {key: copy.deepcopy(value) for key, value in data.items() if key in fields}
+        dropped = 0
+        for _ in range(MAX_SALVAGE_PASSES):
+            try:
+                return cls.model_validate(data), dropped
+            except ValidationError as e:
+                removals: dict[tuple, bool] = {}
+                for error in e.errors():
+                    path = _salvage_path(error)
+                    if path == ():
+                        raise
+                    removals[path] = removals.get(path, False) or error["input"] is not None
+                # Delete from the back so earlier list indexes stay valid
+                for path in sorted(removals, key=_path_sort_key, reverse=True):
+                    if _delete_path(data, path) and removals[path]:
+                        dropped += 1
+        return cls.model_validate(data), dropped
+
+
+class EntryAnalysis(IntakeExtraction):
+    """
+    A journal entry as the Memory and Insight agents see it: the extraction
+    plus the entry's id, date and text. Entries without a sentiment stay None
+    so they are not counted as "neutral".
+    """
+    id: Optional[str] = None
+    date: Optional[str] = None
+    text: Optional[str] = None
+    sentiment: Optional[SentimentExtraction] = None
+
+    @field_validator("sentiment", mode="before")
+    @classmethod
+    def _empty_sentiment(cls, value: Any) -> Any:
+        return value or None  # rows store {} for "no sentiment"
+
+    @field_validator("id", "date", mode="before")
+    @classmethod
+    def _stringify(cls, value: Any) -> Any:
+        # Rows carry UUIDs and dates; request payloads carry strings
+        if value is None or isinstance(value, str):
+            return value
+        if hasattr(value, "isoformat"):
+            return value.isoformat()
+        return str(value)
+
+    @classmethod
+    def from_entries(cls, entries: List[dict]) -> List["EntryAnalysis"]:
+        """Parse entry dicts once, salvaging off-schema ones."""
+        return [cls.salvage(entry)[0] for entry in entries]
+
+
+def _salvage_path(error: dict) -> tuple:
+    """What to delete for one validation error: the list item, or the field itself."""
+    loc = tuple(error["loc"])
+    if error["input"] is None:
+        return loc  # null: fall back to the field's default (or "missing" next pass)
+    if error["type"] == "missing":
+        loc = loc[:-1]  # a required field is missing: drop its parent
+    indexes = [i for i, part in enumerate(loc) if isinstance(part, int)]
+    if indexes:
+        loc = loc[: indexes[-1] + 1]
+    return loc
+
+
+def _path_sort_key(path: tuple) -> tuple:
+    return tuple((0, part) if isinstance(part, int) else (1, str(part)) for part in path)
+
+
+def _delete_path(data: Any, path: tuple) -> bool:
+    for part in path[:-1]:
+        try:
+            data = data[part]
+        except (KeyError, IndexError, TypeError):
+            return False
+    try:
+        del data[path[-1]]
+    except (KeyError, IndexError, TypeError):
+        return False
+    return True
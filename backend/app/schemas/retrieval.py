@@ -0,0 +1,85 @@
+"""Pydantic schemas for the semantic retrieval pipeline."""
+
+from datetime import datetime
+from typing import Literal, Optional
+from pydantic import BaseModel, Field
+
+
+class RetrievalOptions(BaseModel):
+    """Per-request settings of the two-stage vector retrieval pipeline."""
+
+    candidates: int = Field(
+        default=200, ge=1, le=5000, description="Candidates taken from the first stage"
+    )
+    candidate_source: Literal["memory", "index"] = Field(
+        default="memory",
+        description="'memory' scans the loaded (possibly quantized) entry batch; "
+        "'index' asks the Postgres vector index and loads only the candidates",
+    )
+    rerank: bool = Field(
+        default=True, description="Re-score candidates with full-precision cosine similarity"
+    )
+
+    # Cross-signal boosts, added to the cosine score of each candidate (0 disables)
+    recency_weight: float = Field(default=0.0, ge=0.0, le=1.0)
+    recency_half_life_days: float = Field(default=90.0, gt=0.0)
+    theme_weight: float = Field(default=0.0, ge=0.0, le=1.0)
+    entity_weight: float = Field(default=0.0, ge=0.0, le=1.0)
+    themes: Optional[list[str]] = Field(
+        default=None, description="Themes to match (default: known themes named in the query)"
+    )
+    entities: Optional[list[str]] = Field(
+        default=None,
+        description="Vendor names to match (default: known vendors named in the query)",
+    )
+
+    @property
+    def boosted(self) -> bool:
+        """Whether any cross-signal boost is enabled."""
+        return self.recency_weight > 0 or self.theme_weight > 0 or self.entity_weight > 0
+
+
+class SearchFilters(BaseModel):
+    """
+    Structured filters applied inside the search queries (not to the returned top_k).
+
+    Unset fields do not filter; list fields match entries with any of the values.
+    """
+
+    created_after: Optional[datetime] = Field(
+        default=None, description="Only entries created at or after this time (UTC)"
+    )
+    created_before: Optional[datetime] = Field(
+        default=None, description="Only entries created before this time (UTC)"
+    )
+    themes: Optional[list[str]] = Field(
+        default=None, description="Entries tagged with any of these themes"
+    )
+    emotions: Optional[list[str]] = Field(
+        default=None, description="Entries whose sentiment emotion is one of these"
+    )
+    vendors: Optional[list[str]] = Field(
+        default=None, description="Entries mentioning any of these vendors (case-insensitive)"
+    )
+    vendor_statuses: Optional[list[str]] = Field(
+        default=None, description="Entries with a vendor in any of these statuses (e.g. 'booked')"
+    )
+    cost_categories: Optional[list[str]] = Field(
+        default=None, description="Entries with a cost in any of these categories"
+    )
+
+    @property
+    def active(self) -> bool:
+        """Whether any filter is set."""
+        return any(
+            value is not None
+            for value in (
+                self.created_after,
+                self.created_before,
+                self.themes,
+                self.emotions,
+                self.vendors,
+                self.vendor_statuses,
+                self.cost_categories,
+            )
+        )
@@ -0,0 +1,168 @@
+"""Audio segmentation (ffmpeg) and transcript stitching for long recordings."""
+
+import asyncio
+import logging
+import re
+import shutil
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# How far (seconds) a window boundary may move to land in a silence
+SILENCE_SNAP_SECONDS = 15.0
+
+# Word overlap searched for when stitching adjacent segments (single words match too easily)
+MIN_STITCH_WORDS = 2
+MAX_STITCH_WORDS = 40
+
+_SILENCE_RE = re.compile(r"silence_(start|end): (-?[\d.]+)")
+
+
+def ffmpeg_available() -> bool:
+    """Check that ffmpeg and ffprobe are installed."""
+    return shutil.which("ffmpeg") is not None and shutil.which("ffprobe") is not None
+
+
+async def _run(*args: str) -> tuple[bytes, bytes]:
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await process.communicate()
+    if process.returncode != 0:
+        raise RuntimeError(f"{args[0]} failed: {stderr.decode(errors='replace')[-500:]}")
+    return stdout, stderr
+
+
+async def probe_duration(path: str) -> float:
+    """Get audio duration in seconds."""
+    stdout, _ = await _run(
+        "ffprobe", "-v", "error",
+        "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1",
+        path,
+    )
+    return float(stdout.decode().strip())
+
+
+async def detect_silences(path: str, noise_db: int = -30, min_silence: float = 0.5) -> list[float]:
+    """
+    Find silence midpoints (seconds) with ffmpeg's silencedetect filter.
+
+    Returns:
+        Sorted midpoints of detected silences
+    """
+    _, stderr = await _run(
+        "ffmpeg", "-hide_banner", "-nostats", "-i", path,
+        "-af", f"silencedetect=noise={noise_db}dB:d={min_silence}",
+        "-f", "null", "-",
+    )
+
+    midpoints = []
+    silence_start: Optional[float] = None
+    for kind, value in _SILENCE_RE.findall(stderr.decode(errors="replace")):
+        if kind == "start":
+            silence_start = float(value)
+        elif silence_start is not None:
+            midpoints.append((silence_start + float(value)) / 2)
+            silence_start = None
+    return midpoints
+
+
+def plan_windows(
+    duration: float,
+    window_seconds: float,
+    overlap_seconds: float,
+    silences: Optional[list[float]] = None,
+) -> list[tuple[float, float]]:
+    """
+    Plan overlapping (start, end) windows covering the audio.
+
+    Each cut is moved to the nearest silence within SILENCE_SNAP_SECONDS when
+    one exists, so words are less likely to be split; the next window starts
+    `overlap_seconds` before the cut so boundary words appear in both segments
+    and can be de-duplicated when stitching.
+
+    Args:
+        duration: Total audio duration in seconds
+        window_seconds: Target window length
+        overlap_seconds: Overlap between consecutive windows
+        silences: Optional silence midpoints from detect_silences
+
+    Returns:
+        List of (start, end) times in seconds
+    """
+    if duration <= window_seconds:
+        return [(0.0, duration)]
+
+    windows = []
+    start = 0.0
+    while start < duration:
+        end = min(start + window_seconds, duration)
+
+        if end < duration and silences:
+            nearby = [
+                s for s in silences
+                if s > start + overlap_seconds and abs(s - end) <= SILENCE_SNAP_SECONDS
+            ]
+            if nearby:
+                end = min(nearby, key=lambda s: abs(s - end))
+
+        windows.append((start, end))
+        if end >= duration:
+            break
+        start = max(end - overlap_seconds, start + 1.0)
+
+    return windows
+
+
+async def extract_segment(path: str, start: float, end: float, output_path: str) -> None:
+    """Cut [start, end) to a mono 16kHz mp3 (well under the Whisper upload limit)."""
+    await _run(
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+        "-ss", f"{start:.3f}", "-t", f"{end - start:.3f}",
+        "-i", path,
+        "-vn", "-ac", "1", "-ar", "16000", "-c:a", "libmp3lame", "-b:a", "48k",
+        output_path,
+    )
+
+
+def _normalize_word(word: str) -> str:
+    return re.sub(r"[^\w]", "", word.lower())
+
+
+def stitch_transcripts(texts: list[str]) -> str:
+    """
+    Join segment transcripts, dropping words repeated across the overlap.
+
+    For each pair of neighbours, the longest run of words that ends the
+    previous transcript and starts the next one (compared case- and
+    punctuation-insensitively) is removed from the next transcript.
+
+    Args:
+        texts: Segment transcripts in order
+
+    Returns:
+        Combined transcript
+    """
+    words: list[str] = []
+
+    for text in texts:
+        next_words = text.split()
+        if not next_words:
+            continue
+
+        overlap = 0
+        limit = min(MAX_STITCH_WORDS, len(words), len(next_words))
+        tail = [_normalize_word(w) for w in words[-limit:]] if limit else []
+        head = [_normalize_word(w) for w in next_words[:limit]]
+
+        for size in range(limit, MIN_STITCH_WORDS - 1, -1):
+            if tail[-size:] == head[:size]:
+                overlap = size
+                break
+
+        words.extend(next_words[overlap:])
+
+    return " ".join(words)
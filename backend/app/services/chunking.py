@@ -0,0 +1,83 @@
+"""Splitting long journal entries into passages for chunk-level embeddings."""
+
+import re
+
+# Sentence ends: Latin punctuation, Devanagari danda / double danda, CJK full stops
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?।॥。！？])\s+|\n")
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+
+
+def _spans(text: str, separator: re.Pattern, start: int, end: int) -> list[tuple[int, int]]:
+    """Non-blank spans of text[start:end] between separator matches."""
+    spans = []
+    position = start
+    for match in separator.finditer(text, start, end):
+        spans.append((position, match.start()))
+        position = match.end()
+    spans.append((position, end))
+    return [span for span in (_strip(text, *span) for span in spans) if span[0] < span[1]]
+
+
+def _strip(text: str, start: int, end: int) -> tuple[int, int]:
+    """Shrink a span so it does not start or end with whitespace."""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def split_into_chunks(
+    text: str, max_chars: int = 600, min_chars: int = 120
+) -> list[tuple[int, int]]:
+    """
+    Split an entry into passages of whole paragraphs or sentences.
+
+    Paragraphs are kept together when they fit in `max_chars`; longer ones
+    are split into runs of whole sentences of up to `max_chars`, and a
+    sentence longer than that is cut at the last space that fits. Passages
+    shorter than `min_chars` are merged into the previous one so fragments
+    like "Anyway." do not get a vector of their own. Passages are returned
+    as spans into the original text, so they can be cited (and stored)
+    without copying the text.
+
+    Args:
+        text: Entry text
+        max_chars: Longest passage
+        min_chars: Shortest passage worth embedding on its own
+
+    Returns:
+        (start, end) character offsets of each passage, in order
+    """
+    pieces: list[tuple[int, int]] = []
+    for start, end in _spans(text, _PARAGRAPH_RE, 0, len(text)):
+        if end - start <= max_chars:
+            pieces.append((start, end))
+            continue
+        run: tuple[int, int] = (start, start)
+        for sentence_start, sentence_end in _spans(text, _SENTENCE_END_RE, start, end):
+            if run[0] < run[1] and sentence_end - run[0] <= max_chars:
+                run = (run[0], sentence_end)
+                continue
+            if run[0] < run[1]:
+                pieces.append(run)
+            while sentence_end - sentence_start > max_chars:
+                cut = text.rfind(" ", sentence_start, sentence_start + max_chars)
+                if cut <= sentence_start:
+                    cut = sentence_start + max_chars
+                pieces.append(_strip(text, sentence_start, cut))
+                sentence_start = _strip(text, cut, sentence_end)[0]
+            run = (sentence_start, sentence_end)
+        if run[0] < run[1]:
+            pieces.append(run)
+
+    chunks: list[tuple[int, int]] = []
+    for start, end in pieces:
+        if chunks:
+            previous_start, previous_end = chunks[-1]
+            short = end - start < min_chars or previous_end - previous_start < min_chars
+            if short and end - previous_start <= max_chars:
+                chunks[-1] = (previous_start, end)
+                continue
+        chunks.append((start, end))
+    return chunks
@@ -1,22 +1,239 @@
-"""Embeddings service for vector search using OpenAI."""
+"""Embeddings service for vector search (OpenAI or a local CPU model)."""
 
+import asyncio
 import logging
-from typing import Optional
-from openai import AsyncOpenAI
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Optional
+import numpy as np
 from app.config import settings
+from app.services.chunking import split_into_chunks
+from app.services.llm_client import get_llm_client
+from app.services.metrics import metrics
+from app.services.singleflight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
-# Initialize async OpenAI client
-client = AsyncOpenAI(api_key=settings.openai_api_key)
+
+def adapt_dimensions(embedding: list[float], dimensions: int) -> list[float]:
+    """
+    Fit an embedding to the storage dimensionality.
+
+    Longer vectors are truncated (text-embedding-3 vectors are trained so that
+    prefixes remain meaningful), shorter ones are zero-padded, and the result
+    is re-normalized to unit length. Zero-padding leaves cosine similarity
+    between vectors of the same model unchanged.
+
+    Args:
+        embedding: Embedding from the backend model
+        dimensions: Target number of dimensions
+
+    Returns:
+        Unit-length embedding with exactly `dimensions` values
+    """
+    adapted = list(embedding[:dimensions])
+    if len(adapted) < dimensions:
+        adapted.extend([0.0] * (dimensions - len(adapted)))
+
+    norm = math.sqrt(sum(x * x for x in adapted))
+    if norm == 0:
+        return adapted
+    return [x / norm for x in adapted]
+
+
+class EmbeddingsBackend(ABC):
+    """Interface for embedding model backends."""
+
+    name: str = ""
+
+    def __init__(self, model: str):
+        self.model = model
+
+    @property
+    def model_tag(self) -> str:
+        """Tag stored next to each vector; vectors with different tags are never compared."""
+        return f"{self.name}:{self.model}:{EmbeddingsService.DIMENSIONS}"
+
+    @abstractmethod
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        """Embed texts into vectors of EmbeddingsService.DIMENSIONS dimensions."""
+
+
+class OpenAIEmbeddingsBackend(EmbeddingsBackend):
+    """Embeddings from the OpenAI API."""
+
+    name = "openai"
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        response = await get_llm_client().embeddings(
+            model=self.model,
+            input=texts,
+            dimensions=EmbeddingsService.DIMENSIONS,
+        )
+        return [item.embedding for item in response.data]
+
+
+class LocalEmbeddingsBackend(EmbeddingsBackend):
+    """
+    Embeddings from a small local model (sentence-transformers compatible).
+
+    Encoding runs in a dedicated thread pool so it never blocks the event loop;
+    the model releases the GIL inside its numeric kernels. No network access
+    is needed once the model files are cached, which also makes it usable in
+    offline tests.
+    """
+
+    name = "local"
+
+    def __init__(self, model: str, encoder: Optional[Any] = None, max_workers: int = 2):
+        super().__init__(model)
+        self._encoder = encoder
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="local-embeddings"
+        )
+
+    def _load_encoder(self) -> Any:
+        if self._encoder is None:
+            try:
+                from sentence_transformers import SentenceTransformer
+            except ImportError as e:
+                raise RuntimeError(
+                    "Local embeddings require sentence-transformers "
+                    "(poetry install --extras local-embeddings)"
+                ) from e
+
+            logger.info(f"Loading local embedding model: {self.model}")
+            self._encoder = SentenceTransformer(self.model, device="cpu")
+        return self._encoder
+
+    def _encode(self, texts: list[str]) -> list[list[float]]:
+        vectors = self._load_encoder().encode(texts, normalize_embeddings=True)
+        return [
+            adapt_dimensions([float(x) for x in vector], EmbeddingsService.DIMENSIONS)
+            for vector in vectors
+        ]
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._encode, texts)
+
+
+_backend: Optional[EmbeddingsBackend] = None
+
+
+def get_embeddings_backend() -> EmbeddingsBackend:
+    """Get the configured embeddings backend (created on first use)."""
+    global _backend
+    if _backend is None:
+        if settings.embeddings_backend == "local":
+            _backend = LocalEmbeddingsBackend(
+                settings.local_embeddings_model,
+                max_workers=settings.local_embeddings_workers,
+            )
+        elif settings.embeddings_backend == "openai":
+            _backend = OpenAIEmbeddingsBackend(EmbeddingsService.MODEL)
+        else:
+            raise ValueError(f"Unknown embeddings backend: {settings.embeddings_backend}")
+
+        logger.info(f"Using embeddings backend: {_backend.model_tag}")
+    return _backend
+
+
+def set_embeddings_backend(backend: Optional[EmbeddingsBackend]) -> None:
+    """Override the embeddings backend (None restores the configured one)."""
+    global _backend
+    _backend = backend
+
+
+class QueryEmbeddingCache:
+    """
+    Short-lived LRU memo of query embeddings, keyed by model tag and text.
+
+    Vectors are kept as float32 arrays (a Python list of 1536 floats takes
+    about eight times the memory). Entries expire after ttl_seconds so a
+    memo never outlives a model or backend change for long.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._vectors: OrderedDict[tuple[str, str], tuple[float, np.ndarray]] = OrderedDict()
+
+    def get(self, key: tuple[str, str]) -> Optional[list[float]]:
+        """Get a memoized embedding, or None if it is missing or expired."""
+        with self._lock:
+            stored = self._vectors.get(key)
+            if stored is None:
+                return None
+            expires, vector = stored
+            if time.monotonic() > expires:
+                del self._vectors[key]
+                return None
+            self._vectors.move_to_end(key)
+        return vector.tolist()
+
+    def put(self, key: tuple[str, str], embedding: list[float]) -> None:
+        """Memoize an embedding (no-op when the TTL or size is 0)."""
+        if self.ttl_seconds <= 0 or self.max_entries <= 0:
+            return
+        vector = np.asarray(embedding, dtype=np.float32)
+        with self._lock:
+            self._vectors[key] = (time.monotonic() + self.ttl_seconds, vector)
+            self._vectors.move_to_end(key)
+            while len(self._vectors) > self.max_entries:
+                self._vectors.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every memoized embedding."""
+        with self._lock:
+            self._vectors.clear()
+
+
+_query_cache = QueryEmbeddingCache(
+    settings.query_embedding_cache_ttl_seconds, settings.query_embedding_cache_size
+)
+_query_inflight = SingleFlight()
+
+# Query embeddings computed for the current request (None outside query_embedding_scope)
+_request_queries: ContextVar[Optional[dict[tuple[str, str], list[float]]]] = ContextVar(
+    "request_query_embeddings", default=None
+)
+
+
+@contextmanager
+def query_embedding_scope() -> Iterator[None]:
+    """
+    Share query embeddings between everything run inside the block.
+
+    The HTTP middleware opens one scope per request, so the search,
+    context and re-rank stages of a request embed a query once, whatever
+    the shared memo has evicted in the meantime.
+    """
+    token = _request_queries.set({})
+    try:
+        yield
+    finally:
+        _request_queries.reset(token)
 
 
 class EmbeddingsService:
-    """Service for generating embeddings using OpenAI."""
+    """Service for generating embeddings with the configured backend."""
 
     MODEL = "text-embedding-3-small"
     DIMENSIONS = 1536
 
+    @staticmethod
+    def model_tag() -> str:
+        """Tag of the active embedding model (stored with vectors)."""
+        return get_embeddings_backend().model_tag
+
     @staticmethod
     async def embed_text(text: str) -> list[float]:
         """
@@ -35,13 +252,9 @@ class EmbeddingsService:
 
             logger.info(f"Generating embedding for {len(text)} characters")
 
-            response = await client.embeddings.create(
-                model=EmbeddingsService.MODEL,
-                input=text,
-                dimensions=EmbeddingsService.DIMENSIONS,
-            )
+            embeddings = await get_embeddings_backend().embed([text])
 
-            embedding = response.data[0].embedding
+            embedding = embeddings[0]
             logger.info(f"Generated embedding with {len(embedding)} dimensions")
 
             return embedding
@@ -50,6 +263,42 @@ class EmbeddingsService:
             logger.error(f"Embedding generation failed: {str(e)}", exc_info=True)
             raise
 
+    @staticmethod
+    async def embed_query(text: str) -> list[float]:
+        """
+        Embed a search query, reusing recent embeddings of the same text.
+
+        One UI action can search and retrieve context for the same query,
+        so query vectors are looked up in the request scope
+        (query_embedding_scope), then in a short-TTL memo shared across
+        requests (settings.query_embedding_cache_ttl_seconds); concurrent
+        misses for the same text share one embeddings call. Entry texts
+        should use embed_text / embed_entry, which are never memoized.
+
+        Args:
+            text: Query text
+
+        Returns:
+            List of floats representing the embedding (1536 dimensions)
+        """
+        key = (EmbeddingsService.model_tag(), text)
+        scope = _request_queries.get()
+        if scope is not None and key in scope:
+            metrics.increment("query_embeddings_total", source="request")
+            return scope[key]
+
+        embedding = _query_cache.get(key)
+        if embedding is not None:
+            metrics.increment("query_embeddings_total", source="memo")
+        else:
+            source = "shared" if _query_inflight.in_flight(key) else "embedded"
+            embedding = await _query_inflight.do(key, lambda: _embed_and_memoize(key, text))
+            metrics.increment("query_embeddings_total", source=source)
+
+        if scope is not None:
+            scope[key] = embedding
+        return embedding
+
     @staticmethod
     async def embed_texts(texts: list[str]) -> list[list[float]]:
         """
@@ -68,13 +317,7 @@ class EmbeddingsService:
 
             logger.info(f"Generating embeddings for {len(texts)} texts")
 
-            response = await client.embeddings.create(
-                model=EmbeddingsService.MODEL,
-                input=texts,
-                dimensions=EmbeddingsService.DIMENSIONS,
-            )
-
-            embeddings = [item.embedding for item in response.data]
+            embeddings = await get_embeddings_backend().embed(texts)
             logger.info(f"Generated {len(embeddings)} embeddings")
 
             return embeddings
@@ -83,6 +326,39 @@ class EmbeddingsService:
             logger.error(f"Batch embedding generation failed: {str(e)}", exc_info=True)
             raise
 
+    @staticmethod
+    async def embed_entry(
+        text: str,
+    ) -> tuple[list[float], list[tuple[tuple[int, int], list[float]]]]:
+        """
+        Embed an entry and, if it is long, each of its passages.
+
+        One vector for a long (e.g. voice-transcribed) entry averages over
+        every topic it touches, so entries longer than
+        settings.chunk_min_entry_chars are also split into passages
+        (chunking.split_into_chunks) that are searched on their own. The
+        entry and its passages are embedded in a single batch request.
+
+        Args:
+            text: Entry text
+
+        Returns:
+            (entry embedding, [((start, end), passage embedding), ...]); the
+            passage list is empty for short entries
+        """
+        spans = []
+        if len(text) > settings.chunk_min_entry_chars:
+            spans = split_into_chunks(
+                text, max_chars=settings.chunk_max_chars, min_chars=settings.chunk_min_chars
+            )
+        if len(spans) < 2:
+            return await EmbeddingsService.embed_text(text), []
+
+        embeddings = await EmbeddingsService.embed_texts(
+            [text] + [text[start:end] for start, end in spans]
+        )
+        return embeddings[0], list(zip(spans, embeddings[1:]))
+
     @staticmethod
     async def embed_journal_entries(entries: list[dict]) -> list[dict]:
         """
@@ -92,16 +368,18 @@ class EmbeddingsService:
             entries: List of journal entries with 'id' and 'text' keys
 
         Returns:
-            List of entries with 'embedding' added
+            List of entries with 'embedding' and 'embedding_model' added
         """
         try:
             logger.info(f"Embedding {len(entries)} journal entries")
 
             texts = [entry.get("text", "") for entry in entries]
             embeddings = await EmbeddingsService.embed_texts(texts)
+            model_tag = EmbeddingsService.model_tag()
 
             for entry, embedding in zip(entries, embeddings):
                 entry["embedding"] = embedding
+                entry["embedding_model"] = model_tag
 
             logger.info(f"Successfully embedded {len(entries)} entries")
 
@@ -110,3 +388,10 @@ class EmbeddingsService:
         except Exception as e:
             logger.error(f"Journal entry embedding failed: {str(e)}", exc_info=True)
             raise
+
+
+async def _embed_and_memoize(key: tuple[str, str], text: str) -> list[float]:
+    """Embed a query and put it in the shared memo."""
+    embedding = await EmbeddingsService.embed_text(text)
+    _query_cache.put(key, embedding)
+    return embedding
@@ -0,0 +1,523 @@
+"""Columnar in-memory representation of journal entries for the agents."""
+
+import json
+import logging
+from typing import Any, Iterable, Optional, Sequence, Union
+import numpy as np
+from app.schemas.extraction import EntryAnalysis
+from app.services.quantization import QuantizedEmbeddings
+
+logger = logging.getLogger(__name__)
+
+
+class Categories:
+    """Categorical column: int32 codes into labels (in first-seen order; -1 = missing)."""
+
+    __slots__ = ("codes", "labels")
+
+    def __init__(self, codes: np.ndarray, labels: list[str]):
+        self.codes = codes
+        self.labels = labels
+
+    @classmethod
+    def encode(cls, values: Iterable[Optional[str]], missing: Optional[str] = None) -> "Categories":
+        """
+        Encode labels as codes.
+
+        Args:
+            values: Labels (None for missing)
+            missing: Label to use for None (default: code -1)
+        """
+        index: dict[str, int] = {}
+        codes = []
+        for value in values:
+            if value is None:
+                value = missing
+            if value is None:
+                codes.append(-1)
+                continue
+            codes.append(index.setdefault(value, len(index)))
+        return cls(np.asarray(codes, dtype=np.int32), list(index))
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def mask(self, label: str) -> np.ndarray:
+        """Rows equal to `label`."""
+        if label not in self.labels:
+            return np.zeros(len(self.codes), dtype=bool)
+        return self.codes == self.labels.index(label)
+
+    def mask_where(self, predicate) -> np.ndarray:
+        """Rows whose label satisfies `predicate` (evaluated once per label, not per row)."""
+        matching = [code for code, label in enumerate(self.labels) if predicate(label)]
+        return np.isin(self.codes, matching)
+
+    def label(self, row: int) -> Optional[str]:
+        """Label of one row."""
+        code = int(self.codes[row])
+        return self.labels[code] if code >= 0 else None
+
+    def decode(self) -> list[Optional[str]]:
+        """Labels for all rows."""
+        return [self.labels[code] if code >= 0 else None for code in self.codes.tolist()]
+
+    def counts(self) -> dict[str, int]:
+        """Rows per label, in first-seen order (missing rows are not counted)."""
+        present = self.codes[self.codes >= 0]
+        counts = np.bincount(present, minlength=len(self.labels))
+        return {label: int(count) for label, count in zip(self.labels, counts.tolist())}
+
+
+class EntryItems:
+    """
+    Per-entry lists (costs, tasks, vendors, ...) flattened into columns.
+
+    Items of entry i are rows offsets[i]:offsets[i + 1]; `owner` maps each
+    row back to its entry.
+    """
+
+    __slots__ = ("offsets", "owner", "columns")
+
+    def __init__(self, offsets: np.ndarray, columns: dict[str, Any]):
+        self.offsets = offsets
+        self.owner = np.repeat(np.arange(len(offsets) - 1, dtype=np.int32), np.diff(offsets))
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.owner)
+
+    def __getitem__(self, column: str) -> Any:
+        return self.columns[column]
+
+    def rows(self, entry_index: int) -> range:
+        """Row numbers of one entry's items."""
+        return range(int(self.offsets[entry_index]), int(self.offsets[entry_index + 1]))
+
+
+def _flatten(groups: Sequence[Sequence[Any]], fields: dict[str, str]) -> EntryItems:
+    """
+    Flatten per-entry item lists into columns.
+
+    Args:
+        groups: Items per entry
+        fields: Attribute name ("value" for the item itself, e.g. theme
+            strings) -> kind: "float" (float64, NaN = missing), "category"
+            (Categories, -1 = missing), "category_blank" (Categories,
+            missing = "") or "object" (Python list)
+    """
+    offsets = np.zeros(len(groups) + 1, dtype=np.int32)
+    np.cumsum([len(items) for items in groups], out=offsets[1:])
+    rows = [item for items in groups for item in items]
+
+    columns: dict[str, Any] = {}
+    for name, kind in fields.items():
+        values = [getattr(item, name) if name != "value" else item for item in rows]
+        if kind == "float":
+            columns[name] = np.asarray(
+                [np.nan if value is None else value for value in values], dtype=np.float64
+            )
+        elif kind == "category":
+            columns[name] = Categories.encode(values)
+        elif kind == "category_blank":
+            columns[name] = Categories.encode(values, missing="")
+        else:
+            columns[name] = values
+    return EntryItems(offsets, columns)
+
+
+class EntryBatch:
+    """
+    Read-only columnar batch of journal entries.
+
+    Built once from DB rows (or request payloads) and shared by the Memory
+    and Insight agents. Embeddings are one L2-normalized float32 matrix
+    (cosine similarity is a single matrix-vector product), sentiments are
+    categorical codes and costs, tasks, vendors, dates and themes are flat
+    columns instead of nested dicts. The raw entities/sentiment JSON is kept
+    as bytes and only decoded for entries that are returned to the client.
+    A 10k-entry batch takes about an eighth of the memory of the equivalent
+    list of dicts, almost all of it the float32 matrix (see bench_entry_batch.py);
+    quantize() shrinks the matrix further (see bench_quantization.py).
+
+    Long entries can also carry passage embeddings (attach_chunks); an
+    entry then scores the best of its own vector and its passages' (max-sim).
+    """
+
+    __slots__ = (
+        "ids",
+        "texts",
+        "dates",
+        "embeddings",
+        "has_embedding",
+        "emotion",
+        "sentiment_confidence",
+        "themes",
+        "costs",
+        "tasks",
+        "vendors",
+        "event_dates",
+        "chunks",
+        "chunk_embeddings",
+        "_meta_json",
+    )
+
+    def __init__(
+        self,
+        entries: Sequence[EntryAnalysis],
+        embeddings: Union[np.ndarray, QuantizedEmbeddings],
+        has_embedding: np.ndarray,
+        meta_json: list[bytes],
+    ):
+        self.ids = np.asarray([entry.id for entry in entries], dtype=object)
+        self.texts = [entry.text or "" for entry in entries]
+        self.dates = [entry.date for entry in entries]
+        self.embeddings = embeddings
+        self.has_embedding = has_embedding
+        self._meta_json = meta_json
+
+        self.emotion = Categories.encode(
+            entry.sentiment.emotion if entry.sentiment else None for entry in entries
+        )
+        self.sentiment_confidence = np.asarray(
+            [entry.sentiment.confidence if entry.sentiment else np.nan for entry in entries],
+            dtype=np.float32,
+        )
+        self.themes = _flatten([entry.themes for entry in entries], {"value": "category"})
+        self.costs = _flatten(
+            [entry.entities.costs for entry in entries],
+            {"amount": "float", "category": "category_blank"},
+        )
+        self.tasks = _flatten(
+            [entry.tasks.explicit for entry in entries],
+            {"task": "object", "deadline": "object", "status": "category", "priority": "category"},
+        )
+        self.vendors = _flatten(
+            [entry.entities.vendors for entry in entries],
+            {"name": "object", "category": "category", "status": "category"},
+        )
+        self.event_dates = _flatten(
+            [entry.entities.dates for entry in entries], {"event": "object", "date": "object"}
+        )
+
+        # Passages of long entries: rows of chunks["start"] / ["end"] per entry
+        self.chunks = EntryItems(
+            np.zeros(len(entries) + 1, dtype=np.int32),
+            {"start": np.zeros(0, dtype=np.int32), "end": np.zeros(0, dtype=np.int32)},
+        )
+        self.chunk_embeddings = np.zeros((0, embeddings.shape[1]), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_dicts(
+        cls,
+        entries: list[dict],
+        model_tag: Optional[str] = None,
+        embeddings: Optional[np.ndarray] = None,
+    ) -> "EntryBatch":
+        """
+        Build a batch from entry dicts (API payloads or converted rows).
+
+        Args:
+            entries: Dicts with 'id', 'text', 'date', 'entities', 'tasks',
+                'sentiment', 'themes' and optional 'embedding' / 'embedding_model'
+                and 'chunks' (passages as {'start', 'end', 'embedding'})
+            model_tag: Only embeddings from this model are kept (default: all)
+            embeddings: Already-decoded float32 matrix, one row per entry (see
+                vector_io.decode_vectors); used instead of the 'embedding' keys
+        """
+        analyses = EntryAnalysis.from_entries(entries)
+        meta_json = [
+            json.dumps(
+                {"entities": entry.get("entities", {}), "sentiment": entry.get("sentiment")},
+                separators=(",", ":"),
+            ).encode("utf-8")
+            for entry in entries
+        ]
+
+        if embeddings is not None:
+            has_embedding = np.full(len(entries), embeddings.shape[1] > 0)
+            return cls(analyses, _normalize_rows(embeddings), has_embedding, meta_json)
+
+        vectors = []
+        chunk_owners, chunk_spans, chunk_vectors = [], [], []
+        for entry in entries:
+            vector = entry.get("embedding")
+            embedding_model = entry.get("embedding_model")
+            if vector is not None and model_tag and embedding_model not in (None, model_tag):
+                logger.warning(
+                    f"Entry {entry.get('id')} embedded with {embedding_model}, skipping"
+                )
+                vector = None
+            vectors.append(vector)
+            if vector is None:
+                continue
+            for chunk in entry.get("chunks") or []:
+                chunk_owners.append(str(entry.get("id")))
+                chunk_spans.append((chunk["start"], chunk["end"]))
+                chunk_vectors.append(chunk["embedding"])
+
+        embeddings, has_embedding = _embedding_matrix(vectors)
+        batch = cls(analyses, embeddings, has_embedding, meta_json)
+        if chunk_vectors:
+            matrix, present = _embedding_matrix(chunk_vectors)
+            batch.attach_chunks(
+                [owner for owner, keep in zip(chunk_owners, present) if keep],
+                [span for span, keep in zip(chunk_spans, present) if keep],
+                matrix[present],
+            )
+        return batch
+
+    @classmethod
+    def from_rows(
+        cls,
+        rows: Sequence[Any],
+        model_tag: Optional[str] = None,
+        embeddings: Optional[np.ndarray] = None,
+    ) -> "EntryBatch":
+        """
+        Build a batch from journal entry rows.
+
+        Args:
+            rows: JournalEntry rows (or row tuples with the same attribute names:
+                id, raw_text, created_at, meta, themes and, unless `embeddings`
+                is given, embedding and embedding_model)
+            model_tag: Only embeddings from this model are kept (default: all)
+            embeddings: Already-decoded matrix, one row per row (skips row.embedding)
+        """
+        return cls.from_dicts(
+            [
+                {
+                    "id": str(row.id),
+                    "text": row.raw_text,
+                    "date": row.created_at.isoformat() if row.created_at else None,
+                    "embedding": row.embedding if embeddings is None else None,
+                    "embedding_model": row.embedding_model if embeddings is None else None,
+                    "entities": row.meta.get("entities", {}) if row.meta else {},
+                    "sentiment": row.meta.get("sentiment", {}) if row.meta else {},
+                    "themes": row.themes or [],
+                }
+                for row in rows
+            ],
+            model_tag,
+            embeddings,
+        )
+
+    @classmethod
+    def coerce(
+        cls, entries: Union["EntryBatch", list[dict]], model_tag: Optional[str] = None
+    ) -> "EntryBatch":
+        """Accept a batch as is, or build one from entry dicts."""
+        if isinstance(entries, EntryBatch):
+            return entries
+        return cls.from_dicts(entries, model_tag)
+
+    def attach_chunks(
+        self,
+        entry_ids: Sequence[str],
+        spans: Sequence[tuple[int, int]],
+        embeddings: np.ndarray,
+    ) -> "EntryBatch":
+        """
+        Add passage embeddings of long entries.
+
+        Args:
+            entry_ids: Owning entry of each passage (passages of entries
+                that are not in the batch are ignored)
+            spans: (start, end) of each passage in its entry's text
+            embeddings: Passage embeddings, row i for entry_ids[i] (same
+                dimensions as the entry embeddings)
+
+        Returns:
+            This batch
+        """
+        if isinstance(self.embeddings, QuantizedEmbeddings):
+            raise ValueError("Attach chunks before quantizing")
+        if len(entry_ids) and embeddings.shape[1] != self.embeddings.shape[1]:
+            raise ValueError(
+                f"Chunk embeddings have {embeddings.shape[1]} dimensions, "
+                f"entries have {self.embeddings.shape[1]}"
+            )
+
+        rows = {entry_id: row for row, entry_id in enumerate(self.ids.tolist())}
+        owners = np.asarray([rows.get(str(entry_id), -1) for entry_id in entry_ids], dtype=np.int32)
+        keep = np.flatnonzero((owners >= 0) & self.has_embedding[np.maximum(owners, 0)])
+        keep = keep[np.argsort(owners[keep], kind="stable")]
+
+        offsets = np.zeros(len(self) + 1, dtype=np.int32)
+        np.cumsum(np.bincount(owners[keep], minlength=len(self)), out=offsets[1:])
+        span_array = np.asarray(spans, dtype=np.int32).reshape(-1, 2)[keep]
+        self.chunks = EntryItems(offsets, {"start": span_array[:, 0], "end": span_array[:, 1]})
+        self.chunk_embeddings = _normalize_rows(np.array(embeddings[keep], dtype=np.float32))
+        return self
+
+    @property
+    def approximate(self) -> bool:
+        """Whether similarities() are candidate scores that need a full-precision re-rank."""
+        return isinstance(self.embeddings, QuantizedEmbeddings) and self.embeddings.approximate
+
+    def quantize(self, mode: str, dimensions: Optional[int] = None) -> "EntryBatch":
+        """
+        Replace the float32 matrix with a reduced-precision / reduced-dimension copy.
+
+        Args:
+            mode: One of quantization.STORAGE_MODES
+            dimensions: Leading (Matryoshka) dimensions to keep (default: all)
+
+        Returns:
+            This batch
+        """
+        if isinstance(self.embeddings, QuantizedEmbeddings):
+            raise ValueError("Embeddings are already quantized")
+        if mode != "float32" or (dimensions and dimensions < self.embeddings.shape[1]):
+            self.embeddings = QuantizedEmbeddings.from_matrix(self.embeddings, mode, dimensions)
+            self.chunk_embeddings = QuantizedEmbeddings.from_matrix(
+                self.chunk_embeddings, mode, dimensions
+            )
+        return self
+
+    def _unit_query(self, query_embedding: Sequence[float]) -> Optional[np.ndarray]:
+        """Query as a unit float32 vector (None if its dimensions do not match; zeros if zero)."""
+        if isinstance(self.embeddings, QuantizedEmbeddings):
+            dimensions = self.embeddings.source_dimensions
+        else:
+            dimensions = self.embeddings.shape[1]
+        query = np.asarray(query_embedding, dtype=np.float32)
+        if query.shape != (dimensions,):
+            logger.warning(
+                f"Query embedding has {query.size} dimensions, entries have {dimensions}"
+            )
+            return None
+        norm = np.linalg.norm(query)
+        return query / norm if norm > 0 else query
+
+    def similarities(self, query_embedding: Sequence[float]) -> np.ndarray:
+        """
+        Cosine similarity of every entry to the query (NaN where there is no embedding).
+
+        Entries with passages score the best of their own and their passages' similarity.
+        """
+        scores = np.full(len(self), np.nan, dtype=np.float32)
+        if not self.has_embedding.any():
+            return scores
+
+        query = self._unit_query(query_embedding)
+        if query is None:
+            return scores
+        if not query.any():
+            scores[self.has_embedding] = 0.0
+            return scores
+
+        # Rows without an embedding are zero and masked afterwards, which is
+        # cheaper than gathering the embedded rows into a copy first
+        similarities = _similarities(self.embeddings, query)
+        scores[self.has_embedding] = similarities[self.has_embedding]
+
+        if len(self.chunks):
+            # Passages are grouped by entry, so one reduceat gives each entry's best
+            counts = np.diff(self.chunks.offsets)
+            chunked = np.flatnonzero(counts)
+            best = np.maximum.reduceat(
+                _similarities(self.chunk_embeddings, query), self.chunks.offsets[chunked]
+            )
+            scores[chunked] = np.fmax(scores[chunked], best)
+        return scores
+
+    def best_chunks(
+        self, indices: np.ndarray, query_embedding: Sequence[float]
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Best-matching passage of some entries.
+
+        Only the passages of `indices` are scored.
+
+        Args:
+            indices: Entry rows
+            query_embedding: Query embedding
+
+        Returns:
+            (score, passage row) per entry; NaN and -1 for entries without passages
+        """
+        scores = np.full(len(indices), np.nan, dtype=np.float32)
+        rows = np.full(len(indices), -1, dtype=np.int64)
+        if not len(self.chunks) or not len(indices):
+            return scores, rows
+        query = self._unit_query(query_embedding)
+        if query is None:
+            return scores, rows
+
+        starts = self.chunks.offsets[indices]
+        counts = self.chunks.offsets[indices + 1] - starts
+        chunked = np.flatnonzero(counts)
+        if not len(chunked):
+            return scores, rows
+        passage_rows = np.concatenate(
+            [np.arange(starts[i], starts[i] + counts[i]) for i in chunked.tolist()]
+        )
+        passage_scores = _similarities(self.chunk_embeddings, query, passage_rows)
+
+        group_starts = np.zeros(len(chunked), dtype=np.int64)
+        np.cumsum(counts[chunked][:-1], out=group_starts[1:])
+        for group, i in enumerate(chunked.tolist()):
+            start = group_starts[group]
+            best = start + int(np.argmax(passage_scores[start : start + counts[i]]))
+            scores[i] = passage_scores[best]
+            rows[i] = passage_rows[best]
+        return scores, rows
+
+    def passage(self, index: int, chunk_row: int = -1) -> str:
+        """Text of one of an entry's passages (the whole text when chunk_row is -1)."""
+        text = self.texts[index]
+        if chunk_row < 0:
+            return text
+        return text[int(self.chunks["start"][chunk_row]) : int(self.chunks["end"][chunk_row])]
+
+    def result(self, index: int, relevance_score: float, chunk_row: int = -1) -> dict[str, Any]:
+        """One entry in the search-result dict format ('passage' is the best-matching passage)."""
+        meta = json.loads(self._meta_json[index])
+        text = self.texts[index]
+        return {
+            "id": self.ids[index],
+            "text": text[:200],  # Preview
+            "date": self.dates[index],
+            "relevance_score": float(relevance_score),
+            "full_text": text,
+            "passage": self.passage(index, chunk_row),
+            "entities": meta["entities"],
+            "sentiment": meta["sentiment"],
+        }
+
+
+def _similarities(
+    embeddings: Union[np.ndarray, QuantizedEmbeddings],
+    query: np.ndarray,
+    rows: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Scores of (some) rows of a float32 or quantized matrix against a unit query."""
+    if isinstance(embeddings, QuantizedEmbeddings):
+        return embeddings.similarities(query, rows)
+    return (embeddings if rows is None else embeddings[rows]) @ query
+
+
+def _embedding_matrix(vectors: list[Any]) -> tuple[np.ndarray, np.ndarray]:
+    """Stack embeddings into an L2-normalized float32 matrix plus a presence mask."""
+    dimensions = next((len(vector) for vector in vectors if vector is not None and len(vector)), 0)
+    matrix = np.zeros((len(vectors), dimensions), dtype=np.float32)
+    present = np.zeros(len(vectors), dtype=bool)
+
+    for i, vector in enumerate(vectors):
+        if vector is None or len(vector) != dimensions or dimensions == 0:
+            continue
+        matrix[i] = vector
+        present[i] = True
+
+    return _normalize_rows(matrix), present
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize rows in place (zero rows stay zero)."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
@@ -0,0 +1,127 @@
+"""Retrieval of prior entries and known entities for retrieval-augmented intake."""
+
+import logging
+from typing import Any, Optional
+from uuid import UUID
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.models import JournalEntry, MasterEntity
+from app.services.quantization import distance_expression
+
+logger = logging.getLogger(__name__)
+
+
+class IntakeContextService:
+    """Service for the small, index-backed lookups that feed the intake prompt."""
+
+    @staticmethod
+    async def related_entries(
+        session: AsyncSession,
+        query_embedding: list[float],
+        model_tag: str,
+        top_k: int = 5,
+        user_id: Optional[UUID] = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Find the entries nearest to an embedding.
+
+        Ordering by cosine distance with a LIMIT lets Postgres answer from the
+        ivfflat index instead of shipping every stored vector to the app. Only
+        the columns needed for the prompt are selected (no embeddings). With
+        quantized storage the halfvec / binary index picks
+        top_k * embedding_rerank_factor candidates and only those are ranked
+        by exact cosine distance.
+
+        Args:
+            session: Database session
+            query_embedding: Embedding of the new entry
+            model_tag: Embedding model tag; vectors from other models are skipped
+            top_k: Number of entries to return
+            user_id: Only this user's entries (prunes a partitioned table to one partition)
+
+        Returns:
+            Entries (best first) with 'id', 'text', 'date' and 'relevance_score'
+        """
+        try:
+            condition = (
+                JournalEntry.embedding.isnot(None),
+                JournalEntry.embedding_model == model_tag,
+            )
+            if user_id is not None:
+                condition += (JournalEntry.user_id == user_id,)
+            mode = settings.embedding_storage
+            if mode != "float32":
+                coarse = distance_expression(JournalEntry.embedding, query_embedding, mode)
+                candidates = (
+                    select(JournalEntry.id)
+                    .where(*condition)
+                    .order_by(coarse)
+                    .limit(top_k * settings.embedding_rerank_factor)
+                )
+                condition = (JournalEntry.id.in_(candidates),)
+
+            distance = JournalEntry.embedding.cosine_distance(query_embedding).label("distance")
+            stmt = (
+                select(JournalEntry.id, JournalEntry.raw_text, JournalEntry.created_at, distance)
+                .where(*condition)
+                .order_by(distance)
+                .limit(top_k)
+            )
+
+            result = await session.execute(stmt)
+            return [
+                {
+                    "id": str(entry_id),
+                    "text": raw_text,
+                    "date": created_at.isoformat() if created_at else None,
+                    "relevance_score": 1.0 - float(entry_distance),
+                }
+                for entry_id, raw_text, created_at, entry_distance in result.all()
+            ]
+
+        except Exception as e:
+            logger.error(f"Related entry lookup failed: {str(e)}", exc_info=True)
+            raise
+
+    @staticmethod
+    async def known_entities(
+        session: AsyncSession,
+        limit: int = 20,
+    ) -> list[dict[str, Any]]:
+        """
+        Get the most frequently mentioned canonical entities.
+
+        Args:
+            session: Database session
+            limit: Maximum number of entities
+
+        Returns:
+            Entities with 'entity_type', 'canonical_name', 'mention_count' and 'decision_made'
+        """
+        try:
+            stmt = (
+                select(
+                    MasterEntity.entity_type,
+                    MasterEntity.canonical_name,
+                    MasterEntity.mention_count,
+                    MasterEntity.decision_made,
+                )
+                .order_by(MasterEntity.mention_count.desc(), MasterEntity.last_mentioned.desc())
+                .limit(limit)
+            )
+
+            result = await session.execute(stmt)
+            return [
+                {
+                    "entity_type": entity_type,
+                    "canonical_name": canonical_name,
+                    "mention_count": mention_count,
+                    "decision_made": decision_made,
+                }
+                for entity_type, canonical_name, mention_count, decision_made in result.all()
+            ]
+
+        except Exception as e:
+            logger.error(f"Known entity lookup failed: {str(e)}", exc_info=True)
+            raise
@@ -4,11 +4,15 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, desc, func
 from sqlalchemy.orm import selectinload
 from uuid import UUID
-from app.models import JournalEntry, Entity, Task as TaskModel, UserPreference
+from app.models import JournalEntry, EntryChunk, Entity, Task as TaskModel, UserPreference
 from app.schemas import JournalEntryCreateRequest, JournalEntryResponse
+from app.services.embeddings import EmbeddingsService
 from typing import List, Optional
+import logging
 import uuid
 
+logger = logging.getLogger(__name__)
+
 
 class JournalService:
     """Service for journal entry operations."""
@@ -31,6 +35,23 @@ class JournalService:
             metadata={}
         )
 
+        # Embed for search; the entry is still saved if the embeddings backend is down
+        try:
+            entry.embedding, passages = await EmbeddingsService.embed_entry(request.text)
+            entry.embedding_model = EmbeddingsService.model_tag()
+            entry.chunks = [
+                EntryChunk(
+                    chunk_index=index,
+                    start_char=start,
+                    end_char=end,
+                    embedding=embedding,
+                    embedding_model=entry.embedding_model,
+                )
+                for index, ((start, end), embedding) in enumerate(passages)
+            ]
+        except Exception as e:
+            logger.warning(f"Could not embed entry {entry.id}: {str(e)}")
+
         db.add(entry)
         await db.flush()
         await db.refresh(entry, ["entities", "tasks"])
@@ -0,0 +1,96 @@
+"""Keyword search service using Postgres full-text and trigram indexes."""
+
+import logging
+from typing import Optional
+from uuid import UUID
+from sqlalchemy import select, func, or_, literal_column
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import JournalEntry, Entity
+from app.schemas.retrieval import SearchFilters
+from app.services.search_filters import entry_filter_conditions
+
+logger = logging.getLogger(__name__)
+
+
+class KeywordSearchService:
+    """Service for lexical search over entry text and entity names (no network calls)."""
+
+    # 'simple' matches the expression indexes in migration 003 (no language stemming)
+    TS_CONFIG = "simple"
+
+    @staticmethod
+    async def search(
+        session: AsyncSession,
+        query: str,
+        limit: int = 20,
+        filters: Optional[SearchFilters] = None,
+        user_id: Optional[UUID] = None,
+    ) -> list[tuple[JournalEntry, float]]:
+        """
+        Search journal entries by keywords and fuzzy vendor/entity names.
+
+        Combines full-text matching (tsvector), trigram word similarity on the
+        entry text and trigram similarity on extracted entity names, so that
+        queries like "Mamma's Kitchen" or "mammas kitchn" both match.
+
+        Args:
+            session: Database session
+            query: Search query text
+            limit: Maximum number of entries to return
+            filters: Structured filters the entries must match
+            user_id: Only search this user's entries (None: all users)
+
+        Returns:
+            List of (entry, keyword_score) tuples ordered by score
+        """
+        try:
+            logger.info(f"Keyword search for: {query[:100]} (limit={limit})")
+
+            # Inline the config (not a bind param) so the planner can use the expression indexes
+            ts_config = literal_column(f"'{KeywordSearchService.TS_CONFIG}'::regconfig")
+            ts_query = func.websearch_to_tsquery(ts_config, query)
+            entry_document = func.to_tsvector(ts_config, JournalEntry.raw_text)
+            entity_document = func.to_tsvector(ts_config, Entity.entity_name)
+
+            entity_match = or_(
+                Entity.entity_name.op("%")(query),
+                entity_document.op("@@")(ts_query),
+            )
+
+            # Best entity-name similarity for each entry (correlated, only for returned rows)
+            entity_score = (
+                select(func.max(func.similarity(Entity.entity_name, query)))
+                .where(Entity.entry_id == JournalEntry.id)
+                .correlate(JournalEntry)
+                .scalar_subquery()
+            )
+
+            score = func.greatest(
+                func.ts_rank_cd(entry_document, ts_query),
+                func.word_similarity(query, JournalEntry.raw_text),
+                func.coalesce(entity_score, 0.0),
+            ).label("keyword_score")
+
+            stmt = (
+                select(JournalEntry, score)
+                .where(
+                    or_(
+                        entry_document.op("@@")(ts_query),
+                        JournalEntry.raw_text.op("%>")(query),
+                        JournalEntry.id.in_(select(Entity.entry_id).where(entity_match)),
+                    ),
+                    *entry_filter_conditions(filters, user_id),
+                )
+                .order_by(score.desc(), JournalEntry.id)
+                .limit(limit)
+            )
+
+            result = await session.execute(stmt)
+            matches = [(entry, float(keyword_score)) for entry, keyword_score in result.all()]
+
+            logger.info(f"Keyword search found {len(matches)} entries")
+            return matches
+
+        except Exception as e:
+            logger.error(f"Keyword search failed: {str(e)}", exc_info=True)
+            raise
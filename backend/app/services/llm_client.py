@@ -0,0 +1,409 @@
+"""Shared OpenAI client with deadlines, retries, hedged requests and circuit breakers."""
+
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Awaitable, BinaryIO, Callable, Optional, TypeVar
+import httpx
+from openai import APIConnectionError, APIStatusError, AsyncOpenAI
+from app.config import settings
+from app.services.metrics import metrics
+from app.services.rate_limiter import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Status codes worth retrying (OpenAI documents 409 as a transient lock conflict)
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling upstream while its circuit breaker is open."""
+
+
+class DeadlineExceededError(TimeoutError):
+    """Raised when a call (including retries) runs past its deadline."""
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an OpenAI error is transient (timeouts, connection errors, 429 and 5xx)."""
+    if isinstance(error, APIConnectionError):  # includes APITimeoutError
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES or error.status_code >= 500
+    return False
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after", ""))
+    except ValueError:
+        return None
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one upstream.
+
+    Closed: calls pass. After `failure_threshold` failed calls in a row (a
+    call that exhausts its retries counts once) the circuit opens and calls fail fast for `reset_timeout` seconds, so a
+    degraded upstream is not hammered and our workers are not tied up
+    waiting on it. Then one probe call is let through (half-open); its
+    success closes the circuit, its failure re-opens it.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now."""
+        if self.state == "open":
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self._set_state("half_open")
+
+        if self.state == "half_open":
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._probe_in_flight = False
+        if self.state != "closed":
+            self._set_state("closed")
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._probe_in_flight = False
+        if self.state == "half_open" or self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            if self.state != "open":
+                logger.warning(f"Circuit for {self.name} opened after {self._failures} failures")
+            self._set_state("open")
+
+    def release(self) -> None:
+        """Give back a half-open probe slot without a verdict (e.g. a client error)."""
+        self._probe_in_flight = False
+
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        metrics.set_gauge("llm_circuit_state", CIRCUIT_STATES[state], upstream=self.name)
+
+
+class ResilientLLMClient:
+    """
+    One shared OpenAI client with a common resilience policy.
+
+    Every call runs under a deadline covering all attempts. Transient errors
+    are retried with jittered exponential backoff (honouring Retry-After),
+    idempotent calls can be hedged (a second identical request is started if
+    the first is slow; the first to succeed wins), and each upstream
+    (chat, embeddings, audio) has its own circuit breaker and, optionally,
+    a client-side RateLimiter that every attempt and hedge must pass.
+    """
+
+    def __init__(
+        self,
+        client: AsyncOpenAI,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        limiters: Optional[dict[str, RateLimiter]] = None,
+    ):
+        self.client = client
+        self.limiters = limiters or {}
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers: dict[str, CircuitBreaker] = {}
+
+    def breaker(self, upstream: str) -> CircuitBreaker:
+        """Get the circuit breaker for an upstream."""
+        if upstream not in self._breakers:
+            self._breakers[upstream] = CircuitBreaker(
+                upstream, self.failure_threshold, self.reset_timeout
+            )
+        return self._breakers[upstream]
+
+    async def call(
+        self,
+        upstream: str,
+        request: Callable[[], Awaitable[T]],
+        deadline: float,
+        hedge_after: Optional[float] = None,
+        tokens: int = 0,
+    ) -> T:
+        """
+        Run a request with the resilience policy.
+
+        Args:
+            upstream: Name of the upstream (metrics and circuit breaker key)
+            request: Zero-argument coroutine factory; called once per attempt/hedge
+            deadline: Seconds allowed for all attempts together
+            hedge_after: Start a hedged duplicate after this many seconds
+                (None disables; only for idempotent requests)
+            tokens: Tokens the request counts against the upstream's tokens/min
+
+        Returns:
+            The request's result
+
+        Raises:
+            CircuitOpenError: The upstream's circuit is open
+            DeadlineExceededError: No attempt succeeded within the deadline
+        """
+        loop = asyncio.get_running_loop()
+        deadline_at = loop.time() + deadline
+        breaker = self.breaker(upstream)
+        started = time.perf_counter()
+        attempt = 0
+
+        while True:
+            if not breaker.allow():
+                metrics.increment("llm_calls_total", upstream=upstream, outcome="shed")
+                raise CircuitOpenError(f"Circuit for {upstream} is open")
+
+            try:
+                result = await self._limited_attempt(
+                    upstream, request, deadline_at, hedge_after, tokens
+                )
+            except asyncio.TimeoutError:
+                breaker.record_failure()
+                metrics.increment("llm_calls_total", upstream=upstream, outcome="deadline")
+                raise DeadlineExceededError(
+                    f"{upstream} call exceeded its {deadline:.1f}s deadline"
+                ) from None
+            except Exception as e:
+                if not is_retryable(e):
+                    breaker.release()
+                    metrics.increment("llm_calls_total", upstream=upstream, outcome="error")
+                    raise
+
+                delay = min(self.backoff_max, self.backoff_base * 2**attempt)
+                delay = max(delay * random.uniform(0.5, 1.0), _retry_after(e) or 0.0)
+
+                exhausted = attempt >= self.max_retries or loop.time() + delay >= deadline_at
+                if exhausted or breaker.state == "half_open":
+                    # One failure per call, not per attempt; a failed probe re-opens at once
+                    breaker.record_failure()
+                    metrics.increment("llm_calls_total", upstream=upstream, outcome="error")
+                    raise
+
+                attempt += 1
+                metrics.increment("llm_retries_total", upstream=upstream)
+                logger.warning(
+                    f"{upstream} call failed ({type(e).__name__}), "
+                    f"retry {attempt}/{self.max_retries} in {delay:.2f}s"
+                )
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # Cancelled: no verdict, but a half-open probe slot must not stay taken
+                breaker.release()
+                raise
+
+            breaker.record_success()
+            metrics.increment("llm_calls_total", upstream=upstream, outcome="ok")
+            metrics.observe("llm_call_seconds", time.perf_counter() - started, upstream=upstream)
+            return result
+
+    async def _limited_attempt(
+        self,
+        upstream: str,
+        request: Callable[[], Awaitable[T]],
+        deadline_at: float,
+        hedge_after: Optional[float],
+        tokens: int,
+    ) -> T:
+        loop = asyncio.get_running_loop()
+        limiter = self.limiters.get(upstream)
+        if limiter is None:
+            return await self._attempt(upstream, request, deadline_at - loop.time(), hedge_after)
+
+        async def hedge() -> T:
+            # A hedge is another request upstream: it takes its own slot and tokens
+            async with limiter.slot(tokens):
+                return await request()
+
+        # Time spent queued for the rate limiter counts against the deadline
+        async with asyncio.timeout_at(deadline_at):
+            async with limiter.slot(tokens):
+                if not limiter.idle:
+                    hedge_after = None  # a hedge would only add load while others wait
+                return await self._attempt(
+                    upstream, request, deadline_at - loop.time(), hedge_after, hedge
+                )
+
+    async def _attempt(
+        self,
+        upstream: str,
+        request: Callable[[], Awaitable[T]],
+        remaining: float,
+        hedge_after: Optional[float],
+        hedge: Optional[Callable[[], Awaitable[T]]] = None,
+    ) -> T:
+        if remaining <= 0:
+            raise asyncio.TimeoutError
+        if hedge_after is None or hedge_after >= remaining:
+            return await asyncio.wait_for(request(), remaining)
+
+        loop = asyncio.get_running_loop()
+        attempt_deadline = loop.time() + remaining
+        primary = asyncio.ensure_future(request())
+        pending = {primary}
+
+        try:
+            done, pending = await asyncio.wait(pending, timeout=hedge_after)
+            if not done:
+                metrics.increment("llm_hedges_total", upstream=upstream)
+                pending.add(asyncio.ensure_future((hedge or request)()))
+
+            error: Optional[BaseException] = None
+            while True:
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            metrics.increment("llm_hedge_wins_total", upstream=upstream)
+                        return task.result()
+                    error = task.exception()
+
+                if not pending:
+                    raise error
+
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=attempt_deadline - loop.time(),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    raise asyncio.TimeoutError
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def chat_completion(self, estimated_tokens: Optional[int] = None, **kwargs: Any) -> Any:
+        """
+        chat.completions.create under the chat deadline (hedged if configured).
+
+        `estimated_tokens` (prompt + max_tokens, as OpenAI counts it against
+        tokens/min) is estimated from the messages when not given.
+        """
+        if estimated_tokens is None:
+            prompt_chars = sum(len(message.get("content") or "") for message in kwargs["messages"])
+            estimated_tokens = prompt_chars // 4 + (kwargs.get("max_tokens") or 0)
+
+        return await self.call(
+            "chat",
+            lambda: self.client.chat.completions.create(**kwargs),
+            deadline=settings.llm_chat_deadline_seconds,
+            hedge_after=settings.llm_chat_hedge_after_seconds,
+            tokens=estimated_tokens,
+        )
+
+    async def embeddings(self, **kwargs: Any) -> Any:
+        """embeddings.create under the embeddings deadline (hedged if configured)."""
+        texts = kwargs["input"] if isinstance(kwargs["input"], list) else [kwargs["input"]]
+        return await self.call(
+            "embeddings",
+            lambda: self.client.embeddings.create(**kwargs),
+            deadline=settings.llm_embeddings_deadline_seconds,
+            hedge_after=settings.llm_embeddings_hedge_after_seconds,
+            tokens=sum(len(text) for text in texts) // 4,
+        )
+
+    async def transcription(self, file_name: str, stream: BinaryIO, **kwargs: Any) -> Any:
+        """
+        audio.transcriptions.create under the audio deadline.
+
+        Never hedged (the upload stream can only be read by one request at a
+        time); the stream is rewound before each retry.
+        """
+        start = stream.tell()
+        # Whisper answers only after processing the whole upload; allow the full deadline
+        kwargs.setdefault("timeout", settings.llm_transcription_deadline_seconds)
+
+        def request() -> Awaitable[Any]:
+            stream.seek(start)
+            return self.client.audio.transcriptions.create(file=(file_name, stream), **kwargs)
+
+        return await self.call(
+            "audio",
+            request,
+            deadline=settings.llm_transcription_deadline_seconds,
+        )
+
+
+def create_openai_client(base_url: Optional[str] = None) -> AsyncOpenAI:
+    """AsyncOpenAI with explicit timeouts and SDK retries off (ResilientLLMClient retries)."""
+    return AsyncOpenAI(
+        api_key=settings.openai_api_key,
+        base_url=base_url or settings.openai_base_url,
+        timeout=httpx.Timeout(
+            settings.llm_request_timeout_seconds,
+            connect=settings.llm_connect_timeout_seconds,
+        ),
+        max_retries=0,
+    )
+
+
+_llm_client: Optional[ResilientLLMClient] = None
+
+
+def get_llm_client() -> ResilientLLMClient:
+    """Get the shared client (created on first use)."""
+    global _llm_client
+    if _llm_client is None:
+        _llm_client = ResilientLLMClient(
+            create_openai_client(),
+            max_retries=settings.llm_max_retries,
+            backoff_base=settings.llm_backoff_base_seconds,
+            backoff_max=settings.llm_backoff_max_seconds,
+            failure_threshold=settings.llm_circuit_failure_threshold,
+            reset_timeout=settings.llm_circuit_reset_seconds,
+            limiters={
+                "chat": RateLimiter(
+                    "chat",
+                    settings.llm_chat_requests_per_minute,
+                    settings.llm_chat_tokens_per_minute,
+                    settings.llm_chat_max_concurrency,
+                ),
+                "embeddings": RateLimiter(
+                    "embeddings",
+                    settings.llm_embeddings_requests_per_minute,
+                    settings.llm_embeddings_tokens_per_minute,
+                    settings.llm_embeddings_max_concurrency,
+                ),
+                # Whisper is limited by requests only
+                "audio": RateLimiter(
+                    "audio",
+                    settings.llm_audio_requests_per_minute,
+                    tokens_per_minute=None,
+                    max_concurrency=settings.llm_audio_max_concurrency,
+                ),
+            },
+        )
+    return _llm_client
+
+
+def set_llm_client(client: Optional[ResilientLLMClient]) -> None:
+    """Override the shared client (None restores the configured one)."""
+    global _llm_client
+    _llm_client = client
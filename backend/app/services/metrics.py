@@ -0,0 +1,85 @@
+"""In-process metrics registry (counters, gauges and timings) exposed at /metrics."""
+
+import threading
+from collections import deque
+from typing import Any
+
+# Number of recent observations kept per timing for percentiles
+TIMING_WINDOW = 1024
+
+
+def _metric_key(name: str, labels: dict[str, Any]) -> str:
+    if not labels:
+        return name
+    label_str = ",".join(f"{k}={v}" for k, v in sorted(labels.items()))
+    return f"{name}{{{label_str}}}"
+
+
+def _percentile(sorted_values: list[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class MetricsRegistry:
+    """Thread-safe registry of named metrics with optional labels."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[str, float] = {}
+        self._gauges: dict[str, float] = {}
+        self._timings: dict[str, dict[str, Any]] = {}
+
+    def increment(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        """Add to a counter."""
+        key = _metric_key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def set_gauge(self, name: str, value: float, **labels: Any) -> None:
+        """Set a gauge to its current value."""
+        key = _metric_key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """Record one observation of a timing/size distribution."""
+        key = _metric_key(name, labels)
+        with self._lock:
+            timing = self._timings.get(key)
+            if timing is None:
+                timing = {"count": 0, "sum": 0.0, "max": 0.0, "recent": deque(maxlen=TIMING_WINDOW)}
+                self._timings[key] = timing
+            timing["count"] += 1
+            timing["sum"] += value
+            timing["max"] = max(timing["max"], value)
+            timing["recent"].append(value)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Get a JSON-serializable copy of all metrics."""
+        with self._lock:
+            timings = {}
+            for key, timing in self._timings.items():
+                recent = sorted(timing["recent"])
+                timings[key] = {
+                    "count": timing["count"],
+                    "sum": timing["sum"],
+                    "max": timing["max"],
+                    "p50": _percentile(recent, 0.5) if recent else 0.0,
+                    "p95": _percentile(recent, 0.95) if recent else 0.0,
+                }
+
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "timings": timings,
+            }
+
+    def reset(self) -> None:
+        """Clear all metrics (for tests)."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._timings.clear()
+
+
+metrics = MetricsRegistry()
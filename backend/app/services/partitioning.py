@@ -0,0 +1,168 @@
+"""DDL for the optional partitioned layout of journal_entries (see partition_entries.py)."""
+
+import logging
+import re
+from datetime import date
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# user_hash: HASH (user_id), a user's entries live in one partition;
+# month: RANGE (created_at), one partition per calendar month plus a default
+PARTITION_SCHEMES = ("user_hash", "month")
+
+TABLE = "journal_entries"
+UNPARTITIONED_TABLE = "journal_entries_unpartitioned"
+DEFAULT_PARTITION = "journal_entries_default"
+
+_PARTITION_KEYS = {"user_hash": "user_id", "month": "created_at"}
+_INDEX_NAME_RE = re.compile(r"^CREATE (UNIQUE )?INDEX (\S+) ON (?:ONLY )?(?:\S+\.)?(\S+) ")
+_IVFFLAT_OPTIONS_RE = re.compile(r" WITH \(lists\s*=\s*'?\d+'?\)")
+
+
+def _add_months(month: date, count: int) -> date:
+    """First day of the month `count` months after `month`."""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_partition_name(month: date) -> str:
+    """Partition holding the entries created in `month`, e.g. journal_entries_y2025m03."""
+    return f"{TABLE}_y{month.year}m{month.month:02d}"
+
+
+def month_partition_statements(first_month: date, months: int) -> list[str]:
+    """
+    CREATE statements for monthly partitions, skipping existing ones.
+
+    Create months before entries arrive for them: rows that land in the
+    default partition make a later CREATE for their month fail until they
+    are moved out.
+
+    Args:
+        first_month: Any day in the first month
+        months: Number of consecutive months
+
+    Returns:
+        SQL statements
+    """
+    start = first_month.replace(day=1)
+    statements = []
+    for i in range(months):
+        month = _add_months(start, i)
+        statements.append(
+            f"CREATE TABLE IF NOT EXISTS {month_partition_name(month)} PARTITION OF {TABLE} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+        )
+    return statements
+
+
+def rewrite_index_definition(definition: str, table: str) -> str:
+    """
+    Re-target a pg_indexes.indexdef at another table.
+
+    IVFFlat indexes become HNSW: an IVFFlat index is clustered from the rows
+    it is built on, and an index on a partitioned parent is also built for
+    every partition created later, while it is still empty (e.g. next
+    month's); HNSW needs no training data.
+
+    Args:
+        definition: CREATE INDEX statement as stored in pg_indexes
+        table: Table the index should be created on
+
+    Returns:
+        CREATE INDEX statement for `table`
+    """
+    match = _INDEX_NAME_RE.match(definition)
+    if match is None:
+        raise ValueError(f"Unrecognized index definition: {definition}")
+    unique, name, _ = match.groups()
+    rewritten = f"CREATE {unique or ''}INDEX {name} ON {table} " + definition[match.end() :]
+    if " USING ivfflat " in rewritten:
+        rewritten = rewritten.replace(" USING ivfflat ", " USING hnsw ")
+        rewritten = _IVFFLAT_OPTIONS_RE.sub("", rewritten)
+    return rewritten
+
+
+def partition_layout_statements(
+    scheme: str,
+    index_definitions: list[str],
+    foreign_keys: list[tuple[str, str]],
+    partitions: int = 16,
+    first_month: Optional[date] = None,
+    months: int = 0,
+) -> list[str]:
+    """
+    Statements that move journal_entries into a partitioned table.
+
+    Run them in one transaction (the table is locked and copied). The old
+    table is kept as journal_entries_unpartitioned for verification and can
+    be dropped afterwards. Indexes are re-created on the new parent after
+    the copy, which gives every partition its own indexes: each HNSW graph
+    covers only its partition's vectors, builds and vacuums independently,
+    and a query with `user_id = ...` (user_hash) or a created_at range
+    (month) only scans the matching partitions.
+
+    A partitioned table can only enforce uniqueness on keys that include
+    the partition key, so the primary key becomes (id, <partition key>)
+    and the entry_id foreign keys of entities, tasks and entry_chunks are
+    dropped; deleting an entry through the ORM still deletes its children
+    (the relationships cascade).
+
+    Args:
+        scheme: One of PARTITION_SCHEMES
+        index_definitions: pg_indexes.indexdef of journal_entries' indexes
+            (other than the primary key)
+        foreign_keys: (table, constraint name) of the foreign keys that
+            reference journal_entries
+        partitions: Number of hash partitions (user_hash)
+        first_month: First monthly partition (month; default: none, only the
+            default partition)
+        months: Number of monthly partitions from first_month (month)
+
+    Returns:
+        SQL statements, in order
+    """
+    if scheme not in PARTITION_SCHEMES:
+        raise ValueError(
+            f"Unknown partition scheme '{scheme}' (expected one of {', '.join(PARTITION_SCHEMES)})"
+        )
+    if scheme == "user_hash" and partitions < 1:
+        raise ValueError("user_hash partitioning needs at least one partition")
+
+    key = _PARTITION_KEYS[scheme]
+    method = "HASH" if scheme == "user_hash" else "RANGE"
+
+    statements = [f"ALTER TABLE {child} DROP CONSTRAINT {name}" for child, name in foreign_keys]
+    statements += [
+        f"ALTER TABLE {TABLE} RENAME TO {UNPARTITIONED_TABLE}",
+        f"ALTER TABLE {UNPARTITIONED_TABLE} RENAME CONSTRAINT {TABLE}_pkey "
+        f"TO {UNPARTITIONED_TABLE}_pkey",
+    ]
+    # Free the index names for the new table
+    for definition in index_definitions:
+        name = _INDEX_NAME_RE.match(definition).group(2)
+        statements.append(f"ALTER INDEX {name} RENAME TO {name}_unpartitioned")
+
+    statements += [
+        f"CREATE TABLE {TABLE} (LIKE {UNPARTITIONED_TABLE} INCLUDING DEFAULTS) "
+        f"PARTITION BY {method} ({key})",
+        f"ALTER TABLE {TABLE} ADD PRIMARY KEY (id, {key})",
+        f"ALTER TABLE {TABLE} ADD FOREIGN KEY (user_id) REFERENCES user_preferences (id)",
+    ]
+
+    if scheme == "user_hash":
+        statements += [
+            f"CREATE TABLE {TABLE}_p{remainder:02d} PARTITION OF {TABLE} "
+            f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})"
+            for remainder in range(partitions)
+        ]
+    else:
+        if first_month is not None and months > 0:
+            statements += month_partition_statements(first_month, months)
+        statements.append(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT")
+
+    statements.append(f"INSERT INTO {TABLE} SELECT * FROM {UNPARTITIONED_TABLE}")
+    statements += [rewrite_index_definition(d, TABLE) for d in index_definitions]
+    statements.append(f"ANALYZE {TABLE}")
+    return statements
@@ -0,0 +1,208 @@
+"""Reduced-precision and reduced-dimension storage for entry embeddings."""
+
+import logging
+from typing import Any, Optional
+import numpy as np
+from asyncpg import BitString
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import Float, bindparam, cast, func
+from sqlalchemy.sql import ColumnElement
+from sqlalchemy.types import UserDefinedType
+
+logger = logging.getLogger(__name__)
+
+# float32: exact; float16: ~exact at half the memory; int8: per-row scaled,
+# a quarter of the memory; binary: one sign bit per dimension (1/32), coarse
+# enough that results are re-ranked on full-precision vectors
+STORAGE_MODES = ("float32", "float16", "int8", "binary")
+APPROXIMATE_MODES = ("int8", "binary")
+
+# Rows converted to float32 at a time when scoring float16/int8 codes (stays in cache)
+SCORE_CHUNK_ROWS = 256
+
+# Set bits per byte value, for Hamming distances on packed sign bits
+_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+def truncate_dimensions(matrix: np.ndarray, dimensions: int) -> np.ndarray:
+    """
+    Keep the first `dimensions` values of each row and re-normalize.
+
+    text-embedding-3 vectors are trained so that prefixes remain meaningful
+    embeddings (the API's `dimensions` parameter does the same truncation),
+    so a prefix can stand in for the full vector in a first-stage search.
+
+    Args:
+        matrix: Embeddings, one per row
+        dimensions: Number of leading dimensions to keep
+
+    Returns:
+        float32 matrix of unit-length rows (zero rows stay zero)
+    """
+    prefix = np.array(matrix[:, :dimensions], dtype=np.float32)
+    norms = np.linalg.norm(prefix, axis=1, keepdims=True)
+    np.divide(prefix, norms, out=prefix, where=norms > 0)
+    return prefix
+
+
+class QuantizedEmbeddings:
+    """
+    Embedding matrix stored in one of STORAGE_MODES, scored against float32 queries.
+
+    Scores approximate the cosine similarity of the (truncated) vectors; in
+    the APPROXIMATE_MODES or with truncated dimensions they are only good for
+    picking candidates, which should be re-ranked with full-precision vectors.
+    """
+
+    __slots__ = ("mode", "dimensions", "source_dimensions", "codes", "scales")
+
+    def __init__(
+        self,
+        mode: str,
+        codes: np.ndarray,
+        dimensions: int,
+        source_dimensions: int,
+        scales: Optional[np.ndarray] = None,
+    ):
+        self.mode = mode
+        self.codes = codes
+        self.dimensions = dimensions
+        self.source_dimensions = source_dimensions
+        self.scales = scales
+
+    @classmethod
+    def from_matrix(
+        cls, matrix: np.ndarray, mode: str = "float32", dimensions: Optional[int] = None
+    ) -> "QuantizedEmbeddings":
+        """
+        Quantize a float32 embedding matrix.
+
+        Args:
+            matrix: Embeddings, one per row
+            mode: One of STORAGE_MODES
+            dimensions: Leading dimensions to keep (default: all)
+
+        Returns:
+            The quantized matrix
+        """
+        if mode not in STORAGE_MODES:
+            raise ValueError(
+                f"Unknown embedding storage mode '{mode}' (expected one of {', '.join(STORAGE_MODES)})"
+            )
+
+        source_dimensions = matrix.shape[1]
+        dimensions = min(dimensions or source_dimensions, source_dimensions)
+        if dimensions < source_dimensions:
+            vectors = truncate_dimensions(matrix, dimensions)
+        else:
+            vectors = np.asarray(matrix, dtype=np.float32)
+
+        scales = None
+        if mode == "float32":
+            codes = vectors
+        elif mode == "float16":
+            codes = vectors.astype(np.float16)
+        elif mode == "int8":
+            # Symmetric per-row scale: the largest magnitude maps to 127
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            safe = np.where(scales > 0, scales, 1.0)[:, None]
+            codes = np.rint(vectors / safe).astype(np.int8)
+            scales = scales.astype(np.float32)
+        else:
+            codes = np.packbits(vectors > 0, axis=1)
+
+        return cls(mode, codes, dimensions, source_dimensions, scales)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def approximate(self) -> bool:
+        """Whether scores need a full-precision re-rank to be trusted."""
+        return self.mode in APPROXIMATE_MODES or self.dimensions < self.source_dimensions
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the codes (and scales)."""
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def similarities(self, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Approximate cosine similarity of every row (or some rows) to a query.
+
+        Args:
+            query: Unit-length float32 query with `source_dimensions` values
+            rows: Only score these rows (default: all)
+
+        Returns:
+            float32 scores, one per row (0 for rows that were all zero)
+        """
+        codes = self.codes if rows is None else self.codes[rows]
+        if self.dimensions < self.source_dimensions:
+            query = truncate_dimensions(query[None, :], self.dimensions)[0]
+
+        if self.mode == "float32":
+            return codes @ query
+
+        if self.mode == "binary":
+            # Hamming distance between sign patterns, mapped to [-1, 1]
+            query_bits = np.packbits(query > 0)
+            distance = _POPCOUNT[codes ^ query_bits].sum(axis=1, dtype=np.int32)
+            return (1.0 - 2.0 * distance / self.dimensions).astype(np.float32)
+
+        # float16 / int8: convert in chunks so scoring never holds a float32 copy
+        scores = np.empty(len(codes), dtype=np.float32)
+        buffer = np.empty((SCORE_CHUNK_ROWS, self.dimensions), dtype=np.float32)
+        for start in range(0, len(codes), SCORE_CHUNK_ROWS):
+            chunk = codes[start : start + SCORE_CHUNK_ROWS]
+            np.copyto(buffer[: len(chunk)], chunk)
+            scores[start : start + len(chunk)] = buffer[: len(chunk)] @ query
+        if self.scales is not None:
+            scores *= self.scales if rows is None else self.scales[rows]
+        return scores
+
+
+class _PgvectorType(UserDefinedType):
+    """A pgvector type by name, for casts (pgvector 0.2 only ships Vector)."""
+
+    cache_ok = True
+
+    def __init__(self, spec: str):
+        self.spec = spec
+
+    def get_col_spec(self, **kw) -> str:
+        return self.spec
+
+
+def distance_expression(column: Any, query_embedding: list[float], mode: str) -> ColumnElement:
+    """
+    Distance from a stored vector to the query, written to match an index.
+
+    Postgres only uses an expression index when the query repeats the
+    indexed expression (migration 005): halfvec cosine for float16/int8
+    (pgvector has no int8 type) and Hamming distance on binary_quantize()
+    for binary. Lower is closer in every mode.
+
+    Args:
+        column: Full-precision vector column
+        query_embedding: Query embedding (same dimensions as the column)
+        mode: One of STORAGE_MODES
+
+    Returns:
+        SQL distance expression
+    """
+    if mode == "float32":
+        return column.cosine_distance(query_embedding)
+
+    dimensions = len(query_embedding)
+    if mode == "binary":
+        bits = _PgvectorType(f"bit({dimensions})")
+        stored = cast(func.binary_quantize(column), bits)
+        # asyncpg's bit codec takes a BitString, not a str of 0s and 1s
+        query_bits = BitString("".join("1" if value > 0 else "0" for value in query_embedding))
+        query = bindparam(None, query_bits, type_=bits)
+        return stored.op("<~>", return_type=Float)(cast(query, bits))
+
+    halfvec = _PgvectorType(f"halfvec({dimensions})")
+    query = bindparam(None, query_embedding, type_=Vector(dimensions))
+    return cast(column, halfvec).op("<=>", return_type=Float)(cast(query, halfvec))
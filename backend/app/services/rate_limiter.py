@@ -0,0 +1,218 @@
+"""Client-side OpenAI rate limiting: token buckets, priority lanes and per-user fair queueing."""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Iterator, Optional
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Lanes in dispatch order: live requests always go before bulk/backfill work
+PRIORITIES = ("interactive", "backfill")
+
+DEFAULT_USER = "anonymous"
+
+_current_priority: ContextVar[str] = ContextVar("llm_priority", default="interactive")
+_current_user: ContextVar[str] = ContextVar("llm_user", default=DEFAULT_USER)
+
+
+@contextmanager
+def llm_request_context(priority: str = "interactive", user: Optional[str] = None) -> Iterator[None]:
+    """
+    Attribute the OpenAI calls made inside the block to a lane and a user.
+
+    Bulk imports and backfills should run inside
+    `llm_request_context("backfill")` so live requests overtake them.
+
+    Args:
+        priority: "interactive" or "backfill"
+        user: User (or client) the calls are made for; queues are fair across users
+    """
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority: {priority}")
+
+    priority_token = _current_priority.set(priority)
+    user_token = _current_user.set(user or DEFAULT_USER)
+    try:
+        yield
+    finally:
+        _current_priority.reset(priority_token)
+        _current_user.reset(user_token)
+
+
+class TokenBucket:
+    """Bucket of `capacity` units refilled continuously at `capacity` per `period` seconds."""
+
+    def __init__(self, capacity: float, period: float = 60.0):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` units are available (0 if available now)."""
+        self._refill()
+        amount = min(amount, self.capacity)  # oversized requests wait for a full bucket
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float) -> None:
+        self.tokens -= min(amount, self.capacity)
+
+
+class _Waiter:
+    __slots__ = ("future", "tokens", "enqueued")
+
+    def __init__(self, future: asyncio.Future, tokens: int):
+        self.future = future
+        self.tokens = tokens
+        self.enqueued = time.perf_counter()
+
+
+class RateLimiter:
+    """
+    Requests/min, tokens/min (optional) and concurrency limits for one upstream.
+
+    Callers queue in a lane per priority; within a lane, each user has a
+    FIFO queue and users are served round-robin, so one user's bulk import
+    cannot starve everyone else. A request is dispatched when both buckets
+    can pay for it and a concurrency slot is free. The head request is never
+    skipped, so large requests are not starved by a stream of small ones.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: int,
+        tokens_per_minute: Optional[int],
+        max_concurrency: int,
+    ):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._in_flight = 0
+        self._lanes: dict[str, OrderedDict[str, deque[_Waiter]]] = {
+            priority: OrderedDict() for priority in PRIORITIES
+        }
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def queue_depth(self, priority: Optional[str] = None) -> int:
+        """Number of waiting requests (in one lane, or in all)."""
+        lanes = [self._lanes[priority]] if priority else self._lanes.values()
+        return sum(len(queue) for lane in lanes for queue in lane.values())
+
+    @property
+    def idle(self) -> bool:
+        """True when nothing is queued."""
+        return self.queue_depth() == 0
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        tokens: int = 0,
+        priority: Optional[str] = None,
+        user: Optional[str] = None,
+    ) -> AsyncIterator[None]:
+        """
+        Wait for a turn, then hold a concurrency slot for the duration of the block.
+
+        Args:
+            tokens: Tokens the request counts against tokens/min (prompt + max_tokens)
+            priority: Lane (default: from llm_request_context)
+            user: Fairness key (default: from llm_request_context)
+        """
+        priority = priority or _current_priority.get()
+        user = user or _current_user.get()
+        await self._acquire(tokens, priority, user)
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            self._pump()
+
+    async def _acquire(self, tokens: int, priority: str, user: str) -> None:
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), tokens)
+        self._lanes[priority].setdefault(user, deque()).append(waiter)
+        self._pump()
+        self._report_depth()
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted just as the caller gave up: hand the slot back
+                self._in_flight -= 1
+                self._pump()
+            self._report_depth()
+            raise
+
+        waited = time.perf_counter() - waiter.enqueued
+        metrics.observe("llm_rate_limit_wait_seconds", waited, limiter=self.name, priority=priority)
+        if waited > 1.0:
+            logger.info(f"{self.name}: {priority} request for {user} waited {waited:.1f}s")
+
+    def _next_waiter(self) -> Optional[tuple[OrderedDict, str, _Waiter]]:
+        for priority in PRIORITIES:
+            lane = self._lanes[priority]
+            while lane:
+                user, queue = next(iter(lane.items()))
+                while queue and queue[0].future.done():  # cancelled while waiting
+                    queue.popleft()
+                if queue:
+                    return lane, user, queue[0]
+                del lane[user]
+        return None
+
+    def _pump(self) -> None:
+        """Dispatch queued requests while limits allow."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._in_flight < self.max_concurrency:
+            head = self._next_waiter()
+            if head is None:
+                break
+            lane, user, waiter = head
+
+            delay = self._requests.wait_time(1)
+            if self._tokens is not None:
+                delay = max(delay, self._tokens.wait_time(waiter.tokens))
+            if delay > 0:
+                self._timer = asyncio.get_running_loop().call_later(delay, self._pump)
+                break
+
+            self._requests.consume(1)
+            if self._tokens is not None:
+                self._tokens.consume(waiter.tokens)
+            self._in_flight += 1
+            waiter.future.set_result(None)
+
+            # Round-robin: this user goes to the back of the lane
+            queue = lane.pop(user)
+            queue.popleft()
+            if queue:
+                lane[user] = queue
+
+        self._report_depth()
+
+    def _report_depth(self) -> None:
+        for priority in PRIORITIES:
+            metrics.set_gauge(
+                "llm_rate_limit_queue_depth",
+                self.queue_depth(priority),
+                limiter=self.name,
+                priority=priority,
+            )
+        metrics.set_gauge("llm_rate_limit_in_flight", self._in_flight, limiter=self.name)
@@ -0,0 +1,119 @@
+"""Fast script-based language detection using codepoint histograms."""
+
+import numpy as np
+
+# Unicode blocks mapped to the language we assume for that script
+SCRIPT_RANGES = [
+    # (first codepoint, last codepoint + 1, language code)
+    (0x0041, 0x005B, "en"),  # Latin A-Z
+    (0x0061, 0x007B, "en"),  # Latin a-z
+    (0x00C0, 0x0250, "en"),  # Latin-1 supplement / extended letters
+    (0x0900, 0x0980, "hi"),  # Devanagari
+    (0x0980, 0x0A00, "bn"),  # Bengali
+    (0x0B80, 0x0C00, "ta"),  # Tamil
+    (0x0C00, 0x0C80, "te"),  # Telugu
+    (0x0C80, 0x0D00, "kn"),  # Kannada
+    (0x0D00, 0x0D80, "ml"),  # Malayalam
+]
+
+# Bucket 0 collects everything else (digits, punctuation, emoji, other scripts)
+LANGUAGES = ["other"] + sorted({language for _, _, language in SCRIPT_RANGES})
+
+# An Indic script wins over Latin when it makes up at least this share of letters
+MIN_SCRIPT_SHARE = 0.2
+
+DEFAULT_LANGUAGE = "en"
+
+_TABLE_SIZE = max(end for _, end, _ in SCRIPT_RANGES) + 1
+_BUCKETS = np.zeros(_TABLE_SIZE, dtype=np.uint8)
+for _start, _end, _language in SCRIPT_RANGES:
+    _BUCKETS[_start:_end] = LANGUAGES.index(_language)
+
+_LATIN = LANGUAGES.index("en")
+
+
+def _codepoint_buckets(text: str) -> np.ndarray:
+    codepoints = np.frombuffer(text.encode("utf-32-le", "surrogatepass"), dtype="<u4")
+    # Codepoints past the table clip to its last slot, which is "other"
+    return np.take(_BUCKETS, codepoints, mode="clip")
+
+
+def _pick_languages(counts: np.ndarray) -> list[str]:
+    """Pick a language per row of a (texts x buckets) count matrix."""
+    letters = counts[:, 1:].sum(axis=1)
+
+    script_counts = counts.copy()
+    script_counts[:, 0] = 0
+    script_counts[:, _LATIN] = 0
+    best = script_counts.argmax(axis=1)
+    best_count = script_counts[np.arange(len(counts)), best]
+
+    # Code-mixed text (e.g. Tamil with English vendor names) goes to the Indic script
+    use_script = (best_count > 0) & (best_count >= MIN_SCRIPT_SHARE * letters)
+    codes = np.where(use_script, best, _LATIN)
+    return [LANGUAGES[code] for code in codes]
+
+
+def script_histogram(text: str) -> dict[str, int]:
+    """
+    Count characters per script bucket.
+
+    Args:
+        text: Text to analyze
+
+    Returns:
+        Mapping of language code (or 'other') to character count
+    """
+    counts = np.bincount(_codepoint_buckets(text), minlength=len(LANGUAGES))
+    return {language: int(count) for language, count in zip(LANGUAGES, counts)}
+
+
+def detect_script_language(text: str) -> str:
+    """
+    Detect a text's language from the script its letters are written in.
+
+    Covers Tamil, Hindi (Devanagari), Telugu, Kannada, Malayalam, Bengali and
+    Latin (reported as English). The whole string is classified in one
+    vectorized pass over its UTF-32 codepoints.
+
+    Args:
+        text: Text to analyze
+
+    Returns:
+        Language code (e.g., 'en', 'ta')
+    """
+    if not text:
+        return DEFAULT_LANGUAGE
+    counts = np.bincount(_codepoint_buckets(text), minlength=len(LANGUAGES))
+    return _pick_languages(counts[np.newaxis, :])[0]
+
+
+def detect_script_languages(texts: list[str]) -> list[str]:
+    """
+    Detect languages for many texts at once (bulk ingestion).
+
+    All texts are encoded into one codepoint array and histogrammed with a
+    single bincount over (text index, script bucket) pairs.
+
+    Args:
+        texts: Texts to analyze
+
+    Returns:
+        Language code for each text, in order
+    """
+    if not texts:
+        return []
+
+    lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+    buckets = _codepoint_buckets("".join(texts))
+
+    # One bincount over (text index * buckets + bucket) gives every text's histogram
+    row_offsets = np.repeat(
+        np.arange(0, len(texts) * len(LANGUAGES), len(LANGUAGES), dtype=np.int32), lengths
+    )
+    counts = np.bincount(
+        row_offsets + buckets,
+        minlength=len(texts) * len(LANGUAGES),
+    ).reshape(len(texts), len(LANGUAGES))
+
+    return _pick_languages(counts)
@@ -0,0 +1,68 @@
+"""Server-side rankings behind search result cursors."""
+
+import logging
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# One ranked hit: (entry id, relevance score, passage (start, length) or None)
+RankedHit = tuple[str, float, Optional[tuple[int, int]]]
+
+
+class SearchCursorStore:
+    """
+    Rankings of recent searches, so later pages reuse the first page's scores.
+
+    A search is ranked once; its hits (ids, scores and passage offsets, no
+    text) are kept here under a random token, and each page is read back
+    by offset. Re-running the search for every page would re-embed the
+    query, and scores that shift between pages duplicate or skip results.
+    Rankings expire after ttl_seconds and the least recently used are
+    dropped beyond max_cursors. Cursors are local to the worker process
+    that created them.
+    """
+
+    def __init__(self, ttl_seconds: float, max_cursors: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_cursors = max_cursors
+        self._lock = threading.Lock()
+        self._rankings: OrderedDict[str, tuple[float, list[RankedHit]]] = OrderedDict()
+
+    def put(self, ranking: list[RankedHit]) -> str:
+        """Store a ranking and return its token."""
+        token = secrets.token_urlsafe(12)
+        with self._lock:
+            self._rankings[token] = (time.monotonic() + self.ttl_seconds, ranking)
+            while len(self._rankings) > self.max_cursors:
+                self._rankings.popitem(last=False)
+        return token
+
+    def get(self, token: str) -> Optional[list[RankedHit]]:
+        """Get a ranking, or None if it is unknown or expired."""
+        with self._lock:
+            stored = self._rankings.get(token)
+            if stored is None:
+                return None
+            expires, ranking = stored
+            if time.monotonic() > expires:
+                del self._rankings[token]
+                return None
+            self._rankings.move_to_end(token)
+            return ranking
+
+    @staticmethod
+    def encode(token: str, offset: int) -> str:
+        """Cursor for the page starting at offset."""
+        return f"{token}.{offset}"
+
+    @staticmethod
+    def decode(cursor: str) -> tuple[str, int]:
+        """Split a cursor into (token, offset); raises ValueError if malformed."""
+        token, _, offset = cursor.rpartition(".")
+        if not token or not offset.isdigit():
+            raise ValueError(f"Malformed cursor: {cursor!r}")
+        return token, int(offset)
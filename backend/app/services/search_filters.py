@@ -0,0 +1,143 @@
+"""SQL for structured search filters and filtered vector index scans."""
+
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+from uuid import UUID
+from sqlalchemy import String, Text, case, exists, func, literal_column, or_, select, type_coerce
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import ColumnElement
+from app.config import settings
+from app.models.journal import JournalEntry
+from app.schemas.retrieval import SearchFilters
+
+logger = logging.getLogger(__name__)
+
+ITERATIVE_SCAN_MODES = ("off", "strict_order", "relaxed_order")
+
+
+def _naive_utc(value: datetime) -> datetime:
+    """Timestamps are stored as naive UTC."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def meta_path(*keys: str, as_text: bool = True) -> ColumnElement:
+    """
+    meta -> 'key' ... ->> 'last_key', with the keys inlined.
+
+    Bind parameters in place of the keys would keep the planner from
+    matching expression indexes on these paths, as in keyword_search.
+    """
+    expression = JournalEntry.meta
+    for i, key in enumerate(keys):
+        operand = literal_column(f"'{key}'")
+        if as_text and i == len(keys) - 1:
+            expression = expression.op("->>", return_type=Text)(operand)
+        else:
+            expression = expression.op("->")(operand)
+    return expression
+
+
+def _entities_contain(key: str, field: str, values: list[str]) -> ColumnElement:
+    """meta -> 'entities' has an item in `key` whose `field` is one of `values`."""
+    entities = type_coerce(meta_path("entities", as_text=False), JSONB)
+    return or_(*(entities.contains({key: [{field: value}]}) for value in values))
+
+
+def entry_filter_conditions(
+    filters: Optional[SearchFilters], user_id: Optional[UUID] = None
+) -> list[ColumnElement]:
+    """
+    WHERE conditions on journal_entries for a set of search filters.
+
+    Date ranges use the created_at btree index and themes the GIN index
+    (`themes && ARRAY[...]`, migration 007). Emotions use the expression
+    index on meta -> 'sentiment' ->> 'emotion', and vendor statuses and
+    cost categories are JSONB containment on the meta -> 'entities' GIN
+    index (migration 009). Vendor names are matched case-insensitively,
+    so that filter reads the vendors of each remaining entry.
+
+    A user_id condition also lets Postgres prune the partitions of a
+    partitioned journal_entries (partition_entries.py) to the user's one.
+
+    Args:
+        filters: Search filters (None: no filter conditions)
+        user_id: Only this user's entries (None: all users)
+
+    Returns:
+        Conditions to AND into a query on JournalEntry
+    """
+    conditions: list[ColumnElement] = []
+    if user_id is not None:
+        conditions.append(JournalEntry.user_id == user_id)
+    if filters is None:
+        return conditions
+
+    if filters.created_after is not None:
+        conditions.append(JournalEntry.created_at >= _naive_utc(filters.created_after))
+    if filters.created_before is not None:
+        conditions.append(JournalEntry.created_at < _naive_utc(filters.created_before))
+    if filters.themes is not None:
+        themes = type_coerce(JournalEntry.themes, ARRAY(String))
+        conditions.append(themes.overlap(filters.themes))
+    if filters.emotions is not None:
+        conditions.append(meta_path("sentiment", "emotion").in_(filters.emotions))
+    if filters.vendors is not None:
+        # Legacy rows may hold a non-array here; jsonb_array_elements() would raise
+        vendors = meta_path("entities", "vendors", as_text=False)
+        vendors = case(
+            (func.jsonb_typeof(vendors) == "array", vendors),
+            else_=literal_column("'[]'::jsonb"),
+        )
+        vendor = func.jsonb_array_elements(vendors).table_valued("value").alias("vendor")
+        name = vendor.c.value.op("->>", return_type=Text)(literal_column("'name'"))
+        names = [vendor_name.lower() for vendor_name in filters.vendors]
+        conditions.append(
+            exists(select(1).select_from(vendor).where(func.lower(name).in_(names)))
+        )
+    if filters.vendor_statuses is not None:
+        conditions.append(_entities_contain("vendors", "status", filters.vendor_statuses))
+    if filters.cost_categories is not None:
+        conditions.append(_entities_contain("costs", "category", filters.cost_categories))
+    return conditions
+
+
+async def enable_iterative_scan(session: AsyncSession) -> None:
+    """
+    Let the vector indexes keep scanning until a filtered query has its LIMIT.
+
+    An HNSW scan returns at most hnsw.ef_search (default 40) rows and an
+    IVFFlat scan only the rows in its probed lists, before WHERE
+    conditions are applied; with a selective filter a "nearest 200"
+    query can come back with a handful of rows. pgvector 0.8's iterative
+    scans continue the index scan instead (settings.vector_iterative_scan,
+    bounded by settings.vector_max_scan_tuples). "relaxed_order" may
+    return rows slightly out of distance order, which the full-precision
+    re-rank puts right. The setting is "off" by default: older pgvector
+    reserves the hnsw.* names, so setting them fails there. The settings
+    are transaction-local, so call this inside the transaction that runs
+    the vector query.
+
+    Args:
+        session: Session whose current transaction runs the vector query
+    """
+    mode = settings.vector_iterative_scan
+    if mode not in ITERATIVE_SCAN_MODES:
+        raise ValueError(
+            f"Unknown iterative scan mode '{mode}' "
+            f"(expected one of {', '.join(ITERATIVE_SCAN_MODES)})"
+        )
+    if mode == "off":
+        return
+
+    await session.execute(
+        select(
+            func.set_config("hnsw.iterative_scan", mode, True),
+            func.set_config("hnsw.max_scan_tuples", str(settings.vector_max_scan_tuples), True),
+            # IVFFlat only has relaxed ordering
+            func.set_config("ivfflat.iterative_scan", "relaxed_order", True),
+        )
+    )
@@ -0,0 +1,38 @@
+"""Single-flight de-duplication of concurrent identical async calls."""
+
+import asyncio
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls with the same key into one in-flight call.
+
+    The first caller starts the work as a task; callers arriving while it is
+    running await the same task. The work is shielded, so one caller being
+    cancelled (e.g. a client disconnect) does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Task] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        """Check whether a call for key is running."""
+        return key in self._calls
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """Run func() for key, or join the call already running for key."""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+
+            def _forget(done: asyncio.Task) -> None:
+                if self._calls.get(key) is done:
+                    del self._calls[key]
+
+            task.add_done_callback(_forget)
+
+        return await asyncio.shield(task)
@@ -0,0 +1,144 @@
+"""Theme analytics computed in Postgres over the themes array column."""
+
+import logging
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+from sqlalchemy import Select, func, literal_column, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import ColumnElement
+from app.models import JournalEntry
+from app.schemas.retrieval import SearchFilters
+from app.services.search_filters import entry_filter_conditions
+
+logger = logging.getLogger(__name__)
+
+# date_trunc() units a timeline can be bucketed by
+THEME_WINDOWS = ("day", "week", "month")
+
+
+def _entry_themes(
+    user_id: UUID,
+    since: Optional[datetime],
+    until: Optional[datetime],
+    themes: Optional[list[str]],
+) -> tuple[Select, ColumnElement]:
+    """
+    Query over (entry, theme) pairs of a user's entries in a time range.
+
+    Entries are narrowed with the (user_id, created_at) btree and the
+    themes GIN index (`themes && ARRAY[...]`) before their arrays are
+    unnested, so only matching entries are expanded.
+    """
+    # Functions in FROM may reference earlier FROM items (implicitly LATERAL)
+    theme = func.unnest(JournalEntry.themes).table_valued("theme")
+    theme = theme.render_derived(name="entry_theme")
+    filters = SearchFilters(created_after=since, created_before=until, themes=themes)
+    stmt = (
+        select(theme.c.theme)
+        .select_from(JournalEntry)
+        .join(theme, true())
+        .where(JournalEntry.user_id == user_id, *entry_filter_conditions(filters))
+    )
+    if themes is not None:
+        stmt = stmt.where(theme.c.theme.in_(themes))
+    return stmt, theme.c.theme
+
+
+class ThemeAnalyticsService:
+    """Theme frequencies aggregated in SQL (unnest + GROUP BY), not over loaded entries."""
+
+    @staticmethod
+    async def theme_counts(
+        session: AsyncSession,
+        user_id: UUID,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        themes: Optional[list[str]] = None,
+        limit: Optional[int] = 20,
+    ) -> list[tuple[str, int]]:
+        """
+        Count the entries tagged with each theme.
+
+        Args:
+            session: Database session
+            user_id: Owner of the entries
+            since: Only entries created at or after this time
+            until: Only entries created before this time
+            themes: Only count these themes (default: all)
+            limit: Most frequent themes to return (None: all)
+
+        Returns:
+            (theme, entry count) pairs, most frequent first
+        """
+        try:
+            stmt, theme = _entry_themes(user_id, since, until, themes)
+            entries = func.count(JournalEntry.id.distinct()).label("entries")
+            stmt = (
+                stmt.add_columns(entries)
+                .group_by(theme)
+                .order_by(entries.desc(), theme)
+                .limit(limit)
+            )
+
+            result = await session.execute(stmt)
+            counts = [(row.theme, row.entries) for row in result.all()]
+
+            logger.info(f"Counted {len(counts)} themes for user {user_id}")
+            return counts
+
+        except Exception as e:
+            logger.error(f"Theme count query failed: {str(e)}", exc_info=True)
+            raise
+
+    @staticmethod
+    async def theme_timeline(
+        session: AsyncSession,
+        user_id: UUID,
+        window: str = "week",
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        themes: Optional[list[str]] = None,
+    ) -> list[tuple[datetime, str, int]]:
+        """
+        Count the entries tagged with each theme per time window.
+
+        Windows without entries for a theme are left out.
+
+        Args:
+            session: Database session
+            user_id: Owner of the entries
+            window: Bucket size, one of THEME_WINDOWS
+            since: Only entries created at or after this time
+            until: Only entries created before this time
+            themes: Only count these themes (default: all)
+
+        Returns:
+            (window start, theme, entry count) triples, by window then most frequent
+        """
+        if window not in THEME_WINDOWS:
+            raise ValueError(
+                f"Unknown window '{window}' (expected one of {', '.join(THEME_WINDOWS)})"
+            )
+
+        try:
+            stmt, theme = _entry_themes(user_id, since, until, themes)
+            # Inline the unit so SELECT and GROUP BY are the same expression
+            bucket = func.date_trunc(literal_column(f"'{window}'"), JournalEntry.created_at)
+            bucket = bucket.label("bucket")
+            entries = func.count(JournalEntry.id.distinct()).label("entries")
+            stmt = (
+                stmt.add_columns(bucket, entries)
+                .group_by(bucket, theme)
+                .order_by(bucket, entries.desc(), theme)
+            )
+
+            result = await session.execute(stmt)
+            timeline = [(row.bucket, row.theme, row.entries) for row in result.all()]
+
+            logger.info(f"Theme timeline for user {user_id}: {len(timeline)} {window} rows")
+            return timeline
+
+        except Exception as e:
+            logger.error(f"Theme timeline query failed: {str(e)}", exc_info=True)
+            raise
@@ -1,16 +1,160 @@
 """Transcription service using OpenAI Whisper API."""
 
+import asyncio
+import hashlib
 import io
-from typing import Optional
+import os
+import shutil
+import tempfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, BinaryIO, Optional, Union
 import logging
-from openai import AsyncOpenAI, OpenAI
 from app.config import settings
+from app.services.audio_segments import (
+    detect_silences,
+    extract_segment,
+    ffmpeg_available,
+    plan_windows,
+    probe_duration,
+    stitch_transcripts,
+)
+from app.services.llm_client import get_llm_client
+from app.services.metrics import metrics
+from app.services.script_detection import detect_script_language
+from app.services.singleflight import SingleFlight
+from app.services.transcription_cache import TranscriptionCache
 
 logger = logging.getLogger(__name__)
 
-# Create both sync and async clients
-sync_client = OpenAI(api_key=settings.openai_api_key)
-async_client = AsyncOpenAI(api_key=settings.openai_api_key)
+# Whisper API upload limit
+WHISPER_MAX_BYTES = 25 * 1024 * 1024
+
+# Upload chunk size when spooling
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# verbose_json reports the detected language by name
+WHISPER_LANGUAGE_CODES = {
+    "english": "en",
+    "tamil": "ta",
+    "hindi": "hi",
+    "telugu": "te",
+    "kannada": "kn",
+    "malayalam": "ml",
+    "bengali": "bn",
+    "marathi": "mr",
+    "gujarati": "gu",
+    "punjabi": "pa",
+    "urdu": "ur",
+}
+
+# Dedicated executor for blocking upload file I/O, so uploads cannot exhaust the default pool
+_io_executor = ThreadPoolExecutor(
+    max_workers=settings.transcription_max_concurrency,
+    thread_name_prefix="transcription-io",
+)
+
+# Caps uploads being spooled/transcribed at once (bounds temp storage and RAM)
+_transcription_slots = asyncio.Semaphore(settings.transcription_max_concurrency)
+
+# Results keyed by audio hash + language; retries of the same blob skip Whisper
+transcription_cache = TranscriptionCache(
+    settings.transcription_cache_dir,
+    settings.transcription_cache_max_bytes,
+)
+_inflight = SingleFlight()
+
+
+class AudioTooLargeError(ValueError):
+    """Raised when an upload exceeds the allowed size."""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"Audio file too large (max {max_bytes // (1024 * 1024)}MB)")
+        self.max_bytes = max_bytes
+
+
+def normalize_language_code(language: Optional[str]) -> Optional[str]:
+    """
+    Map a Whisper language name ('tamil') or code ('ta') to a language code.
+
+    Returns None when the language is missing or a name without a known
+    code; callers decide the fallback rather than assuming English.
+    """
+    if not language:
+        return None
+    language = language.strip().lower()
+    if len(language) <= 3:
+        return language
+    return WHISPER_LANGUAGE_CODES.get(language)
+
+
+def _copy_to_temp_file(audio_file: BinaryIO) -> str:
+    """Copy audio into a new temp file and return its path (the caller removes it)."""
+    fd, path = tempfile.mkstemp(prefix="transcription-")
+    try:
+        with os.fdopen(fd, "wb") as copy:
+            shutil.copyfileobj(audio_file, copy)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+@asynccontextmanager
+async def transcription_slot() -> AsyncIterator[None]:
+    """Hold one of the bounded transcription slots."""
+    async with _transcription_slots:
+        yield
+
+
+async def spool_upload(
+    upload,
+    max_bytes: Optional[int] = WHISPER_MAX_BYTES,
+) -> tuple[BinaryIO, int, str]:
+    """
+    Copy an upload into a spooled temp file chunk by chunk.
+
+    Small uploads stay in memory, larger ones roll over to disk, and the size
+    limit is enforced while reading instead of after buffering everything.
+    The SHA-256 of the content is computed on the way through.
+
+    Args:
+        upload: Object with an async read(size) method (e.g. FastAPI UploadFile)
+        max_bytes: Reject uploads larger than this (None for no limit)
+
+    Returns:
+        Tuple of (file positioned at start, size in bytes, hex SHA-256)
+    """
+    loop = asyncio.get_running_loop()
+    spool = tempfile.SpooledTemporaryFile(max_size=settings.transcription_spool_memory_bytes)
+    digest = hashlib.sha256()
+    size = 0
+
+    def _write(chunk: bytes) -> None:
+        digest.update(chunk)
+        spool.write(chunk)
+
+    try:
+        while chunk := await upload.read(UPLOAD_CHUNK_BYTES):
+            size += len(chunk)
+            if max_bytes is not None and size > max_bytes:
+                raise AudioTooLargeError(max_bytes)
+            await loop.run_in_executor(_io_executor, _write, chunk)
+
+        await loop.run_in_executor(_io_executor, spool.seek, 0)
+        return spool, size, digest.hexdigest()
+
+    except BaseException:
+        spool.close()
+        raise
 
 
 class TranscriptionService:
@@ -18,7 +162,7 @@ class TranscriptionService:
 
     @staticmethod
     async def transcribe_audio(
-        audio_file: bytes,
+        audio_file: Union[bytes, BinaryIO],
         language: Optional[str] = None,
         file_name: str = "audio.webm",
     ) -> dict:
@@ -26,7 +170,7 @@ class TranscriptionService:
         Transcribe audio file using Whisper API.
 
         Args:
-            audio_file: Raw audio bytes
+            audio_file: Raw audio bytes or a binary file object (e.g. from spool_upload)
             language: Language code (e.g., 'en', 'ta'). If None, auto-detect.
             file_name: Original file name with extension
 
@@ -37,17 +181,14 @@ class TranscriptionService:
                 - confidence: Confidence score (0-1, estimated based on Whisper behavior)
         """
         try:
-            logger.info(
-                f"Transcribing audio: {len(audio_file)} bytes, language: {language}"
-            )
-
-            # Create file-like object from bytes
-            audio_stream = io.BytesIO(audio_file)
-            audio_stream.name = file_name
+            if isinstance(audio_file, bytes):
+                logger.info(f"Transcribing audio: {len(audio_file)} bytes, language: {language}")
+                audio_stream = io.BytesIO(audio_file)
+            else:
+                logger.info(f"Transcribing audio stream, language: {language}")
+                audio_stream = audio_file
 
-            # Call Whisper API synchronously (OpenAI doesn't support async transcription)
-            # Using sync client in executor to avoid blocking
-            transcript = await _transcribe_async(audio_stream, language)
+            transcript = await _transcribe_async(audio_stream, file_name, language)
 
             # Convert Transcription object to dict if needed
             if hasattr(transcript, 'model_dump'):
@@ -58,14 +199,15 @@ class TranscriptionService:
                 # Fallback: access as object attributes
                 transcript_dict = {
                     "text": transcript.text,
-                    "language": getattr(transcript, "language", language or "en"),
+                    "language": getattr(transcript, "language", None),
                 }
 
             logger.info(f"Transcription successful: {len(transcript_dict['text'])} characters")
 
             return {
                 "text": transcript_dict["text"],
-                "language": transcript_dict.get("language", language or "en"),
+                # Requested language when Whisper reports none (or an unmapped name)
+                "language": normalize_language_code(transcript_dict.get("language")) or language,
                 "confidence": 0.95,  # Whisper doesn't expose confidence, use high default
             }
 
@@ -73,24 +215,206 @@ class TranscriptionService:
             logger.error(f"Transcription failed: {str(e)}")
             raise
 
+    @staticmethod
+    async def transcribe_long_audio(
+        audio_file: BinaryIO,
+        language: Optional[str] = None,
+        file_name: str = "audio.webm",
+    ) -> dict:
+        """
+        Transcribe a long recording as overlapping segments in parallel.
 
-async def _transcribe_async(audio_stream, language: Optional[str] = None):
-    """Helper to run sync Whisper API call asynchronously."""
-    import asyncio
-    loop = asyncio.get_event_loop()
+        The audio is cut into windows of TRANSCRIPTION_SEGMENT_SECONDS (snapped
+        to silences when possible) with TRANSCRIPTION_SEGMENT_OVERLAP_SECONDS
+        of overlap, up to TRANSCRIPTION_SEGMENT_CONCURRENCY segments are cut
+        and transcribed at once, and the transcripts are stitched back together
+        with the repeated overlap words removed. Requires ffmpeg.
 
+        Args:
+            audio_file: Binary file object positioned at the start of the audio
+            language: Language code. If None, Whisper auto-detects per segment.
+            file_name: Original file name with extension
+
+        Returns:
+            Same shape as transcribe_audio, plus 'segments' (number of segments)
+        """
+        try:
+            loop = asyncio.get_running_loop()
+
+            with tempfile.TemporaryDirectory(prefix="transcribe-") as work_dir:
+                # ffmpeg needs a real path
+                _, extension = os.path.splitext(file_name)
+                source_path = os.path.join(work_dir, f"source{extension or '.webm'}")
+
+                def _copy_to_disk() -> None:
+                    with open(source_path, "wb") as source:
+                        shutil.copyfileobj(audio_file, source)
+
+                await loop.run_in_executor(_io_executor, _copy_to_disk)
+
+                duration, silences = await asyncio.gather(
+                    probe_duration(source_path),
+                    detect_silences(source_path),
+                )
+                windows = plan_windows(
+                    duration,
+                    settings.transcription_segment_seconds,
+                    settings.transcription_segment_overlap_seconds,
+                    silences,
+                )
+                logger.info(f"Transcribing {duration:.0f}s of audio as {len(windows)} segments")
+
+                segment_slots = asyncio.Semaphore(settings.transcription_segment_concurrency)
+
+                async def _transcribe_segment(index: int, start: float, end: float) -> dict:
+                    async with segment_slots:
+                        segment_path = os.path.join(work_dir, f"segment-{index:04d}.mp3")
+                        await extract_segment(source_path, start, end, segment_path)
+                        segment_stream = await loop.run_in_executor(
+                            _io_executor, open, segment_path, "rb"
+                        )
+                        with segment_stream:
+                            return await TranscriptionService.transcribe_audio(
+                                segment_stream,
+                                language=language,
+                                file_name=os.path.basename(segment_path),
+                            )
+
+                # A failed segment cancels the others (and they finish) before
+                # work_dir is removed; the first error is raised as with gather
+                try:
+                    async with asyncio.TaskGroup() as group:
+                        tasks = [
+                            group.create_task(_transcribe_segment(index, start, end))
+                            for index, (start, end) in enumerate(windows)
+                        ]
+                except ExceptionGroup as errors:
+                    raise errors.exceptions[0]
+                segments = [task.result() for task in tasks]
+
+            text = stitch_transcripts([segment["text"] for segment in segments])
+            detected = Counter(segment["language"] for segment in segments if segment["language"])
+            detected_language = language or next(iter(detected.most_common(1)), (None,))[0]
+
+            logger.info(f"Long transcription successful: {len(text)} characters")
+
+            return {
+                "text": text,
+                "language": detected_language,
+                "confidence": min(segment["confidence"] for segment in segments),
+                "segments": len(segments),
+            }
+
+        except Exception as e:
+            logger.error(f"Long transcription failed: {str(e)}")
+            raise
+
+    @staticmethod
+    async def transcribe_cached(
+        audio_file: BinaryIO,
+        audio_sha256: str,
+        language: Optional[str] = None,
+        file_name: str = "audio.webm",
+        chunked: bool = False,
+    ) -> dict:
+        """
+        Transcribe with a content-hash result cache.
+
+        Repeat uploads of the same audio (e.g. client retries) return the
+        cached transcript without calling Whisper, and identical uploads that
+        arrive while the first is still being transcribed wait for that call
+        instead of starting their own.
+
+        Args:
+            audio_file: Binary file object positioned at the start of the audio
+            audio_sha256: Hex SHA-256 of the audio content (from spool_upload)
+            language: Language code. If None, auto-detect.
+            file_name: Original file name with extension
+            chunked: Use transcribe_long_audio
+
+        Returns:
+            Same shape as transcribe_audio, plus 'cached'
+        """
+        loop = asyncio.get_running_loop()
+        key = TranscriptionCache.key(audio_sha256, language)
+
+        cached = await loop.run_in_executor(_io_executor, transcription_cache.get, key)
+        if cached is not None:
+            logger.info(f"Transcription cache hit: {key}")
+            metrics.increment("transcription_cache_total", result="hit")
+            return {**cached, "cached": True}
+
+        if _inflight.in_flight(key):
+            logger.info(f"Joining in-flight transcription: {key}")
+            metrics.increment("transcription_cache_total", result="joined")
+        else:
+            metrics.increment("transcription_cache_total", result="miss")
+
+        async def _transcribe_and_store(audio_path: str) -> dict:
+            try:
+                audio_stream = await loop.run_in_executor(_io_executor, open, audio_path, "rb")
+                with audio_stream:
+                    if chunked:
+                        result = await TranscriptionService.transcribe_long_audio(
+                            audio_stream, language=language, file_name=file_name
+                        )
+                    else:
+                        result = await TranscriptionService.transcribe_audio(
+                            audio_stream, language=language, file_name=file_name
+                        )
+            finally:
+                await loop.run_in_executor(_io_executor, _remove_file, audio_path)
+
+            try:
+                await loop.run_in_executor(_io_executor, transcription_cache.put, key, result)
+            except OSError as e:
+                logger.warning(f"Could not cache transcription {key}: {str(e)}")
+            return result
+
+        # The shared call outlives this request if its client disconnects, so it
+        # transcribes its own copy of the audio rather than the caller's stream
+        audio_path: Optional[str] = None
+        started = False
+
+        def _start() -> Awaitable[dict]:
+            nonlocal started
+            started = True
+            return _transcribe_and_store(audio_path)
+
+        try:
+            # Copy only when this call will run (not when joining); no await
+            # between the last check and do() so the decision holds
+            while audio_path is None and not _inflight.in_flight(key):
+                audio_path = await loop.run_in_executor(
+                    _io_executor, _copy_to_temp_file, audio_file
+                )
+            result = await _inflight.do(key, _start)
+        finally:
+            if audio_path is not None and not started:
+                await loop.run_in_executor(_io_executor, _remove_file, audio_path)
+        return {**result, "cached": False}
+
+
+async def _transcribe_async(
+    audio_stream: BinaryIO,
+    file_name: str,
+    language: Optional[str] = None,
+):
+    """
+    Call the Whisper API through the shared client (the upload is streamed from the file).
+
+    When auto-detecting, verbose_json is requested so the detected language comes
+    back with the transcript and no separate detection call is needed.
+    """
     logger.info(f"Starting Whisper API call with language: {language}")
 
     try:
-        # Run sync API call in thread pool executor
-        transcript = await loop.run_in_executor(
-            None,
-            lambda: sync_client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_stream,
-                language=language,
-                response_format="json",
-            )
+        transcript = await get_llm_client().transcription(
+            file_name,
+            audio_stream,
+            model="whisper-1",
+            language=language,
+            response_format="json" if language else "verbose_json",
         )
 
         logger.info(f"Whisper API response: {transcript}")
@@ -100,6 +424,31 @@ async def _transcribe_async(audio_stream, language: Optional[str] = None):
         raise
 
 
+async def _audio_sample(audio_file: bytes, seconds: float) -> tuple[str, bytes]:
+    """Cut the first `seconds` of audio (the whole file if ffmpeg is unavailable)."""
+    if not ffmpeg_available():
+        logger.info("ffmpeg not installed; detecting language from the full audio")
+        return "audio.webm", audio_file
+
+    loop = asyncio.get_running_loop()
+
+    with tempfile.TemporaryDirectory(prefix="detect-language-") as work_dir:
+        source_path = os.path.join(work_dir, "source.webm")
+        sample_path = os.path.join(work_dir, "sample.mp3")
+
+        def _write_source() -> None:
+            with open(source_path, "wb") as source:
+                source.write(audio_file)
+
+        def _read_sample() -> bytes:
+            with open(sample_path, "rb") as sample:
+                return sample.read()
+
+        await loop.run_in_executor(_io_executor, _write_source)
+        await extract_segment(source_path, 0.0, seconds, sample_path)
+        return "sample.mp3", await loop.run_in_executor(_io_executor, _read_sample)
+
+
 class LanguageDetector:
     """Detect language from audio or text."""
 
@@ -107,46 +456,50 @@ class LanguageDetector:
     async def detect_language(
         audio_file: Optional[bytes] = None,
         text: Optional[str] = None,
-    ) -> str:
+        transcription: Optional[dict] = None,
+    ) -> Optional[str]:
         """
         Detect language from audio or text.
 
+        When the audio is also being transcribed, pass the transcription result:
+        auto-detect transcriptions already carry the detected language, so no
+        second Whisper call is made. Otherwise only the first
+        LANGUAGE_DETECTION_SAMPLE_SECONDS of audio are sent to Whisper.
+
         Args:
             audio_file: Audio bytes (will use Whisper to detect)
             text: Text to detect language from
+            transcription: Result of TranscriptionService.transcribe_audio for this audio
 
         Returns:
-            Language code (e.g., 'en', 'ta')
+            Language code (e.g., 'en', 'ta'); None when it is unknown (no
+            input, detection failed, or a language without a known code)
         """
+        if transcription and transcription.get("language"):
+            return normalize_language_code(transcription["language"])
+
         if audio_file:
-            # Use Whisper to detect language
+            # Use Whisper to detect language from a short sample
             try:
-                audio_stream = io.BytesIO(audio_file)
-                audio_stream.name = "audio.webm"
-
-                import asyncio
-                loop = asyncio.get_event_loop()
-
-                # Get language detection from Whisper
-                detection = await loop.run_in_executor(
-                    None,
-                    lambda: sync_client.audio.transcriptions.create(
-                        model="whisper-1",
-                        file=audio_stream,
-                        response_format="verbose_json",
-                    )
+                sample_name, sample = await _audio_sample(
+                    audio_file, settings.language_detection_sample_seconds
+                )
+
+                detection = await get_llm_client().transcription(
+                    sample_name,
+                    io.BytesIO(sample),
+                    model="whisper-1",
+                    response_format="verbose_json",
                 )
 
-                return detection.get("language", "en")
+                return normalize_language_code(getattr(detection, "language", None))
             except Exception as e:
                 logger.warning(f"Language detection from audio failed: {str(e)}")
-                return "en"
+                return None
 
         elif text:
-            # Simple language detection based on script
-            # This is a basic heuristic; for production, use langdetect/textblob
-            if any("\u0b80" <= char <= "\u0bff" for char in text):
-                return "ta"  # Tamil script
-            return "en"
+            # Script-based detection (Tamil, Devanagari, Telugu, Kannada, Malayalam,
+            # Bengali, Latin); cannot tell apart languages sharing a script
+            return detect_script_language(text)
 
-        return "en"
+        return None
@@ -0,0 +1,172 @@
+"""Bulk embedding reads in pgvector's binary format, decoded straight into NumPy buffers."""
+
+import logging
+import uuid
+from typing import Any, Optional, Sequence
+import numpy as np
+from sqlalchemy import LargeBinary, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import ColumnElement
+from app.models import JournalEntry
+
+logger = logging.getLogger(__name__)
+
+# vector_send layout: int16 dimensions, int16 unused, then big-endian float4 values
+VECTOR_HEADER_BYTES = 4
+VECTOR_WIRE_DTYPE = np.dtype(">f4")
+
+# Rows per round trip when streaming a whole table's vectors
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def vector_bytes(column: Any) -> ColumnElement:
+    """
+    Select a vector column in pgvector's binary wire format.
+
+    The text format that pgvector's SQLAlchemy type reads has to be parsed
+    number by number; vector_send() returns the binary representation as
+    bytea, which asyncpg hands over as bytes without any parsing. Done per
+    query rather than by registering a binary codec on the connection, so
+    ORM reads of the same column elsewhere keep working.
+    """
+    return func.vector_send(column, type_=LargeBinary)
+
+
+def vector_dimensions(blob: bytes) -> int:
+    """Dimensions recorded in a vector_send() header."""
+    return int.from_bytes(blob[:2], "big")
+
+
+def decode_vectors(
+    blobs: Sequence[Optional[bytes]],
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Decode vector_send() payloads into one float32 matrix.
+
+    Each payload is viewed in place (np.frombuffer, no copy) and written into
+    its row of the preallocated output, converting from network byte order
+    on the way; there is no intermediate Python list or per-vector array.
+
+    Args:
+        blobs: One payload per row (None leaves the row at zero)
+        out: Matrix to fill, shape (len(blobs), dimensions) (default: allocated)
+
+    Returns:
+        The filled float32 matrix
+    """
+    if out is None:
+        dimensions = next((vector_dimensions(blob) for blob in blobs if blob), 0)
+        out = np.zeros((len(blobs), dimensions), dtype=np.float32)
+    dimensions = out.shape[1]
+
+    for row, blob in enumerate(blobs):
+        if blob is None:
+            continue
+        if vector_dimensions(blob) != dimensions:
+            raise ValueError(
+                f"Vector in row {row} has {vector_dimensions(blob)} dimensions, "
+                f"expected {dimensions}"
+            )
+        out[row] = np.frombuffer(
+            blob, dtype=VECTOR_WIRE_DTYPE, count=dimensions, offset=VECTOR_HEADER_BYTES
+        )
+    return out
+
+
+class VectorReader:
+    """Bulk reads of stored entry embeddings (search warmup, re-clustering, export)."""
+
+    @staticmethod
+    async def embedding_matrix(
+        session: AsyncSession,
+        model_tag: str,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> tuple[list[str], np.ndarray]:
+        """
+        Stream every embedding from one model into a single float32 matrix.
+
+        The matrix is allocated once from a row count and filled chunk by
+        chunk from a server-side cursor, so peak memory is the matrix plus
+        one chunk of payloads.
+
+        Args:
+            session: Database session
+            model_tag: Embedding model tag; other models' vectors are skipped
+            chunk_size: Rows per fetch
+
+        Returns:
+            (entry ids, matrix) with row i belonging to ids[i]
+        """
+        try:
+            condition = (
+                JournalEntry.embedding.isnot(None),
+                JournalEntry.embedding_model == model_tag,
+            )
+            count = await session.scalar(
+                select(func.count()).select_from(JournalEntry).where(*condition)
+            )
+
+            stmt = (
+                select(JournalEntry.id, vector_bytes(JournalEntry.embedding))
+                .where(*condition)
+                .order_by(JournalEntry.id)
+                .execution_options(yield_per=chunk_size)
+            )
+            result = await session.stream(stmt)
+
+            ids: list[str] = []
+            matrix: Optional[np.ndarray] = None
+            async for partition in result.partitions():
+                blobs = [blob for _, blob in partition]
+                if matrix is None:
+                    dimensions = vector_dimensions(blobs[0])
+                    matrix = np.empty((max(count or 0, len(blobs)), dimensions), dtype=np.float32)
+                start = len(ids)
+                if start + len(blobs) > len(matrix):
+                    # Rows were added after the count; grow rather than fail
+                    matrix = np.resize(matrix, (2 * (start + len(blobs)), matrix.shape[1]))
+                decode_vectors(blobs, out=matrix[start : start + len(blobs)])
+                ids.extend(str(entry_id) for entry_id, _ in partition)
+
+            if matrix is None:
+                return [], np.zeros((0, 0), dtype=np.float32)
+
+            matrix = matrix[: len(ids)]
+            logger.info(f"Loaded {len(ids)} {model_tag} embeddings ({matrix.nbytes / 1e6:.1f} MB)")
+            return ids, matrix
+
+        except Exception as e:
+            logger.error(f"Failed to load embeddings: {str(e)}", exc_info=True)
+            raise
+
+    @staticmethod
+    async def vectors_for_ids(session: AsyncSession, ids: Sequence[str]) -> np.ndarray:
+        """
+        Load the full-precision embeddings of specific entries.
+
+        Used to re-rank candidates found with quantized embeddings, so only a
+        few hundred vectors are read instead of the whole table.
+
+        Args:
+            session: Database session
+            ids: Entry ids
+
+        Returns:
+            float32 matrix with row i belonging to ids[i] (zero where missing)
+        """
+        try:
+            if not ids:
+                return np.zeros((0, 0), dtype=np.float32)
+
+            stmt = select(JournalEntry.id, vector_bytes(JournalEntry.embedding)).where(
+                JournalEntry.id.in_([uuid.UUID(str(entry_id)) for entry_id in ids]),
+                JournalEntry.embedding.isnot(None),
+            )
+            result = await session.execute(stmt)
+            blobs = {str(entry_id): blob for entry_id, blob in result.all()}
+            return decode_vectors([blobs.get(str(entry_id)) for entry_id in ids])
+
+        except Exception as e:
+            logger.error(f"Failed to load embeddings for {len(ids)} entries: {str(e)}", exc_info=True)
+            raise
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Memory and search latency: list-of-dict entries vs. the columnar EntryBatch."""
+
+import asyncio
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.agents.insight import _generate_insights
+from app.agents.memory import _score_entries
+from app.services.entry_batch import EntryBatch
+
+DIMENSIONS = 1536
+EMOTIONS = ["excited", "stressed", "happy", "anxious", "confused"]
+CATEGORIES = ["venue", "catering", "photography", "flowers", "decoration"]
+
+
+def build_entries(count: int, rng: random.Random) -> list[dict]:
+    """Entry dicts shaped like routers/search.py's _entry_to_dict output."""
+    return [
+        {
+            "id": f"{i:08d}-0000-0000-0000-000000000000",
+            "text": "Met the caterer and compared quotes for the reception. " * rng.randint(1, 6),
+            "date": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T10:00:00",
+            "embedding": [rng.gauss(0.0, 1.0) for _ in range(DIMENSIONS)],
+            "embedding_model": "openai:text-embedding-3-small:1536",
+            "entities": {
+                "costs": [
+                    {"amount": rng.randint(100, 5000), "category": rng.choice(CATEGORIES)}
+                    for _ in range(rng.randint(0, 3))
+                ],
+                "vendors": [
+                    {"name": f"Vendor {rng.randint(1, 200)}", "category": rng.choice(CATEGORIES),
+                     "status": "interested"}
+                    for _ in range(rng.randint(0, 2))
+                ],
+            },
+            "tasks": {
+                "explicit": [
+                    {"task": "Call vendor", "status": "pending", "priority": "high"}
+                    for _ in range(rng.randint(0, 3))
+                ]
+            },
+            "sentiment": {"emotion": rng.choice(EMOTIONS), "confidence": 0.8},
+            "themes": rng.sample(["budget", "stress", "traditional", "modern"], 2),
+        }
+        for i in range(count)
+    ]
+
+
+def traced_mb(build):
+    """Build an object and return it with the memory it retains (MB)."""
+    before = tracemalloc.get_traced_memory()[0]
+    value = build()
+    return value, (tracemalloc.get_traced_memory()[0] - before) / (1024 * 1024)
+
+
+def timed_ms(func, repeat: int = 5) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+async def main():
+    print("=" * 70)
+    print("EntryBatch Benchmark")
+    print("=" * 70)
+
+    rng = random.Random(42)
+    query = [rng.gauss(0.0, 1.0) for _ in range(DIMENSIONS)]
+    model_tag = "openai:text-embedding-3-small:1536"
+
+    for count in (1000, 10000):
+        tracemalloc.start()
+        entries, dict_mb = traced_mb(lambda: build_entries(count, rng))
+        batch, batch_mb = traced_mb(lambda: EntryBatch.from_dicts(entries, model_tag))
+        tracemalloc.stop()
+
+        print(f"\n{count} entries")
+        print(f"  {'list of dicts':<22} {dict_mb:8.1f} MB")
+        print(f"  {'EntryBatch':<22} {batch_mb:8.1f} MB   ({dict_mb / batch_mb:.1f}x smaller)")
+
+        build_ms = timed_ms(lambda: EntryBatch.from_dicts(entries, model_tag), repeat=1)
+        print(f"  {'build batch':<22} {build_ms:8.1f} ms")
+        print(f"  {'search, from dicts':<22} {timed_ms(lambda: _score_entries(query, entries, model_tag, 10)):8.1f} ms")
+        print(f"  {'search, batch':<22} {timed_ms(lambda: _score_entries(query, batch, model_tag, 10)):8.1f} ms")
+        print(f"  {'insights, batch':<22} {timed_ms(lambda: _generate_insights(batch)):8.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
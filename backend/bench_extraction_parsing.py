@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Per-entry cost of parsing and validating Intake Agent replies (µs/entry)."""
+
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.agents.intake import _parse_reply
+from app.schemas.extraction import IntakeExtraction
+
+VENDOR_CATEGORIES = ["catering", "photography", "flowers", "decoration", "music"]
+THEMES = ["budget", "traditional", "modern", "stress", "excitement", "cultural"]
+
+
+def build_reply(rng: random.Random, items: int) -> str:
+    """A reply shaped like INTAKE_AGENT_PROMPT's schema with `items` entries per list."""
+    return json.dumps(
+        {
+            "entities": {
+                "vendors": [
+                    {
+                        "name": f"Vendor {i}",
+                        "category": rng.choice(VENDOR_CATEGORIES),
+                        "cost": rng.randint(200, 5000),
+                        "status": "interested",
+                    }
+                    for i in range(items)
+                ],
+                "venues": [{"name": "Garden Hall", "type": "outdoor", "capacity": 150, "cost": None}],
+                "costs": [
+                    {"category": rng.choice(VENDOR_CATEGORIES), "amount": f"${rng.randint(200, 5000):,}",
+                     "currency": "USD", "date": None}
+                    for _ in range(items)
+                ],
+                "dates": [{"event": "wedding", "date": "2025-06-15", "confirmed": True}],
+                "people": [{"name": f"Person {i}", "role": "family", "involvement": "high"}
+                           for i in range(items)],
+            },
+            "tasks": {
+                "explicit": [
+                    {"task": f"Call vendor {i}", "deadline": None, "priority": "high",
+                     "assigned_to": "me", "status": "pending"}
+                    for i in range(items)
+                ],
+                "implicit": [
+                    {"task": f"Compare quote {i}", "deadline": None, "priority": "medium",
+                     "reason": "several quotes"}
+                    for i in range(items)
+                ],
+            },
+            "themes": rng.sample(THEMES, 3),
+            "sentiment": {"emotion": "excited", "confidence": 0.8},
+            "timeline": "pre-wedding",
+            "summary": "Met vendors and collected quotes.",
+            "confidence": 0.85,
+        }
+    )
+
+
+def legacy_parse(reply: str) -> float:
+    """Previous path: json.loads, then .get chains wherever a field is read."""
+    data = json.loads(reply)
+    total = 0.0
+    for cost in data.get("entities", {}).get("costs", []):
+        amount = cost.get("amount", 0)
+        total += amount if isinstance(amount, (int, float)) else 0  # strings were silently lost
+    len(data.get("tasks", {}).get("explicit", []))
+    return total
+
+
+def typed_parse(reply: str) -> float:
+    """Current path: one validated parse, then attribute access."""
+    result, _, _ = _parse_reply(reply)
+    len(result.tasks.explicit)
+    return sum(cost.amount for cost in result.entities.costs)
+
+
+def loads_then_validate(reply: str) -> float:
+    """Two-step alternative: stdlib json.loads, then model_validate on the dict."""
+    result = IntakeExtraction.model_validate(json.loads(reply))
+    return sum(cost.amount for cost in result.entities.costs)
+
+
+def measure(label: str, func, replies: list[str]) -> None:
+    started = time.perf_counter()
+    for reply in replies:
+        func(reply)
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<34} {elapsed / len(replies) * 1e6:9.1f} µs/entry")
+
+
+def main():
+    print("=" * 70)
+    print("Extraction Parsing Benchmark")
+    print("=" * 70)
+
+    rng = random.Random(42)
+    for items, count in [(1, 5000), (5, 2000), (25, 500)]:
+        replies = [build_reply(rng, items) for _ in range(count)]
+        size = sum(len(reply) for reply in replies) / count
+        print(f"\n{count} replies, {items} item(s) per list (~{size / 1024:.1f} KB each)")
+
+        measure("json.loads + .get chains (legacy)", legacy_parse, replies)
+        measure("json.loads + model_validate", loads_then_validate, replies)
+        measure("model_validate_json (current)", typed_parse, replies)
+
+
+if __name__ == "__main__":
+    main()
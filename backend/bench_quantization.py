@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Recall vs. memory vs. latency for the embedding storage modes (quantization.py).
+
+Uses clustered synthetic vectors by default; pass --from-db to measure the
+embeddings stored in DATABASE_URL instead (queries are perturbed entries).
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.services.quantization import STORAGE_MODES, QuantizedEmbeddings
+
+DIMENSIONS = 1536
+TOP_K = 10
+RERANK_FACTOR = 4
+
+
+def synthetic_embeddings(count: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Unit vectors in topic clusters, with variance decaying over dimensions.
+
+    The decay imitates text-embedding-3, whose leading dimensions carry most
+    of the signal (that is what makes truncated prefixes usable).
+    """
+    scale = (1.0 + np.arange(DIMENSIONS) / 128.0) ** -0.5
+    centers = rng.normal(size=(max(count // 50, 1), DIMENSIONS))
+    topics = rng.integers(0, len(centers), size=count)
+    matrix = (centers[topics] + 0.8 * rng.normal(size=(count, DIMENSIONS))) * scale
+    matrix = matrix.astype(np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+async def stored_embeddings() -> np.ndarray:
+    """All stored embeddings of the active model."""
+    from app.services.database import AsyncSessionLocal
+    from app.services.embeddings import EmbeddingsService
+    from app.services.vector_io import VectorReader
+
+    async with AsyncSessionLocal() as session:
+        _, matrix = await VectorReader.embedding_matrix(session, EmbeddingsService.model_tag())
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms > 0, norms, 1.0)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates])]
+
+
+def measure(matrix, queries, truth, mode, dimensions):
+    """Recall@TOP_K (without and with a full-precision re-rank), MB and ms/query."""
+    quantized = QuantizedEmbeddings.from_matrix(matrix, mode, dimensions)
+
+    hits = reranked_hits = 0
+    started = time.perf_counter()
+    for query, expected in zip(queries, truth):
+        scores = quantized.similarities(query)
+        hits += len(np.intersect1d(top_k(scores, TOP_K), expected))
+    elapsed = time.perf_counter() - started
+
+    for query, expected in zip(queries, truth):
+        candidates = top_k(quantized.similarities(query), TOP_K * RERANK_FACTOR)
+        exact = matrix[candidates] @ query
+        reranked_hits += len(np.intersect1d(candidates[top_k(exact, TOP_K)], expected))
+
+    total = len(queries) * TOP_K
+    return (
+        hits / total,
+        reranked_hits / total,
+        quantized.nbytes / (1024 * 1024),
+        elapsed / len(queries) * 1000,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--from-db", action="store_true", help="Use stored embeddings")
+    args = parser.parse_args()
+
+    print("=" * 78)
+    print("Embedding Quantization Benchmark")
+    print("=" * 78)
+
+    rng = np.random.default_rng(42)
+    if args.from_db:
+        matrix = asyncio.run(stored_embeddings())
+    else:
+        matrix = synthetic_embeddings(args.entries, rng)
+
+    picks = rng.choice(len(matrix), size=min(args.queries, len(matrix)), replace=False)
+    queries = matrix[picks] + 0.02 * rng.normal(size=(len(picks), matrix.shape[1]))
+    queries = (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+    truth = [top_k(matrix @ query, TOP_K) for query in queries]
+
+    print(f"\n{len(matrix)} entries x {matrix.shape[1]} dims, {len(queries)} queries, "
+          f"recall@{TOP_K} vs. exact float32 (re-rank: top {TOP_K * RERANK_FACTOR} at full precision)\n")
+    print(f"  {'mode':<8} {'dims':>5} {'MB':>8} {'ms/query':>9} {'recall':>8} {'re-ranked':>10}")
+
+    for dimensions in (matrix.shape[1], 768, 512, 256):
+        if dimensions > matrix.shape[1]:
+            continue
+        for mode in STORAGE_MODES:
+            recall, reranked, mb, ms = measure(matrix, queries, truth, mode, dimensions)
+            print(f"  {mode:<8} {dimensions:>5} {mb:8.1f} {ms:9.2f} {recall:8.3f} {reranked:10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Throughput benchmark for script-based language detection (MB/s)."""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.services.script_detection import detect_script_language, detect_script_languages
+
+SAMPLES = [
+    "Met with three caterers today. Mamma's Kitchen quoted $3000 for 100 guests.",
+    "மண்டபம் முன்பதிவு செய்தோம், ஜூன் 15 திருமணம். பட்ஜெட் பற்றி கவலை.",
+    "हमने हॉल बुक किया, शादी 15 जून को है। बजट की चिंता है।",
+    "మేము హాల్ బుక్ చేసాము, పెళ్లి జూన్ 15న.",
+    "ನಾವು ಹಾಲ್ ಬುಕ್ ಮಾಡಿದೆವು, ಮದುವೆ ಜೂನ್ 15.",
+    "ഞങ്ങൾ ഹാൾ ബുക്ക് ചെയ്തു, കല്യാണം ജൂൺ 15.",
+    "আমরা হল বুক করেছি, বিয়ে ১৫ জুন।",
+]
+
+
+def legacy_detect(text: str) -> str:
+    """Previous per-character generator heuristic (Tamil only)."""
+    if any("஀" <= char <= "௿" for char in text):
+        return "ta"
+    return "en"
+
+
+def build_corpus(num_entries: int, sentences_per_entry: int) -> list[str]:
+    rng = random.Random(42)
+    return [
+        " ".join(rng.choice(SAMPLES) for _ in range(sentences_per_entry))
+        for _ in range(num_entries)
+    ]
+
+
+def measure(label: str, func, corpus: list[str], megabytes: float) -> None:
+    started = time.perf_counter()
+    func(corpus)
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<28} {elapsed * 1000:9.1f} ms   {megabytes / elapsed:8.1f} MB/s")
+
+
+def main():
+    print("=" * 70)
+    print("Script Detection Benchmark")
+    print("=" * 70)
+
+    for num_entries, sentences in [(20000, 5), (500, 400)]:
+        corpus = build_corpus(num_entries, sentences)
+        megabytes = sum(len(text.encode("utf-8")) for text in corpus) / (1024 * 1024)
+        print(f"\n{num_entries} entries x {sentences} sentences ({megabytes:.1f} MB UTF-8)")
+
+        measure("legacy generator (ta only)", lambda c: [legacy_detect(t) for t in c], corpus,
+                megabytes)
+        measure("numpy, per entry", lambda c: [detect_script_language(t) for t in c], corpus, megabytes)
+        measure("numpy, batch", detect_script_languages, corpus, megabytes)
+
+
+if __name__ == "__main__":
+    main()
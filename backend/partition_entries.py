@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Move journal_entries to a partitioned layout and keep monthly partitions ahead.
+
+    python partition_entries.py plan --scheme user_hash --partitions 16
+    python partition_entries.py apply --scheme month --months-ahead 3
+    python partition_entries.py add-months --months 3     # e.g. from a monthly cron
+
+`plan` prints the SQL for the DATABASE_URL database without running it;
+`apply` runs it in one transaction (journal_entries is locked while it is
+copied, so schedule it in a maintenance window). The old table is kept as
+journal_entries_unpartitioned. See app/services/partitioning.py.
+"""
+
+import argparse
+import asyncio
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from sqlalchemy import text
+
+from app.services.database import engine
+from app.services.partitioning import (
+    PARTITION_SCHEMES,
+    TABLE,
+    month_partition_statements,
+    partition_layout_statements,
+)
+
+INDEXES_SQL = text(
+    "SELECT indexdef FROM pg_indexes "
+    "WHERE schemaname = current_schema() AND tablename = :table "
+    "AND indexname <> :table || '_pkey' ORDER BY indexname"
+)
+FOREIGN_KEYS_SQL = text(
+    "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+    "WHERE contype = 'f' AND confrelid = CAST(:table AS regclass) ORDER BY 1, 2"
+)
+IS_PARTITIONED_SQL = text(
+    "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = CAST(:table AS regclass))"
+)
+FIRST_ENTRY_SQL = text(f"SELECT min(created_at) FROM {TABLE}")
+
+
+def months_between(first: date, last: date) -> int:
+    """Number of calendar months from first's month to last's month, inclusive."""
+    return (last.year - first.year) * 12 + last.month - first.month + 1
+
+
+async def layout_statements(conn, args) -> list[str]:
+    """SQL that partitions the current journal_entries table."""
+    if (await conn.execute(IS_PARTITIONED_SQL, {"table": TABLE})).scalar():
+        raise SystemExit(f"{TABLE} is already partitioned")
+
+    index_definitions = list((await conn.execute(INDEXES_SQL, {"table": TABLE})).scalars())
+    foreign_keys = [tuple(row) for row in await conn.execute(FOREIGN_KEYS_SQL, {"table": TABLE})]
+
+    first_month, months = None, 0
+    if args.scheme == "month":
+        first_entry = (await conn.execute(FIRST_ENTRY_SQL)).scalar()
+        first_month = (first_entry or datetime.utcnow()).date()
+        months = months_between(first_month, datetime.utcnow().date()) + args.months_ahead
+
+    return partition_layout_statements(
+        args.scheme,
+        index_definitions,
+        foreign_keys,
+        partitions=args.partitions,
+        first_month=first_month,
+        months=months,
+    )
+
+
+async def run(args) -> None:
+    async with engine.begin() as conn:
+        if args.command == "add-months":
+            statements = month_partition_statements(datetime.utcnow().date(), args.months)
+        else:
+            statements = await layout_statements(conn, args)
+
+        for statement in statements:
+            print(f"{statement};")
+            if args.command != "plan":
+                await conn.execute(text(statement))
+
+        if args.command == "plan":
+            await conn.rollback()
+    await engine.dispose()
+
+    if args.command != "plan":
+        print(f"\nDone: {len(statements)} statements")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    for command in ("plan", "apply"):
+        sub = subcommands.add_parser(command, help=f"{command} the partitioned layout")
+        sub.add_argument("--scheme", choices=PARTITION_SCHEMES, default="user_hash")
+        sub.add_argument(
+            "--partitions", type=int, default=16, help="hash partitions (user_hash)"
+        )
+        sub.add_argument(
+            "--months-ahead",
+            type=int,
+            default=3,
+            help="monthly partitions to create past the current month (month)",
+        )
+    add_months = subcommands.add_parser(
+        "add-months", help="create monthly partitions from the current month on"
+    )
+    add_months.add_argument("--months", type=int, default=3)
+
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
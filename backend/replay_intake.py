@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""Replay recorded journal entries through the intake routes and compare extraction quality.
+
+Input is a JSONL file with one recorded entry per line:
+    {"text": "...", "language": "en", "reference": {...optional extraction...}}
+
+Each entry is run on the requested routes ("fast" without escalation,
+"large", and "auto" = production routing). Every route is scored against the
+entry's reference extraction, or against the large model's output when no
+reference was recorded.
+
+Usage:
+    python replay_intake.py entries.jsonl [--routes fast,large,auto] [--limit 50]
+                                         [--output replay_results.jsonl]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.agents.intake import IntakeAgent
+
+ENTITY_TYPES = ("vendors", "venues", "costs", "dates", "people")
+
+TOTAL_FIELDS = (
+    "n", "failed", "latency", "cost", "escalated",
+    "entity_f1", "theme_f1", "task_count_delta", "sentiment_match",
+)
+
+
+def entity_keys(data: dict[str, Any]) -> set[tuple[str, str]]:
+    """(type, normalized name/value) pairs for comparing extractions."""
+    keys = set()
+    for entity_type in ENTITY_TYPES:
+        for entity in (data.get("entities") or {}).get(entity_type) or []:
+            if not isinstance(entity, dict):
+                continue
+            value = entity.get("name") or entity.get("date") or entity.get("amount")
+            if value is not None:
+                keys.add((entity_type, str(value).strip().lower()))
+    return keys
+
+
+def f1(reference: set, candidate: set) -> float:
+    if not reference and not candidate:
+        return 1.0
+    overlap = len(reference & candidate)
+    if overlap == 0:
+        return 0.0
+    precision = overlap / len(candidate)
+    recall = overlap / len(reference)
+    return 2 * precision * recall / (precision + recall)
+
+
+def compare(reference: dict[str, Any], candidate: dict[str, Any]) -> dict[str, float]:
+    """Score a candidate extraction against the reference."""
+    ref_tasks = reference.get("tasks") or {}
+    cand_tasks = candidate.get("tasks") or {}
+    ref_task_count = len(ref_tasks.get("explicit") or []) + len(ref_tasks.get("implicit") or [])
+    cand_task_count = len(cand_tasks.get("explicit") or []) + len(cand_tasks.get("implicit") or [])
+
+    ref_emotion = (reference.get("sentiment") or {}).get("emotion")
+    cand_emotion = (candidate.get("sentiment") or {}).get("emotion")
+
+    return {
+        "entity_f1": f1(entity_keys(reference), entity_keys(candidate)),
+        "theme_f1": f1(set(reference.get("themes") or []), set(candidate.get("themes") or [])),
+        "task_count_delta": abs(ref_task_count - cand_task_count),
+        "sentiment_match": float(ref_emotion == cand_emotion),
+    }
+
+
+async def run_route(entry: dict[str, Any], route: str) -> dict[str, Any]:
+    started = time.perf_counter()
+    if route == "auto":
+        result = await IntakeAgent.process_entry(entry["text"], entry.get("language", "en"))
+    else:
+        result = await IntakeAgent.process_entry(
+            entry["text"], entry.get("language", "en"), route=route, escalate=False
+        )
+    result["latency"] = time.perf_counter() - started
+    return result
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("entries", help="JSONL file of recorded entries")
+    parser.add_argument("--routes", default="fast,large,auto")
+    parser.add_argument("--limit", type=int, default=0, help="Replay at most N entries")
+    parser.add_argument("--output", help="Write per-entry results as JSONL")
+    args = parser.parse_args()
+
+    routes = [route.strip() for route in args.routes.split(",") if route.strip()]
+    with open(args.entries, encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    if args.limit:
+        entries = entries[: args.limit]
+
+    print("=" * 70)
+    print(f"Intake replay: {len(entries)} entries, routes: {', '.join(routes)}")
+    print("=" * 70)
+
+    totals = {route: dict.fromkeys(TOTAL_FIELDS, 0.0) for route in routes}
+    output = open(args.output, "w", encoding="utf-8") if args.output else None
+
+    for index, entry in enumerate(entries, 1):
+        results = {route: await run_route(entry, route) for route in routes}
+
+        reference = entry.get("reference")
+        if reference is None and results.get("large", {}).get("success"):
+            reference = results["large"]["data"]
+
+        record = {"index": index, "text": entry["text"][:200], "routes": {}}
+        for route, result in results.items():
+            total = totals[route]
+            total["n"] += 1
+            total["latency"] += result["latency"]
+            total["cost"] += (result.get("usage") or {}).get("cost_usd") or 0.0
+            total["escalated"] += result.get("route") == "escalated"
+
+            scores = {}
+            if not result["success"]:
+                total["failed"] += 1
+            elif reference is not None:
+                scores = compare(reference, result["data"])
+                for name, value in scores.items():
+                    total[name] += value
+
+            record["routes"][route] = {
+                "success": result["success"],
+                "route": result.get("route"),
+                "latency": round(result["latency"], 3),
+                "usage": result.get("usage"),
+                "scores": scores,
+            }
+
+        summary = []
+        for route, route_record in record["routes"].items():
+            entity_f1 = route_record["scores"].get("entity_f1")
+            score = f" entity F1 {entity_f1:.2f}" if entity_f1 is not None else ""
+            status = "" if route_record["success"] else " FAILED"
+            summary.append(f"{route}: {route_record['latency']:.2f}s{score}{status}")
+        print(f"[{index}/{len(entries)}] " + "  ".join(summary))
+        if output:
+            output.write(json.dumps(record) + "\n")
+
+    if output:
+        output.close()
+
+    print("\n" + "-" * 70)
+    print(
+        f"{'route':<8}{'ok':>6}{'avg s':>8}{'$/entry':>10}{'escal.':>8}"
+        f"{'ent F1':>8}{'thm F1':>8}{'task Δ':>8}{'sent':>6}"
+    )
+    for route, total in totals.items():
+        n = max(total["n"], 1)
+        scored = max(total["n"] - total["failed"], 1)
+        print(
+            f"{route:<8}{total['n'] - total['failed']:>6.0f}{total['latency'] / n:>8.2f}"
+            f"{total['cost'] / n:>10.5f}{total['escalated']:>8.0f}"
+            f"{total['entity_f1'] / scored:>8.2f}{total['theme_f1'] / scored:>8.2f}"
+            f"{total['task_count_delta'] / scored:>8.2f}{total['sentiment_match'] / scored:>6.2f}"
+        )
+    print("-" * 70)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,112 @@
+"""Shared test fixtures."""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from app.services.embeddings import LocalEmbeddingsBackend, set_embeddings_backend
+from app.services.llm_client import ResilientLLMClient, create_openai_client, set_llm_client
+
+
+class FakeEncoder:
+    """Stand-in for a sentence-transformers model (384-dim output)."""
+
+    def encode(self, texts, normalize_embeddings=True):
+        return [[float(len(text))] + [1.0] * 383 for text in texts]
+
+
+@pytest.fixture
+def local_embeddings():
+    """Use an offline local embeddings backend for the duration of a test."""
+    backend = LocalEmbeddingsBackend("mini-model", encoder=FakeEncoder())
+    set_embeddings_backend(backend)
+    yield backend
+    set_embeddings_backend(None)
+
+
+CHAT_COMPLETION = {
+    "id": "chatcmpl-test",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "gpt-4o-mini",
+    "choices": [
+        {
+            "index": 0,
+            "message": {"role": "assistant", "content": "{}"},
+            "finish_reason": "stop",
+        }
+    ],
+    "usage": {"prompt_tokens": 10, "completion_tokens": 2, "total_tokens": 12},
+}
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """Answers every POST with the next scripted (status, delay, body) reply."""
+
+    def do_POST(self):
+        request_body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.bodies.append(request_body)
+            status, delay, body, headers = (
+                self.server.script.pop(0) if self.server.script else (200, 0.0, None, {})
+            )
+
+        time.sleep(delay)
+        payload = json.dumps(body if body is not None else CHAT_COMPLETION).encode()
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client gave up (deadline or losing hedge)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def fake_openai():
+    """
+    Local HTTP server standing in for the OpenAI API.
+
+    Queue replies with server.reply(status, delay=..., body=..., headers=...);
+    unscripted requests get a 200 chat completion. server.base_url points an
+    AsyncOpenAI client at it.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenAIHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.script = []
+    server.bodies = []
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    def reply(status=200, delay=0.0, body=None, headers=None):
+        server.script.append((status, delay, body, headers or {}))
+
+    server.reply = reply
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def llm_client(fake_openai):
+    """Point the shared LLM client at the fake server (no backoff delays)."""
+    client = ResilientLLMClient(
+        create_openai_client(fake_openai.base_url),
+        backoff_base=0.01,
+        backoff_max=0.05,
+    )
+    set_llm_client(client)
+    yield client
+    set_llm_client(None)
@@ -2,9 +2,17 @@
 
 import pytest
 import asyncio
+import json
+import threading
+from types import SimpleNamespace
 from app.agents.intake import IntakeAgent
 from app.agents.memory import MemoryAgent
 from app.agents.insight import InsightAgent
+from app.agents import intake as intake_module
+from app.agents import tokens as tokens_module
+from app.config import settings
+from app.agents.tokens import TokenUsage, count_message_tokens, estimate_tokens, size_max_tokens
+from app.schemas.extraction import EntryAnalysis
 
 
 class TestIntakeAgent:
@@ -47,6 +55,142 @@ class TestIntakeAgent:
         assert "confidence" in sentiment
 
 
+def _fake_completion(content: str, finish_reason: str = "stop") -> SimpleNamespace:
+    """Chat completion shaped like the OpenAI SDK response."""
+    message = SimpleNamespace(content=content)
+    return SimpleNamespace(
+        choices=[SimpleNamespace(finish_reason=finish_reason, message=message)],
+        usage=SimpleNamespace(prompt_tokens=400, completion_tokens=100, prompt_tokens_details=None),
+    )
+
+
+class TestIntakeRouting:
+    """Test fast/large model routing and escalation."""
+
+    @pytest.fixture
+    def replies(self, monkeypatch):
+        """Queue replies per model and record which models were called."""
+        queued = {}
+        calls = []
+
+        async def fake_complete(model, messages, max_tokens):
+            calls.append(model)
+            return queued[model].pop(0)
+
+        monkeypatch.setattr(intake_module, "_complete", fake_complete)
+        return queued, calls
+
+    @pytest.mark.asyncio
+    async def test_short_entry_stays_on_fast_model(self, replies):
+        """Test that a confident, valid fast-model reply is used as is."""
+        queued, calls = replies
+        queued[settings.intake_fast_model] = [
+            _fake_completion(json.dumps({"themes": ["budget"], "confidence": 0.9}))
+        ]
+
+        result = await IntakeAgent.process_entry("Booked the florist.")
+
+        assert result["success"] is True
+        assert result["route"] == "fast"
+        assert calls == [settings.intake_fast_model]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "fast_reply",
+        [
+            json.dumps({"themes": ["budget"], "confidence": 0.2}),  # low confidence
+            '{"entities": ',  # invalid JSON
+            json.dumps({"entities": {"costs": [{"amount": "about 3k"}]}}),  # off-schema
+        ],
+    )
+    async def test_escalates_to_large_model(self, replies, fast_reply):
+        """Test that unusable fast-model replies are re-run on the large model."""
+        queued, calls = replies
+        queued[settings.intake_fast_model] = [_fake_completion(fast_reply)]
+        queued[settings.intake_large_model] = [
+            _fake_completion(json.dumps({"themes": ["stress"], "confidence": 0.8}))
+        ]
+
+        result = await IntakeAgent.process_entry("Caterer quoted something, not sure.")
+
+        assert result["success"] is True
+        assert result["route"] == "escalated"
+        assert result["data"]["themes"] == ["stress"]
+        assert calls == [settings.intake_fast_model, settings.intake_large_model]
+        assert result["usage"]["prompt_tokens"] == 800
+
+
+class TestExtractionParsing:
+    """Test typed parsing and salvage of intake replies."""
+
+    def test_valid_reply_parses_to_typed_model(self):
+        """Test that money strings and nulls are normalized during validation."""
+        reply = json.dumps(
+            {
+                "entities": {"costs": [{"amount": "$1,500.00", "category": "venue"}], "people": None},
+                "themes": ["budget"],
+                "confidence": 0.9,
+            }
+        )
+
+        result, problem, dropped = intake_module._parse_reply(reply)
+
+        assert problem is None and dropped == 0
+        assert result.entities.costs[0].amount == 1500.0
+        assert result.entities.people == []
+
+    def test_off_schema_items_are_dropped(self):
+        """Test that one bad item does not discard the rest of the extraction."""
+        reply = json.dumps(
+            {
+                "entities": {"costs": [{"amount": "about 3k"}, {"amount": 200}]},
+                "sentiment": {"emotion": "happy", "confidence": 7},
+                "themes": ["budget"],
+            }
+        )
+
+        result, problem, dropped = intake_module._parse_reply(reply)
+
+        assert problem == "schema"
+        assert dropped == 2
+        assert [cost.amount for cost in result.entities.costs] == [200.0]
+        assert result.sentiment.confidence == 0.5
+        assert result.themes == ["budget"]
+
+    @pytest.mark.parametrize("reply", ['{"entities": ', "[1, 2]"])
+    def test_unusable_replies(self, reply):
+        """Test that truncated JSON and non-object replies are rejected."""
+        result, problem, _ = intake_module._parse_reply(reply)
+
+        assert result is None
+        assert problem == "invalid_json"
+
+    def test_entry_analysis_accepts_client_payloads(self):
+        """Test that submitted entries ("title" tasks, no sentiment) parse as typed entries."""
+        entry = EntryAnalysis.from_entries(
+            [{"id": 7, "tasks": {"explicit": [{"title": "Book DJ", "status": "pending"}]}}]
+        )[0]
+
+        assert entry.id == "7"
+        assert entry.tasks.explicit[0].task == "Book DJ"
+        assert entry.sentiment is None
+
+    def test_entry_analysis_keeps_missing_values_missing(self):
+        """Test that a null id/date stays None and tasks without text are dropped."""
+        entry = EntryAnalysis.from_entries(
+            [
+                {
+                    "id": None,
+                    "date": None,
+                    "tasks": {"explicit": [{"status": "pending"}, {"task": "Book DJ"}]},
+                }
+            ]
+        )[0]
+
+        assert entry.id is None and entry.date is None
+        assert [task.task for task in entry.tasks.explicit] == ["Book DJ"]
+
+
 class TestMemoryAgent:
     """Test Memory Agent search and RAG."""
 
@@ -95,6 +239,105 @@ class TestMemoryAgent:
         assert len(results) > 0
         assert results[0]["id"] in ["1", "2"]
 
+    @pytest.mark.asyncio
+    async def test_search_skips_other_embedding_models(self, local_embeddings):
+        """Test that vectors from another embedding model are never compared."""
+        entries = [
+            {
+                "id": "1",
+                "text": "Booked the venue",
+                "embedding": [0.1] * 1536,
+                "embedding_model": "local:mini-model:1536",
+            },
+            {
+                "id": "2",
+                "text": "Decided on the caterer",
+                "embedding": [0.2] * 1536,
+                "embedding_model": "openai:text-embedding-3-small:1536",
+            },
+        ]
+
+        results = await MemoryAgent.search_entries("venue", entries, top_k=5)
+
+        assert [r["id"] for r in results] == ["1"]
+
+    def test_reciprocal_rank_fusion(self):
+        """Test that entries ranked by both retrievers are fused to the top."""
+        vector_results = [{"id": "a"}, {"id": "b"}, {"id": "c"}]
+        keyword_results = [{"id": "b"}, {"id": "d"}]
+
+        fused = MemoryAgent.reciprocal_rank_fusion(
+            [vector_results, keyword_results], top_k=3
+        )
+
+        assert [r["id"] for r in fused] == ["b", "a", "d"]
+        assert 0.0 < fused[0]["relevance_score"] <= 1.0
+        assert fused[0]["relevance_score"] > fused[1]["relevance_score"]
+
+    @pytest.mark.asyncio
+    async def test_search_pipeline_reranks_quantized_candidates(self, local_embeddings):
+        """Test that binary-quantized candidates are re-ranked with full-precision vectors."""
+        import numpy as np
+        from app.services.entry_batch import EntryBatch
+
+        vectors = {"c": [0.1, 1.0], "b": [1.0, 0.9], "a": [1.0, 0.1]}
+        entries = [{"id": key, "text": key, "embedding": value} for key, value in vectors.items()]
+        batch = EntryBatch.from_dicts(entries).quantize("binary")  # all share one sign pattern
+
+        async def load_vectors(ids):
+            return np.array([vectors[entry_id] for entry_id in ids], dtype=np.float32)
+
+        timings = {}
+        results = await MemoryAgent.search_entries(
+            "venue", batch, top_k=2, query_embedding=[1.0, 0.2],
+            vector_loader=load_vectors, timings=timings,
+        )
+
+        assert [r["id"] for r in results] == ["a", "b"]
+        assert results[0]["relevance_score"] == pytest.approx(0.995, abs=1e-3)
+        assert {"candidates", "rerank"} <= set(timings)
+
+    @pytest.mark.asyncio
+    async def test_search_pipeline_boosts_named_themes(self, local_embeddings):
+        """Test that a theme named in the query lifts entries tagged with it."""
+        from app.schemas.retrieval import RetrievalOptions
+
+        entries = [
+            {"id": "1", "text": "Guest list", "embedding": [1.0, 0.0], "themes": ["family"]},
+            {"id": "2", "text": "Quotes", "embedding": [0.9, 0.1], "themes": ["budget"]},
+        ]
+
+        plain = await MemoryAgent.search_entries(
+            "budget worries", entries, top_k=2, query_embedding=[1.0, 0.0]
+        )
+        boosted = await MemoryAgent.search_entries(
+            "budget worries", entries, top_k=2, query_embedding=[1.0, 0.0],
+            options=RetrievalOptions(theme_weight=0.5),
+        )
+
+        assert [r["id"] for r in plain] == ["1", "2"]
+        assert [r["id"] for r in boosted] == ["2", "1"]
+
+    def test_build_intake_context(self):
+        """Test that intake context lists entities first and stays within the token budget."""
+        entities = [
+            {"entity_type": "vendor", "canonical_name": "Mamma's Kitchen", "mention_count": 3},
+            {"entity_type": "venue", "canonical_name": "Lakeside Hall", "decision_made": True},
+        ]
+        entries = [
+            {"text": "Loved the tasting at Mamma's Kitchen. " * 40, "date": "2026-03-01T10:00:00"},
+            {"text": "Visited Lakeside Hall with mom.", "date": "2026-02-20T09:00:00"},
+        ]
+
+        context = MemoryAgent.build_intake_context(entries, entities, max_tokens=100)
+
+        assert context.startswith("Known entities:\n- vendor: Mamma's Kitchen (3 mentions)")
+        assert "- venue: Lakeside Hall (decided)" in context
+        assert "- [2026-03-01] Loved the tasting" in context
+        assert context.count("...") == 1  # long entry truncated to fit
+        assert len(context) <= 100 * 4
+        assert MemoryAgent.build_intake_context([], []) == ""
+
     @pytest.mark.asyncio
     async def test_find_contradictions(self):
         """Test contradiction detection."""
@@ -208,5 +451,55 @@ class TestInsightAgent:
         assert len(next_steps) > 0
 
 
+class TestTokenAccounting:
+    """Test token counting, max_tokens sizing and cost reporting."""
+
+    def test_size_max_tokens(self):
+        """Test that the completion limit follows the input within floor/ceiling."""
+        assert size_max_tokens(10, base=300, ratio=1.5, floor=500, ceiling=2000) == 500
+        assert size_max_tokens(400, base=300, ratio=1.5, floor=500, ceiling=2000) == 900
+        assert size_max_tokens(5000, base=300, ratio=1.5, floor=500, ceiling=2000) == 2000
+
+    def test_token_usage_cost(self):
+        """Test cost with cached prompt tokens billed at the cached rate."""
+        usage = TokenUsage(
+            model="gpt-4o", prompt_tokens=2000, completion_tokens=500, cached_tokens=1000
+        )
+
+        assert usage.total_tokens == 2500
+        assert usage.cost_usd == pytest.approx((1000 * 2.50 + 1000 * 1.25 + 500 * 10.00) / 1e6)
+        assert TokenUsage(model="unknown", prompt_tokens=1, completion_tokens=1).cost_usd is None
+
+    def test_compact_prompt_shares_static_prefix(self):
+        """Test that the compact prompt is smaller and the system prefix is entry-independent."""
+        model = settings.intake_large_model
+        full = IntakeAgent.build_messages("Booked the florist.", prompt_variant="full")
+        compact = IntakeAgent.build_messages("Booked the florist.", prompt_variant="compact")
+        other = IntakeAgent.build_messages("Caterer quoted $3000.", "ta", prompt_variant="compact")
+
+        assert count_message_tokens(compact, model) < count_message_tokens(full, model) * 0.7
+        assert compact[0] == other[0]
+        assert "Caterer quoted $3000." in other[-1]["content"]
+
+    @pytest.mark.asyncio
+    async def test_tokenizer_loads_off_the_event_loop(self, monkeypatch):
+        """Test that counts use the heuristic until the tokenizer has loaded in a thread."""
+        loaded_in = []
+
+        def fake_load(model):
+            loaded_in.append(threading.current_thread())
+            return SimpleNamespace(encode=lambda text, disallowed_special=(): text.split())
+
+        monkeypatch.setattr(tokens_module, "_encodings", {})
+        monkeypatch.setattr(tokens_module, "_load_encoding", fake_load)
+        text = "Booked the venue for June"
+
+        assert tokens_module.count_tokens(text, "test-model") == estimate_tokens(text)
+        await asyncio.gather(*tokens_module._encoding_loads.values())
+
+        assert tokens_module.count_tokens(text, "test-model") == 5
+        assert loaded_in and loaded_in[0] is not threading.main_thread()
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
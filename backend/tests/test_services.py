@@ -0,0 +1,926 @@
+"""Test suite for service-layer helpers (embeddings, search, transcription)."""
+
+import asyncio
+import hashlib
+import io
+import os
+import struct
+import time
+import numpy as np
+import pytest
+from openai import BadRequestError, InternalServerError
+from app.services.audio_segments import plan_windows, stitch_transcripts
+from app.services.chunking import split_into_chunks
+from app.services.compute import EventLoopLagMonitor, run_cpu_bound, shutdown_compute_pool
+from app.services.embeddings import (
+    EmbeddingsService,
+    QueryEmbeddingCache,
+    adapt_dimensions,
+    query_embedding_scope,
+)
+from app.services.entry_batch import EntryBatch
+from app.services.quantization import (
+    QuantizedEmbeddings,
+    distance_expression,
+    truncate_dimensions,
+)
+from app.services.vector_io import decode_vectors
+from app.services.llm_client import CircuitOpenError, DeadlineExceededError
+from app.services.metrics import metrics
+from app.services.rate_limiter import RateLimiter, llm_request_context
+from app.services import transcription
+from app.schemas.retrieval import SearchFilters
+from app.services.partitioning import (
+    month_partition_statements,
+    partition_layout_statements,
+    rewrite_index_definition,
+)
+from app.services.search_cursor import SearchCursorStore
+from app.services.search_filters import entry_filter_conditions
+from app.services.theme_analytics import ThemeAnalyticsService
+from app.services.script_detection import detect_script_language, detect_script_languages
+from app.services.transcription import (
+    AudioTooLargeError,
+    LanguageDetector,
+    TranscriptionService,
+    UPLOAD_CHUNK_BYTES,
+    spool_upload,
+)
+from app.services.transcription_cache import TranscriptionCache
+
+
+class TestEmbeddings:
+    """Test embeddings backends."""
+
+    def test_adapt_dimensions_pads_and_normalizes(self):
+        """Test that short vectors are zero-padded to unit length."""
+        adapted = adapt_dimensions([3.0, 4.0], 4)
+
+        assert adapted == [0.6, 0.8, 0.0, 0.0]
+
+    def test_adapt_dimensions_truncates(self):
+        """Test that long vectors are truncated to the target size."""
+        adapted = adapt_dimensions([1.0, 0.0, 5.0], 2)
+
+        assert adapted == [1.0, 0.0]
+
+    @pytest.mark.asyncio
+    async def test_local_backend(self, local_embeddings):
+        """Test local backend output size and model tag."""
+        embedding = await EmbeddingsService.embed_text("Booked the venue")
+
+        assert len(embedding) == EmbeddingsService.DIMENSIONS
+        assert EmbeddingsService.model_tag() == "local:mini-model:1536"
+
+    @pytest.mark.asyncio
+    async def test_embed_entry_passages(self, local_embeddings):
+        """Test that only long entries get passage embeddings."""
+        long_text = "\n\n".join(f"Paragraph {i} about the caterer. " * 12 for i in range(4))
+
+        _, short_passages = await EmbeddingsService.embed_entry("Booked the venue")
+        embedding, passages = await EmbeddingsService.embed_entry(long_text)
+
+        assert short_passages == []
+        assert len(embedding) == EmbeddingsService.DIMENSIONS
+        assert len(passages) == 4
+        assert long_text[slice(*passages[0][0])].startswith("Paragraph 0")
+
+    @pytest.mark.asyncio
+    async def test_embed_query_is_shared(self, local_embeddings, monkeypatch):
+        """Test that concurrent, same-request and repeated queries share one embeddings call."""
+        calls = []
+        embed = local_embeddings.embed
+
+        async def counting_embed(texts):
+            calls.append(texts)
+            await asyncio.sleep(0.01)
+            return await embed(texts)
+
+        monkeypatch.setattr(local_embeddings, "embed", counting_embed)
+        monkeypatch.setattr("app.services.embeddings._query_cache", QueryEmbeddingCache(60, 16))
+
+        with query_embedding_scope():
+            first, second = await asyncio.gather(
+                EmbeddingsService.embed_query("venue deposit"),
+                EmbeddingsService.embed_query("venue deposit"),
+            )
+            again = await EmbeddingsService.embed_query("venue deposit")
+        later = await EmbeddingsService.embed_query("venue deposit")
+        await EmbeddingsService.embed_query("florist")
+
+        assert calls == [["venue deposit"], ["florist"]]
+        assert first == second == again
+        assert later == pytest.approx(first)
+
+
+class TestChunking:
+    """Test splitting entries into passages."""
+
+    def test_paragraphs_and_sentences(self):
+        """Test that short paragraphs stay whole and long ones split at sentence ends."""
+        text = "We toured the hall. " * 40 + "\n\n" + "Mom loved the flowers. " * 10
+
+        chunks = split_into_chunks(text, max_chars=300, min_chars=50)
+
+        assert all(end - start <= 300 for start, end in chunks)
+        assert all(text[start:end].endswith(".") for start, end in chunks)
+        assert text[slice(*chunks[-1])] == ("Mom loved the flowers. " * 10).strip()
+
+    def test_fragments_are_merged(self):
+        """Test that a passage below min_chars joins its neighbour."""
+        text = "A" * 200 + "\n\nAnyway."
+
+        assert split_into_chunks(text, max_chars=300, min_chars=50) == [(0, len(text))]
+        assert split_into_chunks("") == []
+
+    def test_danda_sentence_ends(self):
+        """Test that Devanagari danda ends a sentence."""
+        text = "वेन्यू देखा। " * 40
+
+        chunks = split_into_chunks(text.strip(), max_chars=100, min_chars=10)
+
+        assert len(chunks) > 1
+        assert all(text[start:end].endswith("।") for start, end in chunks)
+
+
+class TestCompute:
+    """Test CPU offload helpers."""
+
+    @pytest.mark.asyncio
+    async def test_run_cpu_bound_inline_and_offloaded(self):
+        """Test that small inputs run inline and large ones in the process pool."""
+        metrics.reset()
+        try:
+            assert await run_cpu_bound(sum, [1, 2, 3], size=3, threshold=10) == 6
+            assert await run_cpu_bound(sum, [1, 2, 3], size=3, threshold=1) == 6
+
+            counters = metrics.snapshot()["counters"]
+            assert counters["compute_jobs_total{func=sum,mode=inline}"] == 1
+            assert counters["compute_jobs_total{func=sum,mode=offloaded}"] == 1
+        finally:
+            shutdown_compute_pool()
+
+    @pytest.mark.asyncio
+    async def test_event_loop_lag_monitor(self):
+        """Test that blocking the loop shows up as lag."""
+        metrics.reset()
+        monitor = EventLoopLagMonitor(interval=0.01)
+        monitor.start()
+        await asyncio.sleep(0.02)
+        time.sleep(0.1)  # Block the loop
+        await asyncio.sleep(0.02)
+        await monitor.stop()
+
+        assert metrics.snapshot()["timings"]["event_loop_lag_seconds"]["max"] >= 0.05
+
+
+class TestEntryBatch:
+    """Test the columnar entry batch used by the agents."""
+
+    ENTRIES = [
+        {
+            "id": "1",
+            "text": "Booked the venue",
+            "embedding": [1.0, 0.0],
+            "embedding_model": "m1",
+            "entities": {"costs": [{"amount": 4000, "category": "venue"}]},
+            "sentiment": {"emotion": "happy", "confidence": 0.9},
+            "themes": ["budget"],
+        },
+        {
+            "id": "2",
+            "text": "Old embedding model",
+            "embedding": [0.0, 1.0],
+            "embedding_model": "m0",
+            "entities": {"costs": [{"amount": "$1,200", "category": "catering"}]},
+            "sentiment": {},
+        },
+        {"id": "3", "text": "Not embedded", "sentiment": {"emotion": "happy"}, "themes": ["budget"]},
+    ]
+
+    def test_columns(self):
+        """Test that nested entry dicts become flat columns."""
+        batch = EntryBatch.from_dicts(self.ENTRIES, model_tag="m1")
+
+        assert len(batch) == 3
+        assert batch.embeddings.dtype == np.float32
+        assert batch.has_embedding.tolist() == [True, False, False]
+        assert batch.costs["amount"].tolist() == [4000.0, 1200.0]
+        assert batch.costs.owner.tolist() == [0, 1]
+        assert batch.emotion.counts() == {"happy": 2}  # "{}" is no sentiment
+        assert batch.themes["value"].counts() == {"budget": 2}
+
+    def test_similarities_and_results(self):
+        """Test cosine scores over the matrix and the search-result format."""
+        batch = EntryBatch.from_dicts(self.ENTRIES, model_tag="m1")
+
+        scores = batch.similarities([3.0, 4.0])
+
+        assert scores[0] == pytest.approx(0.6)
+        assert np.isnan(scores[1]) and np.isnan(scores[2])
+        result = batch.result(0, scores[0])
+        assert result["id"] == "1"
+        assert result["full_text"] == "Booked the venue"
+        assert result["entities"] == self.ENTRIES[0]["entities"]
+
+
+    def test_chunks_max_sim_and_passage(self):
+        """Test that an entry scores its best passage and cites it."""
+        text = "Guest list done. Caterer quote came in at $40 a plate."
+        entries = [
+            {"id": "1", "text": text, "embedding": [0.0, 1.0],
+             "chunks": [{"start": 0, "end": 16, "embedding": [0.0, 1.0]},
+                        {"start": 17, "end": len(text), "embedding": [1.0, 0.0]}]},
+            {"id": "2", "text": "Venue", "embedding": [0.6, 0.8]},
+        ]
+        batch = EntryBatch.from_dicts(entries)
+
+        scores = batch.similarities([1.0, 0.0])
+        passage_scores, rows = batch.best_chunks(np.array([0, 1]), [1.0, 0.0])
+
+        assert scores.tolist() == pytest.approx([1.0, 0.6])
+        assert passage_scores[0] == pytest.approx(1.0) and np.isnan(passage_scores[1])
+        assert batch.result(0, scores[0], int(rows[0]))["passage"] == text[17:]
+        assert batch.result(1, scores[1], int(rows[1]))["passage"] == "Venue"
+        assert batch.quantize("int8").similarities([1.0, 0.0])[0] == pytest.approx(1.0, abs=0.01)
+
+
+class TestQuantization:
+    """Test reduced-precision and reduced-dimension embedding storage."""
+
+    @staticmethod
+    def _unit_rows(count, dimensions, seed=0):
+        matrix = np.random.default_rng(seed).normal(size=(count, dimensions)).astype(np.float32)
+        return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+    @pytest.mark.parametrize("mode,tolerance", [("float16", 1e-3), ("int8", 2e-2)])
+    def test_scores_close_to_exact(self, mode, tolerance):
+        """Test that float16 and int8 scores stay close to float32 cosine similarity."""
+        matrix = self._unit_rows(50, 64)
+        query = matrix[0]
+
+        quantized = QuantizedEmbeddings.from_matrix(matrix, mode)
+
+        assert np.allclose(quantized.similarities(query), matrix @ query, atol=tolerance)
+        assert quantized.nbytes < matrix.nbytes
+
+    def test_binary_ranks_the_query_first(self):
+        """Test that binary codes score identical sign patterns 1 and flag a re-rank."""
+        matrix = self._unit_rows(50, 64)
+
+        quantized = QuantizedEmbeddings.from_matrix(matrix, "binary")
+        scores = quantized.similarities(matrix[7])
+
+        assert quantized.approximate
+        assert quantized.nbytes == 50 * 8
+        assert scores[7] == 1.0 and scores.argmax() == 7
+
+    def test_truncated_dimensions(self):
+        """Test that a Matryoshka prefix is re-normalized and the query truncated to match."""
+        matrix = self._unit_rows(10, 32)
+
+        quantized = QuantizedEmbeddings.from_matrix(matrix, "float32", dimensions=8)
+        prefix = truncate_dimensions(matrix, 8)
+
+        assert quantized.codes.shape == (10, 8)
+        assert quantized.approximate
+        assert np.allclose(np.linalg.norm(prefix, axis=1), 1.0)
+        assert np.allclose(quantized.similarities(matrix[3]), prefix @ prefix[3])
+
+    def test_batch_quantize(self):
+        """Test that a quantized batch keeps NaN for entries without embeddings."""
+        batch = EntryBatch.from_dicts(TestEntryBatch.ENTRIES, model_tag="m1").quantize("binary")
+
+        scores = batch.similarities([3.0, -4.0])  # same sign pattern as [1.0, 0.0]
+
+        assert batch.approximate
+        assert scores[0] == 1.0
+        assert np.isnan(scores[1]) and np.isnan(scores[2])
+
+
+    def test_binary_distance_binds_bit_string(self):
+        """Test that the binary query is bound in a form asyncpg's bit codec accepts."""
+        from asyncpg import BitString
+        from sqlalchemy.dialects.postgresql.asyncpg import dialect
+        from app.models import JournalEntry
+
+        expression = distance_expression(JournalEntry.embedding, [0.5, -1.0, 0.2], "binary")
+        compiled = expression.compile(dialect=dialect())
+
+        assert "<~> CAST($1 AS bit(3))" in str(compiled)
+        (query_bits,) = compiled.params.values()
+        assert isinstance(query_bits, BitString)
+        assert query_bits == BitString("101")
+
+
+class TestVectorIO:
+    """Test decoding of pgvector's binary format."""
+
+    @staticmethod
+    def _vector_send(values):
+        """vector_send() layout: int16 dimensions, int16 unused, big-endian float4 values."""
+        return struct.pack(">HH%df" % len(values), len(values), 0, *values)
+
+    def test_decode_vectors_matches_wire_format(self):
+        """Test that vector_send() payloads decode to their values."""
+        vectors = [[1.5, -2.0, 3.0], [0.0, 0.25, 1.0]]
+        blobs = [self._vector_send(vectors[0]), None, self._vector_send(vectors[1])]
+
+        matrix = decode_vectors(blobs)
+
+        assert matrix.dtype == np.float32
+        assert matrix.tolist() == [vectors[0], [0.0, 0.0, 0.0], vectors[1]]
+
+    def test_decode_vectors_rejects_mixed_dimensions(self):
+        """Test that a payload with the wrong dimensions is not silently truncated."""
+        with pytest.raises(ValueError):
+            decode_vectors([self._vector_send([1.0, 2.0]), self._vector_send([1.0])])
+
+
+class TestSearchCursorStore:
+    """Test the rankings kept behind search cursors."""
+
+    def test_pages_read_the_stored_ranking(self):
+        """Test that a cursor round-trips to the same ranking and offset."""
+        store = SearchCursorStore(ttl_seconds=60, max_cursors=4)
+        ranking = [("a", 0.9, None), ("b", 0.8, (10, 25)), ("c", 0.7, None)]
+
+        cursor = SearchCursorStore.encode(store.put(ranking), 2)
+        token, offset = SearchCursorStore.decode(cursor)
+
+        assert store.get(token)[offset:] == [("c", 0.7, None)]
+        with pytest.raises(ValueError):
+            SearchCursorStore.decode("not-a-cursor")
+
+    def test_expiry_and_eviction(self):
+        """Test that rankings expire and the least recently used are dropped."""
+        store = SearchCursorStore(ttl_seconds=60, max_cursors=2)
+        first, second = store.put([("a", 1.0, None)]), store.put([("b", 1.0, None)])
+        store.get(first)
+        third = store.put([("c", 1.0, None)])
+
+        assert store.get(second) is None
+        assert store.get(first) is not None and store.get(third) is not None
+
+        expired = SearchCursorStore(ttl_seconds=0, max_cursors=2)
+        token = expired.put([("a", 1.0, None)])
+        time.sleep(0.01)
+        assert expired.get(token) is None
+
+
+class TestSearchFilters:
+    """Test the SQL generated for structured search filters."""
+
+    def test_filter_conditions_match_indexed_expressions(self):
+        """Test that filters compile to the expressions the indexes cover."""
+        from datetime import datetime, timedelta, timezone
+        from sqlalchemy import select
+        from sqlalchemy.dialects import postgresql
+        from app.models import JournalEntry
+
+        filters = SearchFilters(
+            created_after=datetime(2025, 1, 1, tzinfo=timezone(timedelta(hours=5, minutes=30))),
+            themes=["budget"],
+            emotions=["stressed"],
+            vendors=["Mamma's Kitchen"],
+        )
+
+        sql = str(
+            select(JournalEntry.id)
+            .where(*entry_filter_conditions(filters))
+            .compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+        )
+
+        assert "journal_entries.created_at >= '2024-12-31 18:30:00'" in sql
+        assert "journal_entries.themes && ARRAY['budget']" in sql
+        assert "((journal_entries.meta -> 'sentiment') ->> 'emotion') IN ('stressed')" in sql
+        assert "lower(vendor.value ->> 'name') IN ('mamma''s kitchen')" in sql
+        assert "jsonb_typeof((journal_entries.meta -> 'entities') -> 'vendors') = 'array'" in sql
+        assert entry_filter_conditions(None) == []
+        assert not SearchFilters().active
+
+    def test_entity_filters_use_jsonb_containment(self):
+        """Test that vendor status and cost category filters compile to indexable @> queries."""
+        from sqlalchemy import select
+        from sqlalchemy.dialects import postgresql
+        from app.models import JournalEntry
+
+        filters = SearchFilters(vendor_statuses=["booked", "paid"], cost_categories=["venue"])
+
+        compiled = (
+            select(JournalEntry.id)
+            .where(*entry_filter_conditions(filters))
+            .compile(dialect=postgresql.dialect())
+        )
+
+        assert str(compiled).count("(journal_entries.meta -> 'entities') @> ") == 3
+        assert sorted(compiled.params.values(), key=str) == [
+            {"costs": [{"category": "venue"}]},
+            {"vendors": [{"status": "booked"}]},
+            {"vendors": [{"status": "paid"}]},
+        ]
+
+
+class TestThemeAnalytics:
+    """Test the SQL theme aggregations."""
+
+    @pytest.mark.asyncio
+    async def test_theme_timeline_groups_in_sql(self):
+        """Test that theme timelines are aggregated by Postgres, not in Python."""
+        import uuid
+        from sqlalchemy.dialects import postgresql
+
+        class RecordingSession:
+            statements = []
+
+            async def execute(self, stmt):
+                self.statements.append(stmt)
+
+                class Result:
+                    def all(self):
+                        return []
+
+                return Result()
+
+        session = RecordingSession()
+        timeline = await ThemeAnalyticsService.theme_timeline(
+            session, uuid.uuid4(), window="month", themes=["budget"]
+        )
+        sql = str(session.statements[0].compile(dialect=postgresql.dialect()))
+
+        assert timeline == []
+        assert "unnest(journal_entries.themes) AS entry_theme(theme)" in sql
+        assert "journal_entries.themes && %(param_1)s::VARCHAR[]" in sql
+        assert "GROUP BY date_trunc('month', journal_entries.created_at), entry_theme.theme" in sql
+        with pytest.raises(ValueError):
+            await ThemeAnalyticsService.theme_timeline(session, uuid.uuid4(), window="year")
+
+
+class TestPartitioning:
+    """Test the DDL for the partitioned journal_entries layout."""
+
+    def test_user_hash_layout(self):
+        """Test that the layout copies the entries and re-creates indexes per partition."""
+        statements = partition_layout_statements(
+            "user_hash",
+            [
+                "CREATE INDEX idx_entries_embedding ON public.journal_entries "
+                "USING ivfflat (embedding vector_cosine_ops) WITH (lists='100')"
+            ],
+            [("entry_chunks", "entry_chunks_entry_id_fkey")],
+            partitions=4,
+        )
+
+        assert statements[0] == (
+            "ALTER TABLE entry_chunks DROP CONSTRAINT entry_chunks_entry_id_fkey"
+        )
+        assert "PARTITION BY HASH (user_id)" in statements[4]
+        assert "ALTER TABLE journal_entries ADD PRIMARY KEY (id, user_id)" in statements
+        assert sum("FOR VALUES WITH (MODULUS 4," in statement for statement in statements) == 4
+        # Indexes are built after the copy, per partition, as HNSW instead of IVFFlat
+        copy = statements.index(
+            "INSERT INTO journal_entries SELECT * FROM journal_entries_unpartitioned"
+        )
+        assert statements[copy + 1] == (
+            "CREATE INDEX idx_entries_embedding ON journal_entries "
+            "USING hnsw (embedding vector_cosine_ops)"
+        )
+
+    def test_month_partitions(self):
+        """Test monthly ranges across a year boundary."""
+        from datetime import date
+
+        statements = month_partition_statements(date(2024, 12, 15), 2)
+
+        assert statements == [
+            "CREATE TABLE IF NOT EXISTS journal_entries_y2024m12 PARTITION OF journal_entries "
+            "FOR VALUES FROM ('2024-12-01') TO ('2025-01-01')",
+            "CREATE TABLE IF NOT EXISTS journal_entries_y2025m01 PARTITION OF journal_entries "
+            "FOR VALUES FROM ('2025-01-01') TO ('2025-02-01')",
+        ]
+        assert rewrite_index_definition(
+            "CREATE INDEX idx_entries_themes_gin ON public.journal_entries USING gin (themes)",
+            "journal_entries",
+        ) == "CREATE INDEX idx_entries_themes_gin ON journal_entries USING gin (themes)"
+
+
+class FakeUpload:
+    """Minimal async upload reader (like FastAPI's UploadFile)."""
+
+    def __init__(self, data: bytes):
+        self._data = data
+
+    async def read(self, size: int = -1) -> bytes:
+        chunk, self._data = self._data[:size], self._data[size:]
+        return chunk
+
+
+class TestTranscription:
+    """Test upload spooling and long-audio segmentation."""
+
+    @pytest.mark.asyncio
+    async def test_spool_upload(self):
+        """Test that uploads are spooled in chunks and rewound."""
+        data = b"webm" * (UPLOAD_CHUNK_BYTES // 2)
+        audio_stream, size, sha256 = await spool_upload(FakeUpload(data))
+
+        with audio_stream:
+            assert size == len(data)
+            assert sha256 == hashlib.sha256(data).hexdigest()
+            assert audio_stream.read() == data
+
+    @pytest.mark.asyncio
+    async def test_spool_upload_rejects_large_files(self):
+        """Test that the size limit is enforced while reading."""
+        with pytest.raises(AudioTooLargeError):
+            await spool_upload(FakeUpload(b"x" * 2048), max_bytes=1024)
+
+    def test_plan_windows_overlap_and_silence_snap(self):
+        """Test that windows overlap and cuts snap to nearby silences."""
+        windows = plan_windows(700.0, 300.0, 3.0, silences=[295.0])
+
+        assert windows == [(0.0, 295.0), (292.0, 592.0), (589.0, 700.0)]
+
+    def test_stitch_transcripts_removes_overlap(self):
+        """Test that words repeated across segment overlap appear once."""
+        text = stitch_transcripts(
+            [
+                "We met the caterer today and they were great.",
+                "They were great, quoted $3000 for June 15.",
+            ]
+        )
+
+        assert text == "We met the caterer today and they were great. quoted $3000 for June 15."
+
+    @pytest.mark.asyncio
+    async def test_failed_segment_cancels_the_others(self, monkeypatch):
+        """Test that one failing segment stops the rest before the work dir is removed."""
+        finished = []
+
+        async def fake_duration(path):
+            return 1200.0
+
+        async def fake_silences(path):
+            return []
+
+        async def fake_extract(source_path, start, end, segment_path):
+            with open(segment_path, "wb") as segment:
+                segment.write(b"mp3")
+
+        async def fake_transcribe(audio_file, language=None, file_name="audio.webm"):
+            if file_name == "segment-0000.mp3":
+                raise RuntimeError("Whisper rejected the segment")
+            await asyncio.sleep(0.2)
+            finished.append(file_name)
+            return {"text": "", "language": "en", "confidence": 0.95}
+
+        monkeypatch.setattr(transcription, "probe_duration", fake_duration)
+        monkeypatch.setattr(transcription, "detect_silences", fake_silences)
+        monkeypatch.setattr(transcription, "extract_segment", fake_extract)
+        monkeypatch.setattr(TranscriptionService, "transcribe_audio", fake_transcribe)
+
+        with pytest.raises(RuntimeError):
+            await TranscriptionService.transcribe_long_audio(io.BytesIO(b"webm"))
+        await asyncio.sleep(0.3)
+
+        assert finished == []
+
+
+class TestTranscriptionCache:
+    """Test the content-hash transcription cache."""
+
+    def test_cache_evicts_least_recently_used(self, tmp_path):
+        """Test that the cache stays under its size bound."""
+        cache = TranscriptionCache(str(tmp_path), max_bytes=150)
+        cache.put("old", {"text": "a" * 60})
+        os.utime(tmp_path / "old.json", (0, 0))
+        cache.put("new", {"text": "b" * 60})
+        cache.put("newest", {"text": "c" * 60})
+
+        assert cache.get("old") is None
+        assert cache.get("newest") == {"text": "c" * 60}
+
+    @pytest.mark.asyncio
+    async def test_duplicate_uploads_share_one_call(self, tmp_path, monkeypatch):
+        """Test that concurrent identical uploads and retries call Whisper once."""
+        calls = []
+
+        async def fake_transcribe(audio_file, language=None, file_name="audio.webm"):
+            calls.append(file_name)
+            await asyncio.sleep(0.05)
+            return {"text": "Booked the venue", "language": "en", "confidence": 0.95}
+
+        monkeypatch.setattr(
+            transcription, "transcription_cache", TranscriptionCache(str(tmp_path), 1024 * 1024)
+        )
+        monkeypatch.setattr(TranscriptionService, "transcribe_audio", fake_transcribe)
+
+        results = await asyncio.gather(
+            *(
+                TranscriptionService.transcribe_cached(io.BytesIO(b"webm"), "abc123")
+                for _ in range(3)
+            )
+        )
+        retry = await TranscriptionService.transcribe_cached(io.BytesIO(b"webm"), "abc123")
+
+        assert len(calls) == 1
+        assert all(r["text"] == "Booked the venue" for r in results)
+        assert retry["cached"] is True
+
+    @pytest.mark.asyncio
+    async def test_shared_call_survives_first_caller_leaving(self, tmp_path, monkeypatch):
+        """Test that joined callers get a transcript after the first caller's stream closes."""
+
+        async def fake_transcribe(audio_file, language=None, file_name="audio.webm"):
+            await asyncio.sleep(0.1)
+            return {"text": audio_file.read().decode(), "language": "en", "confidence": 0.95}
+
+        monkeypatch.setattr(
+            transcription, "transcription_cache", TranscriptionCache(str(tmp_path), 1024 * 1024)
+        )
+        monkeypatch.setattr(TranscriptionService, "transcribe_audio", fake_transcribe)
+
+        first_stream = io.BytesIO(b"webm")
+        first = asyncio.create_task(TranscriptionService.transcribe_cached(first_stream, "abc123"))
+        await asyncio.sleep(0.02)
+        joined = asyncio.create_task(
+            TranscriptionService.transcribe_cached(io.BytesIO(b"webm"), "abc123")
+        )
+        await asyncio.sleep(0.02)
+        first.cancel()  # client disconnected; the router closes its upload
+        first_stream.close()
+
+        assert (await joined)["text"] == "webm"
+
+
+class TestLanguageDetector:
+    """Test audio language detection."""
+
+    @pytest.mark.asyncio
+    async def test_reuses_transcription_language(self):
+        """Test that an existing transcription result avoids a Whisper call."""
+        language = await LanguageDetector.detect_language(
+            audio_file=b"webm", transcription={"text": "வணக்கம்", "language": "tamil"}
+        )
+
+        assert language == "ta"
+
+    @pytest.mark.asyncio
+    async def test_unmapped_language_is_not_english(self):
+        """Test that a language name without a known code is reported as unknown."""
+        language = await LanguageDetector.detect_language(
+            transcription={"text": "Bonjour", "language": "french"}
+        )
+
+        assert language is None
+
+    @pytest.mark.asyncio
+    async def test_audio_detection_reads_model_attribute(
+        self, monkeypatch, fake_openai, llm_client
+    ):
+        """Test that the verbose_json model object is read by attribute."""
+        fake_openai.reply(body={"text": "नमस्ते", "language": "hindi"})
+        monkeypatch.setattr(transcription, "ffmpeg_available", lambda: False)
+
+        assert await LanguageDetector.detect_language(audio_file=b"webm") == "hi"
+        assert b"verbose_json" in fake_openai.bodies[0]
+
+    @pytest.mark.asyncio
+    async def test_failed_detection_is_not_english(self, monkeypatch, fake_openai, llm_client):
+        """Test that a failed audio detection (or no input) reports the language as unknown."""
+        fake_openai.reply(400, body={"error": {"message": "unsupported audio"}})
+        monkeypatch.setattr(transcription, "ffmpeg_available", lambda: False)
+
+        assert await LanguageDetector.detect_language(audio_file=b"webm") is None
+        assert await LanguageDetector.detect_language() is None
+
+
+class TestLLMClient:
+    """Test the shared client's retries, deadlines, hedging and circuit breaker."""
+
+    @staticmethod
+    def _chat(client):
+        return client.call(
+            "chat",
+            lambda: client.client.chat.completions.create(
+                model="gpt-4o-mini", messages=[{"role": "user", "content": "hi"}]
+            ),
+            deadline=5.0,
+        )
+
+    @pytest.mark.asyncio
+    async def test_retries_rate_limits_and_server_errors(self, fake_openai, llm_client):
+        """Test that 429 and 5xx replies are retried until one succeeds."""
+        fake_openai.reply(429, headers={"Retry-After": "0.05"})
+        fake_openai.reply(503)
+
+        response = await self._chat(llm_client)
+
+        assert response.choices[0].message.content == "{}"
+        assert fake_openai.requests == 3
+
+    @pytest.mark.asyncio
+    async def test_client_errors_are_not_retried(self, fake_openai, llm_client):
+        """Test that a 400 fails immediately and does not trip the breaker."""
+        fake_openai.reply(400, body={"error": {"message": "bad request"}})
+
+        with pytest.raises(BadRequestError):
+            await self._chat(llm_client)
+
+        assert fake_openai.requests == 1
+        assert llm_client.breaker("chat").state == "closed"
+
+    @pytest.mark.asyncio
+    async def test_deadline_bounds_slow_upstream(self, fake_openai, llm_client):
+        """Test that a hung upstream is abandoned at the call deadline."""
+        fake_openai.reply(200, delay=2.0)
+
+        started = time.perf_counter()
+        with pytest.raises(DeadlineExceededError):
+            await llm_client.call(
+                "chat",
+                lambda: llm_client.client.chat.completions.create(
+                    model="gpt-4o-mini", messages=[{"role": "user", "content": "hi"}]
+                ),
+                deadline=0.3,
+            )
+
+        assert time.perf_counter() - started < 1.0
+
+    @pytest.mark.asyncio
+    async def test_hedged_request_wins_over_slow_primary(self, fake_openai, llm_client):
+        """Test that a hedge started after hedge_after returns before the slow primary."""
+        fake_openai.reply(200, delay=1.5)
+        fake_openai.reply(200)
+
+        started = time.perf_counter()
+        await llm_client.call(
+            "embeddings",
+            lambda: llm_client.client.chat.completions.create(
+                model="gpt-4o-mini", messages=[{"role": "user", "content": "hi"}]
+            ),
+            deadline=5.0,
+            hedge_after=0.1,
+        )
+
+        assert time.perf_counter() - started < 1.0
+        assert fake_openai.requests == 2
+
+    @pytest.mark.asyncio
+    async def test_hedge_is_charged_to_the_rate_limiter(self, fake_openai, llm_client):
+        """Test that a hedged duplicate pays for its own request and tokens."""
+        limiter = RateLimiter("embeddings", 100, 10_000, max_concurrency=4)
+        llm_client.limiters = {"embeddings": limiter}
+        fake_openai.reply(200, delay=1.5)
+        fake_openai.reply(200)
+
+        await llm_client.call(
+            "embeddings",
+            lambda: llm_client.client.chat.completions.create(
+                model="gpt-4o-mini", messages=[{"role": "user", "content": "hi"}]
+            ),
+            deadline=5.0,
+            hedge_after=0.1,
+            tokens=1000,
+        )
+
+        assert fake_openai.requests == 2
+        assert limiter._requests.tokens == pytest.approx(98, abs=0.5)
+        assert limiter._tokens.tokens == pytest.approx(8000, abs=100)
+
+    @pytest.mark.asyncio
+    async def test_circuit_opens_and_sheds_load(self, fake_openai, llm_client):
+        """Test that repeated upstream failures open the circuit and later probes close it."""
+        llm_client.max_retries = 0
+        breaker = llm_client.breaker("chat")
+        breaker.failure_threshold = 2
+        breaker.reset_timeout = 0.2
+        fake_openai.reply(500)
+        fake_openai.reply(500)
+
+        for _ in range(2):
+            with pytest.raises(InternalServerError):
+                await self._chat(llm_client)
+        with pytest.raises(CircuitOpenError):
+            await self._chat(llm_client)
+        assert fake_openai.requests == 2  # shed without calling upstream
+
+        await asyncio.sleep(0.25)
+        await self._chat(llm_client)  # half-open probe succeeds
+
+        assert breaker.state == "closed"
+
+    @pytest.mark.asyncio
+    async def test_retries_count_as_one_breaker_failure(self, fake_openai, llm_client):
+        """Test that a call failing on every retry counts once towards opening the circuit."""
+        llm_client.max_retries = 2
+        breaker = llm_client.breaker("chat")
+        breaker.failure_threshold = 2
+        for _ in range(6):
+            fake_openai.reply(500)
+
+        with pytest.raises(InternalServerError):
+            await self._chat(llm_client)
+        assert fake_openai.requests == 3
+        assert breaker.state == "closed"
+
+        with pytest.raises(InternalServerError):
+            await self._chat(llm_client)
+        assert breaker.state == "open"
+
+    @pytest.mark.asyncio
+    async def test_cancelled_probe_releases_half_open_circuit(self, fake_openai, llm_client):
+        """Test that cancelling the half-open probe lets the next call probe again."""
+        breaker = llm_client.breaker("chat")
+        breaker.failure_threshold = 1
+        breaker.reset_timeout = 0.05
+        breaker.record_failure()
+        await asyncio.sleep(0.1)
+        fake_openai.reply(200, delay=1.0)
+
+        probe = asyncio.create_task(self._chat(llm_client))
+        await asyncio.sleep(0.1)
+        assert breaker.state == "half_open"
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        await self._chat(llm_client)  # not shed with CircuitOpenError
+
+        assert breaker.state == "closed"
+
+
+class TestRateLimiter:
+    """Test the client-side rate limiter's lanes, fairness and token budget."""
+
+    @staticmethod
+    async def _run(limiter, order, label, hold=0.02, **kwargs):
+        async with limiter.slot(**kwargs):
+            order.append(label)
+            await asyncio.sleep(hold)
+
+    @pytest.mark.asyncio
+    async def test_interactive_requests_overtake_backfill(self):
+        """Test that queued interactive work is dispatched before queued backfill work."""
+        limiter = RateLimiter("test", requests_per_minute=6000, tokens_per_minute=None, max_concurrency=1)
+        order = []
+
+        with llm_request_context("backfill", "importer"):
+            backfill = [asyncio.create_task(self._run(limiter, order, f"b{i}")) for i in range(3)]
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(self._run(limiter, order, "live", user="alice"))
+        await asyncio.gather(*backfill, interactive)
+
+        assert order == ["b0", "live", "b1", "b2"]
+
+    @pytest.mark.asyncio
+    async def test_users_are_served_round_robin(self):
+        """Test that one user's burst does not starve another user in the same lane."""
+        limiter = RateLimiter("test", requests_per_minute=6000, tokens_per_minute=None, max_concurrency=1)
+        order = []
+
+        tasks = [asyncio.create_task(self._run(limiter, order, "busy", user="c"))]
+        tasks += [asyncio.create_task(self._run(limiter, order, f"a{i}", user="a")) for i in range(3)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(self._run(limiter, order, "b0", user="b")))
+        await asyncio.gather(*tasks)
+
+        assert order == ["busy", "a0", "b0", "a1", "a2"]
+
+    @pytest.mark.asyncio
+    async def test_tokens_per_minute_delays_requests(self):
+        """Test that a request waits until the tokens/min bucket can pay for it."""
+        limiter = RateLimiter("test", requests_per_minute=6000, tokens_per_minute=600, max_concurrency=4)
+        order = []
+
+        started = time.perf_counter()
+        await self._run(limiter, order, "first", hold=0, tokens=600)
+        await self._run(limiter, order, "second", hold=0, tokens=5)  # 10 tokens/s refill
+
+        assert 0.35 < time.perf_counter() - started < 1.5
+        assert limiter.queue_depth() == 0
+
+
+class TestScriptDetection:
+    """Test script-based text language detection."""
+
+    def test_detect_scripts(self):
+        """Test detection across supported scripts."""
+        assert detect_script_language("Booked the venue for June 15") == "en"
+        assert detect_script_language("மண்டபம் முன்பதிவு செய்தோம்") == "ta"
+        assert detect_script_language("हमने हॉल बुक किया") == "hi"
+        assert detect_script_language("మేము హాల్ బుక్ చేసాము") == "te"
+        assert detect_script_language("ನಾವು ಹಾಲ್ ಬುಕ್ ಮಾಡಿದೆವು") == "kn"
+        assert detect_script_language("ഞങ്ങൾ ഹാൾ ബുക്ക് ചെയ്തു") == "ml"
+        assert detect_script_language("আমরা হল বুক করেছি") == "bn"
+        assert detect_script_language("12345 !!") == "en"
+
+    def test_code_mixed_text_prefers_indic_script(self):
+        """Test that Tamil with English vendor names is detected as Tamil."""
+        assert detect_script_language("Mamma's Kitchen கேட்டரிங் நன்றாக இருந்தது") == "ta"
+
+    def test_batch_matches_single(self):
+        """Test that batch detection agrees with per-text detection."""
+        texts = ["Booked the venue", "", "हमने हॉल बुक किया", "மண்டபம் 🎉", "ok"]
+
+        assert detect_script_languages(texts) == [detect_script_language(t) for t in texts]